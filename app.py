@@ -1,13 +1,17 @@
 import os
 import logging
+from startup import startup_tracker, preload_in_background
 from flask import Flask, send_from_directory
-from flask_login import LoginManager, login_required
+from flask_login import LoginManager, login_required, current_user
 from dotenv import load_dotenv
 from routes import main_bp # Changed to absolute import
 from settings_routes import settings_bp, load_settings as load_app_settings
 from datetime import datetime
 from models import User # This is the primary import for models
+from camera_rpi import get_camera
 import database
+from metrics import install_flask_metrics
+from profiler import ProfilerController, create_profiler_blueprint
 
 # Configure logging
 logging.basicConfig(
@@ -17,6 +21,8 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 load_dotenv()
+startup_tracker.register('camera', 'ocr', 'enhancement')
+startup_tracker.checkpoint('imports')
 
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
@@ -58,10 +64,7 @@ with app.app_context():
     app.config['OCR_SERVER_URL'] = current_settings.get('ocr_server_url', 'http://localhost:8080/ocr')
     # Prompts are loaded dynamically by get_prompt, but we can prime app.config if needed for some other use case, or remove this line.
     app.config['PROMPTS'] = current_settings.get('prompts', {}) 
-
-# Initialize database and users within app context
-with app.app_context():
-    database.init_db()  # Initialize SQLite database
+startup_tracker.checkpoint('settings')
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -75,8 +78,23 @@ def load_user(user_id):
 app.register_blueprint(main_bp)
 app.register_blueprint(settings_bp) # Registered settings blueprint
 
-# Initialize database with Flask app
+# Per-request and per-stage timings for Prometheus at /metrics (no login, like /ready)
+install_flask_metrics(app)
+
+# Admin-only sampling profiler; the OCR server's profiler is reached through settings_routes
+app_profiler = ProfilerController(label='app')
+app.register_blueprint(
+    create_profiler_blueprint(
+        app_profiler,
+        authorize=lambda: current_user.is_authenticated and current_user.is_admin,
+        endpoints=['main.capture_rpi_photo', 'main.process_upload']
+    ),
+    url_prefix='/settings/profiler/app'
+)
+
+# Initialize database with Flask app (creates the schema on first run)
 database.init_app(app)
+startup_tracker.checkpoint('database')
 
 # Route to serve uploaded files
 @app.route('/uploads/<filename>')
@@ -84,5 +102,27 @@ database.init_app(app)
 def uploaded_file(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+startup_tracker.log_report()
+
+def _preload_ocr():
+    from routes import get_or_create_ocr_reader
+    from user_settings import DEFAULT_USER_SETTINGS
+    get_or_create_ocr_reader(DEFAULT_USER_SETTINGS['ocr']['languages'])
+
+def _preload_enhancement():
+    from image_enhancement import get_enhancement_manager
+    with app.app_context():
+        get_enhancement_manager()
+
+# Camera, OCR and enhancement initialize on first use; PRELOAD_SUBSYSTEMS
+# (e.g. "camera,ocr") warms them in the background instead. Not in the spawned
+# PDF render processes, which import this module as __mp_main__.
+if __name__ != '__mp_main__':
+    preload_in_background({
+        'camera': get_camera,
+        'ocr': _preload_ocr,
+        'enhancement': _preload_enhancement
+    })
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
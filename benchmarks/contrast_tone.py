@@ -0,0 +1,103 @@
+"""
+Tone-preservation benchmark for RPi PhotoDoc OCR application.
+Compares ContrastEnhancer with preserve_tone=True against the previous
+float32 implementation: output difference, run time and peak memory.
+Each implementation runs in its own process so peak RSS is measured
+separately. The children are started before the parent does any image work.
+A child started after that work would inherit the parent's peak RSS
+(ru_maxrss), so every implementation would report no increase.
+
+Usage:
+    python benchmarks/contrast_tone.py [image] [--repeat N]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import subprocess
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rpi_cam_enchance import ContrastEnhancer  # noqa: E402
+from fused_enhancement import synthetic_page  # noqa: E402
+from pipeline import reset_peak_rss, peak_rss_mb  # noqa: E402
+
+
+def legacy_enhance(enhancer, image):
+    """ContrastEnhancer.enhance as it was before the lookup-table rewrite (YCrCb only)."""
+    original = image.copy()
+    channels = list(cv2.split(cv2.cvtColor(image, cv2.COLOR_BGR2YCrCb)))
+    clahe = cv2.createCLAHE(clipLimit=enhancer.clip_limit, tileGridSize=enhancer.tile_grid_size)
+    channels[0] = clahe.apply(channels[0])
+    enhanced_image = cv2.cvtColor(cv2.merge(channels), cv2.COLOR_YCrCb2BGR)
+
+    original_luminance = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    enhanced_luminance = cv2.cvtColor(enhanced_image, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    original_luminance = np.maximum(original_luminance, 0.01)
+    ratio = enhanced_luminance / original_luminance
+    enhanced_image = original.copy().astype(np.float32)
+    for c in range(3):
+        enhanced_image[:, :, c] = np.clip(enhanced_image[:, :, c] * ratio, 0, 255)
+    return enhanced_image.astype(np.uint8)
+
+
+def load(path):
+    image = cv2.imread(path) if path else synthetic_page(4608, 2592)
+    if image is None:
+        sys.exit(f"Could not read {path}")
+    return image
+
+
+def run_one(impl, path, repeat):
+    """Child process: time one implementation and print 'seconds peak_mb'."""
+    image = load(path)
+    enhancer = ContrastEnhancer(clip_limit=1.5, tile_grid_size=(8, 8), color_space='YCRCB', preserve_tone=True)
+    func = enhancer.enhance if impl == 'new' else (lambda img: legacy_enhance(enhancer, img))
+    # The high-water mark now only covers the enhancement, not loading the image
+    reset_peak_rss()
+    baseline_mb = peak_rss_mb()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(image)
+        timings.append(time.perf_counter() - start)
+    print(f"{np.median(timings)} {peak_rss_mb() - baseline_mb}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image', nargs='?', help='Image to process (defaults to a 12 MP synthetic page)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per implementation; the median is reported')
+    parser.add_argument('--impl', choices=['new', 'legacy'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.impl:
+        run_one(args.impl, args.image, args.repeat)
+        return
+
+    # Measure first: children inherit the parent's peak RSS once it has processed a frame
+    measured = {}
+    for impl in ('legacy', 'new'):
+        command = [sys.executable, os.path.abspath(__file__), '--impl', impl, '--repeat', str(args.repeat)]
+        if args.image:
+            command.append(args.image)
+        measured[impl] = subprocess.check_output(command, text=True).split()[-2:]
+
+    image = load(args.image)
+    enhancer = ContrastEnhancer(clip_limit=1.5, tile_grid_size=(8, 8), color_space='YCRCB', preserve_tone=True)
+    diff = cv2.absdiff(enhancer.enhance(image), legacy_enhance(enhancer, image))
+    print(f"{image.shape[1]}x{image.shape[0]}: max diff {int(diff.max())}, mean diff {float(diff.mean()):.4f}, "
+          f"pixels differing {float((diff > 0).mean() * 100):.2f}%")
+    for impl, (seconds, peak_mb) in measured.items():
+        print(f"{impl:<8}{float(seconds) * 1000:>10.1f} ms{float(peak_mb):>10.1f} MB peak above baseline")
+
+
+if __name__ == '__main__':
+    main()
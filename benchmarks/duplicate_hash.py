@@ -0,0 +1,130 @@
+"""
+Near-duplicate hash calibration for RPi PhotoDoc OCR application.
+Reports duplicates.hamming_distance between re-shots of the same page and
+between different pages, to choose duplicate_max_distance.
+
+Re-shots are either real (--reshoot-dir with one subdirectory of captures
+per page) or simulated from the given images (or synthetic text pages):
+noise and JPEG, shifts, small rotations, exposure and scale changes.
+
+Usage:
+    python benchmarks/duplicate_hash.py [image ...] [--pages N]
+    python benchmarks/duplicate_hash.py --reshoot-dir captures/
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import itertools
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from duplicates import dhash, hamming_distance  # noqa: E402
+
+VARIANTS = {
+    'noise+jpeg': dict(noise=4),
+    'noise8+jpeg70': dict(noise=8, quality=70),
+    'shift 2px': dict(shift=(2, 2)),
+    'shift 5px': dict(shift=(5, -5)),
+    'shift 20px': dict(shift=(20, 12)),
+    'rotate 0.5': dict(angle=0.5),
+    'rotate 1.5': dict(angle=1.5),
+    'exposure -10%': dict(gain=0.9),
+    'scale 2%': dict(scale=1.02),
+    'combined': dict(noise=6, shift=(8, -6), angle=0.7, gain=0.93, scale=1.01)
+}
+
+
+def synthetic_page(seed, width=2592, height=3456):
+    """Text page with uneven lighting; every seed shares the same layout rules, like pages of one book."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    page = np.clip(205 + 20 * (xx / width) - 15 * (yy / height), 0, 255).astype(np.uint8)
+    y = 300
+    while y < height - 300:
+        if rng.random() < 0.08:  # paragraph break
+            y += 90
+            continue
+        x = 250 + (80 if rng.random() < 0.1 else 0)
+        end = width - 250 - (int(rng.integers(0, 1200)) if rng.random() < 0.15 else 0)
+        while x < end - 60:
+            word = int(rng.integers(30, 200))
+            cv2.rectangle(page, (x, y), (min(x + word, end), y + 26), 45, -1)
+            x += word + int(rng.integers(18, 30))
+        y += 55
+    return cv2.cvtColor(page, cv2.COLOR_GRAY2BGR)
+
+
+def reshoot(image, seed, noise=4.0, shift=(0, 0), angle=0.0, gain=1.0, scale=1.0, quality=85):
+    """Simulated second capture of the same page."""
+    rng = np.random.default_rng(seed)
+    height, width = image.shape[:2]
+    M = cv2.getRotationMatrix2D((width / 2, height / 2), angle, scale)
+    M[:, 2] += shift
+    shot = cv2.warpAffine(image, M, (width, height), borderMode=cv2.BORDER_REPLICATE).astype(np.float32)
+    shot = shot * gain + rng.normal(0, noise, shot.shape)
+    return np.clip(shot, 0, 255).astype(np.uint8), quality
+
+
+def write_jpeg(image, quality, directory, name):
+    path = os.path.join(directory, name)
+    cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return path
+
+
+def print_distances(label, distances):
+    print(f"{label:<28}max {max(distances):>4}  median {int(np.median(distances)):>4}  (n={len(distances)})")
+
+
+def simulated(images, workdir):
+    originals, same = [], {name: [] for name in VARIANTS}
+    for i, image in enumerate(images):
+        originals.append(dhash(write_jpeg(*reshoot(image, 100 + i), workdir, f"page{i}.jpg")))
+        for name, options in VARIANTS.items():
+            path = write_jpeg(*reshoot(image, 200 + i, **options), workdir, f"page{i}_{len(same[name])}.jpg")
+            same[name].append(hamming_distance(originals[i], dhash(path)))
+    for name, distances in same.items():
+        print_distances(f"re-shot: {name}", distances)
+    return originals
+
+
+def real(reshoot_dir):
+    groups = []
+    for entry in sorted(os.listdir(reshoot_dir)):
+        directory = os.path.join(reshoot_dir, entry)
+        if os.path.isdir(directory):
+            hashes = [dhash(os.path.join(directory, f)) for f in sorted(os.listdir(directory))]
+            groups.append([h for h in hashes if h])
+    same = [hamming_distance(a, b) for group in groups for a, b in itertools.combinations(group, 2)]
+    if same:
+        print_distances("re-shot: real", same)
+    return [group[0] for group in groups if group]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', nargs='*', help='Pages to simulate re-shots of (defaults to synthetic pages)')
+    parser.add_argument('--pages', type=int, default=20, help='Synthetic pages when no images are given')
+    parser.add_argument('--reshoot-dir', help='Directory with one subdirectory of real re-shots per page')
+    args = parser.parse_args()
+
+    if args.reshoot_dir:
+        pages = real(args.reshoot_dir)
+    else:
+        images = [image for image in (cv2.imread(path) for path in args.images) if image is not None]
+        images = images or [synthetic_page(seed) for seed in range(args.pages)]
+        with tempfile.TemporaryDirectory() as workdir:
+            pages = simulated(images, workdir)
+
+    different = [hamming_distance(a, b) for a, b in itertools.combinations(pages, 2)]
+    if different:
+        print(f"{'different pages':<28}min {min(different):>4}  p10 {int(np.percentile(different, 10)):>4}  "
+              f"median {int(np.median(different)):>4}  (n={len(different)})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Fused vs sequential enhancement benchmark for RPi PhotoDoc OCR application.
+Runs the standard ColorCorrection -> Denoise -> Contrast -> Sharpen chain
+and the equivalent FusedEnhancer on the same images, and reports timing and
+pixel differences between the two outputs.
+
+Usage:
+    python benchmarks/fused_enhancement.py [image ...] [--repeat N] [--slow-denoise]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rpi_cam_enchance import (  # noqa: E402
+    ColorCorrectionEnhancer,
+    DenoiseEnhancer,
+    ContrastEnhancer,
+    SharpenEnhancer,
+    FusedEnhancer
+)
+
+
+def synthetic_page(width=2304, height=1296, seed=0):
+    """Noisy, slightly tinted page with text-like strokes."""
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), (200, 215, 225), dtype=np.uint8)
+    for row in range(80, height - 80, 48):
+        x = 80
+        while x < width - 200:
+            word = int(rng.integers(40, 180))
+            cv2.rectangle(page, (x, row), (x + word, row + 18), (40, 40, 50), -1)
+            x += word + int(rng.integers(15, 30))
+    noise = rng.normal(0, 6, page.shape)
+    return np.clip(page.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+
+def build_chain(fast_denoise=True):
+    """Same configuration ImageEnhancementManager builds with every step enabled."""
+    return [
+        ColorCorrectionEnhancer(white_balance=True, saturation_factor=1.1, temperature_adjustment=0.1),
+        DenoiseEnhancer(h_luminance=3, h_color=3, preserve_colors=True,
+                        fast_mode=fast_denoise, downscale_factor=2 if fast_denoise else 1),
+        ContrastEnhancer(clip_limit=1.5, tile_grid_size=(8, 8), color_space='YCRCB', preserve_tone=True),
+        SharpenEnhancer(strength=0.3)
+    ]
+
+
+def run_chain(enhancers, image):
+    for enhancer in enhancers:
+        image = enhancer.enhance(image)
+    return image
+
+
+def time_call(func, image, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(image)
+        timings.append(time.perf_counter() - start)
+    return result, float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', nargs='*', help='Images to process (defaults to a synthetic page)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per image; the median is reported')
+    parser.add_argument('--slow-denoise', action='store_true', help='Use NLMeans instead of the fast bilateral denoise')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    chain = build_chain(fast_denoise=not args.slow_denoise)
+    fused = FusedEnhancer.from_enhancers(chain)
+
+    inputs = []
+    for path in args.images:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"Skipping unreadable image: {path}")
+            continue
+        inputs.append((os.path.basename(path), image))
+    if not inputs:
+        inputs.append(('synthetic', synthetic_page()))
+
+    print(f"{'image':<24}{'size':>12}{'chain ms':>10}{'fused ms':>10}{'speedup':>9}{'max diff':>10}{'mean diff':>11}{'>8 px %':>9}")
+    for name, image in inputs:
+        expected, chain_time = time_call(lambda img: run_chain(chain, img), image, args.repeat)
+        actual, fused_time = time_call(fused.enhance, image, args.repeat)
+        diff = cv2.absdiff(expected, actual)
+        size = f"{image.shape[1]}x{image.shape[0]}"
+        print(f"{name[:23]:<24}{size:>12}{chain_time * 1000:>10.1f}{fused_time * 1000:>10.1f}"
+              f"{chain_time / fused_time:>8.2f}x{int(diff.max()):>10}{float(diff.mean()):>11.3f}"
+              f"{float((diff > 8).mean() * 100):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+OCR preprocessing benchmark for RPi PhotoDoc OCR application.
+Runs EasyOCR on each sample image as stored and after OCRPreprocessor, and
+reports latency and character error rate (CER) against ground truth.
+
+The sample directory holds images with a same-named .txt file containing
+the expected text, e.g. page1.jpg + page1.txt.
+
+Usage:
+    python benchmarks/ocr_preprocess.py samples/ [--languages en,uk] [--binarize] [--text-height 32]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_enhancement import OCRPreprocessor  # noqa: E402
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.webp')
+
+
+def normalize(text):
+    return ' '.join(text.split())
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(expected, actual):
+    expected, actual = normalize(expected), normalize(actual)
+    return edit_distance(expected, actual) / max(1, len(expected))
+
+
+def find_samples(directory):
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        truth = os.path.join(directory, stem + '.txt')
+        if extension.lower() in IMAGE_EXTENSIONS and os.path.exists(truth):
+            with open(truth, encoding='utf-8') as f:
+                samples.append((os.path.join(directory, name), f.read()))
+    return samples
+
+
+def run_ocr(reader, image):
+    start = time.perf_counter()
+    text = '\n'.join(reader.readtext(image, detail=0, paragraph=True, workers=0))
+    return text, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('samples', help='Directory of images with .txt ground truth')
+    parser.add_argument('--languages', default='uk,en', help='EasyOCR languages, comma separated')
+    parser.add_argument('--text-height', type=int, default=32, help='Target text height in pixels')
+    parser.add_argument('--binarize', action='store_true', help='Enable adaptive binarization')
+    parser.add_argument('--no-crop', action='store_true', help='Disable page cropping')
+    parser.add_argument('--no-deskew', action='store_true', help='Disable deskewing')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    samples = find_samples(args.samples)
+    if not samples:
+        sys.exit(f"No image + .txt pairs found in {args.samples}")
+
+    import easyocr
+    reader = easyocr.Reader(args.languages.split(','), gpu=False)
+    preprocessor = OCRPreprocessor(target_text_height=args.text_height, crop=not args.no_crop,
+                                   deskew=not args.no_deskew, binarize=args.binarize)
+
+    # Warm-up so model loading does not count against the first sample
+    run_ocr(reader, samples[0][0])
+
+    totals = {'before_s': 0.0, 'after_s': 0.0, 'prep_s': 0.0, 'before_cer': 0.0, 'after_cer': 0.0}
+    print(f"{'sample':<28}{'before s':>10}{'CER':>8}{'prep s':>9}{'after s':>10}{'CER':>8}{'output':>12}")
+    for path, truth in samples:
+        before_text, before_s = run_ocr(reader, path)
+
+        start = time.perf_counter()
+        processed, info = preprocessor.process_file(path)
+        prep_s = time.perf_counter() - start
+        after_text, after_s = run_ocr(reader, processed)
+
+        before_cer = character_error_rate(truth, before_text)
+        after_cer = character_error_rate(truth, after_text)
+        for key, value in (('before_s', before_s), ('after_s', after_s), ('prep_s', prep_s),
+                           ('before_cer', before_cer), ('after_cer', after_cer)):
+            totals[key] += value
+        size = f"{info['output_size'][0]}x{info['output_size'][1]}"
+        print(f"{os.path.basename(path)[:27]:<28}{before_s:>10.2f}{before_cer:>8.3f}{prep_s:>9.2f}"
+              f"{after_s:>10.2f}{after_cer:>8.3f}{size:>12}")
+
+    n = len(samples)
+    print(f"{'mean':<28}{totals['before_s'] / n:>10.2f}{totals['before_cer'] / n:>8.3f}{totals['prep_s'] / n:>9.2f}"
+          f"{totals['after_s'] / n:>10.2f}{totals['after_cer'] / n:>8.3f}")
+    speedup = totals['before_s'] / max(1e-9, totals['after_s'] + totals['prep_s'])
+    print(f"End-to-end OCR speed-up including preprocessing: {speedup:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,441 @@
+"""
+End-to-end pipeline benchmark for RPi PhotoDoc OCR application.
+Runs the real capture-to-text code paths over a fixed corpus of document
+images at several resolutions and writes p50/p95 latency, throughput and
+peak RSS per stage as JSON, so runs from different commits can be compared.
+
+Stages:
+    enhance     ImageEnhancer.enhance_image with each enhancer, the full chain and the fused pass
+    ocr_local   routes.perform_ocr_local (EasyOCR in this process)
+    ocr_remote  routes.perform_ocr_remote against an OCRServer started on localhost
+    llm         routes.call_llm against a stub Ollama server
+    db          photo_manager / document_manager on a scratch SQLite database
+
+The corpus is synthetic (fixed seed) unless --images is given, in which case
+each image is resized to every requested width. Peak RSS is the process
+high-water mark reset before each stage (Linux); the remote OCR server runs
+in this process, so its memory counts towards ocr_remote.
+
+Usage:
+    python benchmarks/pipeline.py [--stages enhance,db] [--resolutions 1152x648,2304x1296]
+                                  [--images DIR] [--repeat N] [--output results.json]
+    python benchmarks/pipeline.py --compare baseline.json results.json [--threshold 0.1]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rpi_cam_enchance import ImageEnhancer, PerspectiveCropEnhancer, FusedEnhancer  # noqa: E402
+from fused_enhancement import synthetic_page, build_chain  # noqa: E402
+
+ALL_STAGES = ('enhance', 'ocr_local', 'ocr_remote', 'llm', 'db')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.webp')
+SAMPLE_TEXT = ("Invoice 2024-117\nDate: 12.03.2024\nTotal due: 1 245,50 UAH\n"
+               "Payment within 14 days to account UA21 3223 1300 0002 6007 2335 6600 1") * 4
+
+
+# --- measurement ---------------------------------------------------------
+
+def reset_peak_rss():
+    """Reset the kernel's RSS high-water mark (Linux only)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak RSS since the last reset, or since process start where reset is unsupported."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(stage, resolution, func, items, repeat, megapixels=None):
+    """
+    Time func over every item `repeat` times after one untimed warm-up call.
+
+    Returns:
+        dict: Result record for the JSON report
+    """
+    start = time.perf_counter()
+    func(items[0])
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    reset_peak_rss()
+    timings = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            func(item)
+            timings.append(time.perf_counter() - start)
+
+    timings = np.array(timings)
+    total = float(timings.sum())
+    record = {
+        'stage': stage,
+        'resolution': resolution,
+        'runs': len(timings),
+        'cold_ms': round(cold_ms, 2),
+        'p50_ms': round(float(np.percentile(timings, 50)) * 1000, 2),
+        'p95_ms': round(float(np.percentile(timings, 95)) * 1000, 2),
+        'mean_ms': round(float(timings.mean()) * 1000, 2),
+        'throughput_per_s': round(len(timings) / total, 3) if total else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+    if megapixels:
+        record['megapixels_per_s'] = round(megapixels * len(timings) / total, 2) if total else None
+    return record
+
+
+def skipped(stage, reason):
+    logging.warning(f"Skipping {stage}: {reason}")
+    return {'stage': stage, 'resolution': None, 'skipped': reason}
+
+
+# --- fixtures -------------------------------------------------------------
+
+def parse_resolution(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def build_corpus(directory, resolutions, images_dir=None, count=3):
+    """
+    Write the corpus as JPEG files grouped by resolution.
+
+    Returns:
+        dict: 'WxH' -> list of file paths
+    """
+    sources = []
+    if images_dir:
+        for name in sorted(os.listdir(images_dir)):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                image = cv2.imread(os.path.join(images_dir, name))
+                if image is not None:
+                    sources.append(image)
+        if not sources:
+            sys.exit(f"No readable images in {images_dir}")
+
+    corpus = {}
+    for width, height in resolutions:
+        if sources:
+            images = [cv2.resize(image, (width, round(image.shape[0] * width / image.shape[1])),
+                                 interpolation=cv2.INTER_AREA) for image in sources]
+        else:
+            images = [synthetic_page(width, height, seed=seed) for seed in range(count)]
+        key = f"{width}x{height}"
+        corpus[key] = []
+        for index, image in enumerate(images):
+            path = os.path.join(directory, f"page_{key}_{index}.jpg")
+            cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+            corpus[key].append(path)
+    return corpus
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate like Ollama with stream=False, echoing the text after the prompt."""
+    delay = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        time.sleep(self.delay)
+        payload = json.dumps({'model': body.get('model'), 'response': body.get('prompt', '').split('\n\n')[-1],
+                              'done': True}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def make_app(root, llm_url, ocr_url):
+    """Minimal Flask app whose config/ directory (settings, prompts, SQLite) lives in root."""
+    import yaml
+    from flask import Flask
+
+    prompts = os.path.join(root, 'config', 'prompts')
+    os.makedirs(prompts, exist_ok=True)
+    with open(os.path.join(root, 'config', 'settings.yaml'), 'w') as f:
+        yaml.dump({'llm_server_url': llm_url, 'ocr_server_url': ocr_url, 'ocr_mode': 'remote'}, f)
+    shutil.copy(os.path.join(ROOT, 'config', 'prompts', 'cleanup_ocr.txt'), prompts)
+
+    app = Flask('benchmark', root_path=root)
+    app.config['SECRET_KEY'] = 'benchmark'
+    return app
+
+
+# --- stages ---------------------------------------------------------------
+
+def bench_enhance(corpus, args):
+    chain = build_chain(fast_denoise=True)
+    variants = [(f"enhance.{type(e).__name__}", [e]) for e in chain]
+    variants.append(('enhance.PerspectiveCropEnhancer', [PerspectiveCropEnhancer()]))
+    variants.append(('enhance.chain', chain))
+    fused = FusedEnhancer.from_enhancers(chain)
+    if fused is not None:
+        variants.append(('enhance.fused', [fused]))
+
+    results = []
+    for resolution, paths in corpus.items():
+        images = [cv2.imread(path) for path in paths]
+        megapixels = images[0].shape[0] * images[0].shape[1] / 1e6
+        for stage, enhancers in variants:
+            enhancer = ImageEnhancer(enhancers=enhancers, input_format='BGR', tile_workers=args.tile_workers)
+            results.append(measure(stage, resolution, enhancer.enhance_image, images, args.repeat, megapixels))
+    return results
+
+
+def bench_ocr_local(corpus, args):
+    try:
+        import easyocr  # noqa: F401
+    except ImportError as e:
+        return [skipped('ocr_local', str(e))]
+    from routes import perform_ocr_local
+
+    settings = {'languages': args.languages.split(','), 'detail_level': 0, 'paragraph_mode': True}
+    results = []
+    for resolution, paths in corpus.items():
+        width, height = parse_resolution(resolution)
+        results.append(measure('ocr_local', resolution, lambda p: perform_ocr_local(p, settings),
+                               paths, args.ocr_repeat, width * height / 1e6))
+    return results
+
+
+def bench_ocr_remote(corpus, args, app, ocr_port):
+    try:
+        sys.path.insert(0, os.path.join(ROOT, 'ocr_server'))
+        from ocr_server import OCRServer
+        from werkzeug.serving import make_server
+    except ImportError as e:
+        return [skipped('ocr_remote', str(e))]
+    from routes import perform_ocr_remote
+    import yaml
+
+    config_file = os.path.join(app.root_path, 'config', 'ocr_server_config.yaml')
+    with open(config_file, 'w') as f:
+        yaml.dump({'ocr': {'languages': args.languages.split(',')}, 'logging': {'level': 'WARNING'}}, f)
+    server = OCRServer(config_file=config_file)
+    if server.reader is None:
+        return [skipped('ocr_remote', 'OCRServer failed to initialize EasyOCR')]
+    http = start_in_thread(make_server('127.0.0.1', ocr_port, server.app, threaded=True))
+
+    results = []
+    try:
+        with app.app_context():
+            for resolution, paths in corpus.items():
+                width, height = parse_resolution(resolution)
+                results.append(measure('ocr_remote', resolution, perform_ocr_remote,
+                                       paths, args.ocr_repeat, width * height / 1e6))
+    finally:
+        http.shutdown()
+    return results
+
+
+def bench_llm(args, app, llm_port):
+    from routes import call_llm
+
+    StubOllamaHandler.delay = args.llm_delay_ms / 1000
+    http = start_in_thread(ThreadingHTTPServer(('127.0.0.1', llm_port), StubOllamaHandler))
+    try:
+        with app.app_context():
+            if call_llm('cleanup_ocr', 'ping').startswith('Error'):
+                return [skipped('llm', 'call_llm returned an error against the stub server')]
+            return [measure('llm.cleanup_ocr', None, lambda text: call_llm('cleanup_ocr', text),
+                            [SAMPLE_TEXT], args.repeat * 10)]
+    finally:
+        http.shutdown()
+
+
+def bench_db(args, app):
+    from database import init_db
+    from models import User
+    from photo_manager import create_photo, get_photo_by_id, update_photo, load_all_photos_for_user, delete_photo
+    from document_manager import create_document, get_document_by_id, delete_document
+
+    results = []
+    with app.app_context():
+        init_db()
+        user = User.create('benchmark', 'benchmark')
+        user_id = user.id if user else 1
+        seeded = [create_photo(user_id, f"seed_{i}.jpg", SAMPLE_TEXT, SAMPLE_TEXT)['id'] for i in range(args.db_rows)]
+        runs = args.repeat * 20
+
+        created = []
+        results.append(measure('db.create_photo', None,
+                               lambda i: created.append(create_photo(user_id, f"bench_{i}.jpg", SAMPLE_TEXT, SAMPLE_TEXT)['id']),
+                               list(range(runs)), 1))
+        results.append(measure('db.get_photo_by_id', None, lambda pid: get_photo_by_id(pid, user_id), seeded[:runs], 1))
+        results.append(measure('db.update_photo', None,
+                               lambda pid: update_photo(user_id, pid, {'edited_text': SAMPLE_TEXT[::-1]}), seeded[:runs], 1))
+        results.append(measure('db.load_all_photos_for_user', None, lambda _: load_all_photos_for_user(user_id),
+                               [None], args.repeat))
+
+        documents = []
+        results.append(measure('db.create_document', None,
+                               lambda i: documents.append(create_document(user_id, f"doc {i}", seeded[i:i + 5])['id']),
+                               list(range(runs)), 1))
+        results.append(measure('db.get_document_by_id', None, lambda did: get_document_by_id(did, user_id), documents, 1))
+        results.append(measure('db.delete_document', None, lambda did: delete_document(user_id, did), documents, 1))
+        results.append(measure('db.delete_photo', None, lambda pid: delete_photo(user_id, pid), created, 1))
+        for record in results:
+            record['rows'] = args.db_rows
+    return results
+
+
+# --- report ---------------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    print(f"{'stage':<36}{'resolution':>12}{'runs':>6}{'p50 ms':>10}{'p95 ms':>10}{'per s':>9}{'peak MB':>9}")
+    for r in results:
+        if r.get('skipped'):
+            print(f"{r['stage']:<36}{'':>12}  skipped: {r['skipped']}")
+            continue
+        print(f"{r['stage']:<36}{r['resolution'] or '-':>12}{r['runs']:>6}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['throughput_per_s'] or 0:>9.2f}{r['peak_rss_mb']:>9.1f}")
+
+
+def compare(baseline_path, current_path, threshold):
+    """Print p50/p95 changes between two reports; exit status 1 if any stage regressed past threshold."""
+    with open(baseline_path) as f:
+        baseline = {(r['stage'], r['resolution']): r for r in json.load(f)['results'] if not r.get('skipped')}
+    with open(current_path) as f:
+        current = json.load(f)
+
+    regressions = 0
+    print(f"{'stage':<36}{'resolution':>12}{'p50 base':>10}{'p50 now':>10}{'change':>9}{'p95 change':>12}")
+    for r in current['results']:
+        base = baseline.get((r['stage'], r['resolution']))
+        if r.get('skipped') or base is None:
+            continue
+        p50_change = r['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+        p95_change = r['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+        flag = ' REGRESSION' if p50_change > threshold else ''
+        regressions += bool(flag)
+        print(f"{r['stage']:<36}{r['resolution'] or '-':>12}{base['p50_ms']:>10.1f}{r['p50_ms']:>10.1f}"
+              f"{p50_change:>+9.1%}{p95_change:>+12.1%}{flag}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', default=','.join(ALL_STAGES), help='Comma separated stages to run')
+    parser.add_argument('--resolutions', default='1152x648,2304x1296,4608x2592', help='Corpus sizes, WxH')
+    parser.add_argument('--images', help='Directory of document images (default: synthetic pages)')
+    parser.add_argument('--repeat', type=int, default=5, help='Passes over the corpus per stage')
+    parser.add_argument('--ocr-repeat', type=int, default=1, help='Passes over the corpus for OCR stages')
+    parser.add_argument('--tile-workers', type=int, default=1, help='ImageEnhancer tile workers')
+    parser.add_argument('--languages', default='uk,en', help='EasyOCR languages, comma separated')
+    parser.add_argument('--llm-delay-ms', type=float, default=0.0, help='Simulated generation time of the stub LLM')
+    parser.add_argument('--db-rows', type=int, default=500, help='Photos seeded before the DB stage')
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='Compare two JSON reports')
+    parser.add_argument('--threshold', type=float, default=0.10, help='p50 slowdown counted as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(ALL_STAGES)
+    if unknown:
+        sys.exit(f"Unknown stages: {', '.join(sorted(unknown))}")
+    resolutions = [parse_resolution(text) for text in args.resolutions.split(',')]
+
+    workdir = tempfile.mkdtemp(prefix='photodoc-bench-')
+    results = []
+    try:
+        corpus = build_corpus(workdir, resolutions, args.images)
+        llm_port, ocr_port = free_port(), free_port()
+        app = make_app(workdir, f"http://127.0.0.1:{llm_port}/api/generate", f"http://127.0.0.1:{ocr_port}/ocr")
+
+        if 'enhance' in stages:
+            results += bench_enhance(corpus, args)
+        if 'ocr_local' in stages:
+            results += bench_ocr_local(corpus, args)
+        if 'ocr_remote' in stages:
+            results += bench_ocr_remote(corpus, args, app, ocr_port)
+        if 'llm' in stages:
+            results += bench_llm(args, app, llm_port)
+        if 'db' in stages:
+            results += bench_db(args, app)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'peak_rss_reset': reset_peak_rss()
+        },
+        'config': {key: value for key, value in vars(args).items() if key not in ('compare', 'output')},
+        'results': results
+    }
+
+    if args.output:
+        print_table(results)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
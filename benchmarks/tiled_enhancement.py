@@ -0,0 +1,96 @@
+"""
+Tiled enhancement benchmark for RPi PhotoDoc OCR application.
+Runs each tileable enhancer on the full frame and through TiledExecutor,
+and reports the speed-up and the seam error (pixel differences between the
+two outputs, overall and within the rows around band boundaries).
+
+Usage:
+    python benchmarks/tiled_enhancement.py [image] [--workers N] [--repeat N]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rpi_cam_enchance import (  # noqa: E402
+    ColorCorrectionEnhancer,
+    DenoiseEnhancer,
+    SharpenEnhancer,
+    FusedEnhancer,
+    TiledExecutor
+)
+from fused_enhancement import synthetic_page  # noqa: E402
+
+
+def candidates():
+    """Tileable enhancers in the configurations the app uses."""
+    fast_denoise = DenoiseEnhancer(h_luminance=3, h_color=3, preserve_colors=True, fast_mode=True, downscale_factor=2)
+    sharpen = SharpenEnhancer(strength=0.3)
+    return [
+        ('denoise (bilateral, /2)', fast_denoise),
+        ('denoise (NLMeans)', DenoiseEnhancer(h_luminance=3, h_color=3, preserve_colors=True,
+                                              fast_mode=False, downscale_factor=1)),
+        ('sharpen', sharpen),
+        ('color (no white balance)', ColorCorrectionEnhancer(white_balance=False, saturation_factor=1.1,
+                                                             temperature_adjustment=0.1)),
+        ('fused denoise+sharpen', FusedEnhancer(denoise=fast_denoise, sharpen=sharpen)),
+    ]
+
+
+def median_time(func, image, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(image)
+        timings.append(time.perf_counter() - start)
+    return result, float(np.median(timings))
+
+
+def seam_rows(bands, height, width):
+    """Mask of rows within a few pixels of an internal band boundary."""
+    mask = np.zeros(height, dtype=bool)
+    for start, _, _, _ in bands[1:]:
+        mask[max(0, start - width):min(height, start + width)] = True
+    return mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image', nargs='?', help='Image to process (defaults to a synthetic page)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Tile worker threads')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per enhancer; the median is reported')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    image = cv2.imread(args.image) if args.image else synthetic_page(4608, 2592)
+    if image is None:
+        sys.exit(f"Could not read {args.image}")
+
+    tiler = TiledExecutor(workers=args.workers)
+    print(f"{image.shape[1]}x{image.shape[0]}, {args.workers} workers")
+    print(f"{'enhancer':<28}{'bands':>6}{'full ms':>10}{'tiled ms':>10}{'speedup':>9}{'max diff':>10}{'seam max':>10}{'mean diff':>11}")
+    try:
+        for name, enhancer in candidates():
+            bands = tiler.plan(image.shape[0], enhancer.tile_halo, enhancer.tile_align)
+            expected, full_time = median_time(enhancer.enhance, image, args.repeat)
+            actual, tiled_time = median_time(lambda img: tiler.run(enhancer, img), image, args.repeat)
+            diff = cv2.absdiff(expected, actual)
+            seam = diff[seam_rows(bands, image.shape[0], 4)]
+            print(f"{name:<28}{len(bands):>6}{full_time * 1000:>10.1f}{tiled_time * 1000:>10.1f}"
+                  f"{full_time / tiled_time:>8.2f}x{int(diff.max()):>10}{int(seam.max()) if seam.size else 0:>10}"
+                  f"{float(diff.mean()):>11.4f}")
+    finally:
+        tiler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Bulk upload batches for RPi PhotoDoc OCR application.
+Many files (or zip archives of them) arrive in one request, are written to
+the upload folder one at a time and processed by a small worker pool. The
+batch keeps per-file status for progress polling and can build a document
+from its pages in file name order once every file is done. Each PDF becomes
+a document of its own (see pdf_import).
+"""
+
+import os
+import re
+import uuid
+import shutil
+import logging
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+
+from document_manager import create_document
+from pdf_import import is_pdf, import_pdf, PdfImportError
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_FILES = int(os.environ.get('BULK_UPLOAD_MAX_FILES', 500))
+MAX_ZIP_BYTES = int(os.environ.get('BULK_UPLOAD_MAX_ZIP_MB', 2048)) * 1024 * 1024  # uncompressed
+MEMORY_WAIT_SECONDS = int(os.environ.get('BULK_UPLOAD_MEMORY_WAIT', 1800))  # per file, then it fails
+MAX_BATCHES = 50  # finished batches kept for status polling
+COPY_CHUNK = 1024 * 1024
+
+bulk_files = registry.counter(
+    'bulk_upload_files_total', 'Files processed from bulk uploads by outcome.', ['status'])
+
+
+class BatchLimitExceeded(Exception):
+    """The upload holds more files or more data than a batch may contain."""
+
+
+def natural_sort_key(name: str):
+    """Sort 'page2' before 'page10'"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+class BatchManager:
+    """Bulk upload batches of this process and the pool that processes them."""
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._pool = None
+        self._batches = OrderedDict()
+        self._lock = Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk-upload')
+        return self._pool
+
+    def create(self, user_id, build_document: bool = False, document_name: str = None) -> dict:
+        batch = {
+            'id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'status': 'receiving',
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'finished_at': None,
+            'build_document': build_document,
+            'document_name': document_name,
+            'document_id': None,
+            'items': [],
+            'remaining': 0
+        }
+        with self._lock:
+            self._batches[batch['id']] = batch
+            finished = [b for b in self._batches.values() if b['status'] == 'done']
+            for old in finished[:max(0, len(finished) - MAX_BATCHES)]:
+                self._batches.pop(old['id'], None)
+        return batch
+
+    def get(self, batch_id: str, user_id):
+        """Batch of this user, or None"""
+        batch = self._batches.get(batch_id)
+        return batch if batch is not None and batch['user_id'] == user_id else None
+
+    # --- receiving ---
+
+    def _add_item(self, batch: dict, filename: str, stored_filename: str, filepath: str) -> None:
+        if len(batch['items']) >= MAX_BATCH_FILES:
+            raise BatchLimitExceeded(f"A batch may contain at most {MAX_BATCH_FILES} files")
+        item = {'filename': filename, 'stored_filename': stored_filename, 'filepath': filepath,
+                'status': 'queued', 'photo_id': None, 'duplicate_of': None, 'error': None}
+        if is_pdf(filename):
+            item.update({'pages': None, 'pages_done': 0, 'document_id': None})
+        batch['items'].append(item)
+
+    def add_file(self, batch: dict, file_storage, upload_folder: str, secure_filename, allowed) -> None:
+        """
+        Save one uploaded file to the upload folder, or unpack it if it is a zip.
+        Werkzeug spools large parts to temporary files, and both paths copy in chunks,
+        so a large batch is never held in memory.
+
+        Args:
+            batch: Batch from create()
+            file_storage: Werkzeug FileStorage
+            upload_folder: Destination directory
+            secure_filename: Filename sanitizer
+            allowed: Callable telling whether a file name has an allowed image extension
+        """
+        name = secure_filename(file_storage.filename or '')
+        if name.lower().endswith('.zip'):
+            self._add_zip(batch, file_storage.stream, upload_folder, secure_filename, allowed)
+        elif name and (allowed(name) or is_pdf(name)):
+            stored_filename = f"{uuid.uuid4().hex}_{name[:100]}"
+            filepath = os.path.join(upload_folder, stored_filename)
+            file_storage.save(filepath, buffer_size=COPY_CHUNK)
+            self._add_item(batch, name, stored_filename, filepath)
+        else:
+            batch['items'].append({'filename': name or '(unnamed)', 'stored_filename': None, 'filepath': None,
+                                   'status': 'failed', 'photo_id': None, 'duplicate_of': None,
+                                   'error': 'File type not allowed'})
+
+    def _add_zip(self, batch, stream, upload_folder, secure_filename, allowed) -> None:
+        try:
+            archive = zipfile.ZipFile(stream)
+        except zipfile.BadZipFile:
+            raise BatchLimitExceeded("Not a valid zip archive")
+        with archive:
+            members = [m for m in archive.infolist()
+                       if not m.is_dir() and not m.filename.startswith('__MACOSX/')
+                       and not os.path.basename(m.filename).startswith('.')
+                       and (allowed(os.path.basename(m.filename)) or is_pdf(m.filename))]
+            if sum(m.file_size for m in members) > MAX_ZIP_BYTES:
+                raise BatchLimitExceeded(f"Zip contents exceed {MAX_ZIP_BYTES // (1024 * 1024)} MB")
+            for member in members:
+                name = secure_filename(os.path.basename(member.filename))
+                stored_filename = f"{uuid.uuid4().hex}_{name[:100]}"
+                filepath = os.path.join(upload_folder, stored_filename)
+                self._add_item(batch, name, stored_filename, filepath)
+                with archive.open(member) as src, open(filepath, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, COPY_CHUNK)
+
+    def discard(self, batch: dict) -> None:
+        """Remove the files of a batch that could not be received completely"""
+        for item in batch['items']:
+            if item['filepath'] and os.path.exists(item['filepath']):
+                os.remove(item['filepath'])
+        with self._lock:
+            self._batches.pop(batch['id'], None)
+
+    # --- processing ---
+
+    def start(self, batch: dict, app, process) -> None:
+        """
+        Queue every received file of the batch.
+
+        Args:
+            batch: Batch from create()
+            app: Flask app; each file is processed in its own app context
+            process: process(filepath, stored_filename, filename, user_id, ocr_text=None) -> result dict
+                     as returned by routes.ingest_uploaded_file
+        """
+        queued = [item for item in batch['items'] if item['status'] == 'queued']
+        batch['remaining'] = len(queued)
+        batch['status'] = 'processing'
+        logger.info(f"Bulk upload {batch['id']}: processing {len(queued)} file(s) for user {batch['user_id']}")
+        if not queued:
+            self._finish(batch, app)
+            return
+        for item in queued:
+            self._executor().submit(self._run_item, batch, item, app, process)
+
+    def _run_item(self, batch, item, app, process) -> None:
+        item['status'] = 'processing'
+        try:
+            with app.app_context():
+                if is_pdf(item['filename']):
+                    result = self._run_pdf(batch, item, process)
+                else:
+                    result = process(item['filepath'], item['stored_filename'], item['filename'], batch['user_id'])
+            item['status'] = result['status']
+            item['error'] = result['error']
+            if result['photo']:
+                item['photo_id'] = result['photo']['id']
+            if result['duplicate']:
+                item['duplicate_of'] = result['duplicate']['id']
+        except Exception as e:
+            logger.error(f"Bulk upload {batch['id']}: {item['filename']} failed: {e}", exc_info=True)
+            item['status'] = 'failed'
+            item['error'] = str(e)
+        bulk_files.inc(status=item['status'])
+
+        with self._lock:
+            batch['remaining'] -= 1
+            last = batch['remaining'] == 0
+        if last:
+            self._finish(batch, app)
+
+    def _run_pdf(self, batch, item, process) -> dict:
+        """Import a PDF as a document of its own, counting its pages as they finish"""
+        def on_page(pages, result):
+            item['pages'] = pages
+            item['pages_done'] += 1
+
+        try:
+            imported = import_pdf(item['filepath'], item['filename'], batch['user_id'],
+                                  os.path.dirname(item['filepath']), process, on_page=on_page)
+        except PdfImportError as e:
+            logger.warning(f"Bulk upload {batch['id']}: cannot import {item['filename']}: {e}")
+            return {'status': 'failed', 'photo': None, 'duplicate': None, 'error': str(e)}
+
+        failed = sum(1 for page in imported['pages'] if page['status'] == 'failed')
+        error = f"{failed} of {len(imported['pages'])} page(s) failed" if failed else None
+        if imported['document'] is None:
+            return {'status': 'failed', 'photo': None, 'duplicate': None, 'error': error or 'No pages were imported'}
+        item['document_id'] = imported['document']['id']
+        return {'status': 'created', 'photo': None, 'duplicate': None, 'error': error}
+
+    def _finish(self, batch, app) -> None:
+        if batch['build_document']:
+            pages = sorted((item for item in batch['items'] if item['photo_id']),
+                           key=lambda item: natural_sort_key(item['filename']))
+            if pages:
+                with app.app_context():
+                    document = create_document(batch['user_id'], batch['document_name'],
+                                               [item['photo_id'] for item in pages])
+                if document:
+                    batch['document_id'] = document['id']
+        batch['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        batch['status'] = 'done'
+        logger.info(f"Bulk upload {batch['id']} finished: {self.counts(batch)}")
+
+    @staticmethod
+    def counts(batch: dict) -> dict:
+        counts = {}
+        for item in batch['items']:
+            counts[item['status']] = counts.get(item['status'], 0) + 1
+        return counts
+
+    def status(self, batch: dict) -> dict:
+        """JSON-safe view of a batch for polling"""
+        items = [{key: item[key] for key in ('filename', 'status', 'photo_id', 'duplicate_of', 'error',
+                                             'pages', 'pages_done', 'document_id') if key in item}
+                 for item in batch['items']]
+        finished = sum(1 for item in items if item['status'] not in ('queued', 'processing'))
+        return {
+            'id': batch['id'],
+            'status': batch['status'],
+            'created_at': batch['created_at'],
+            'finished_at': batch['finished_at'],
+            'total': len(items),
+            'finished': finished,
+            'counts': self.counts(batch),
+            'document_id': batch['document_id'],
+            'items': items
+        }
+
+
+bulk_batches = BatchManager(workers=int(os.environ.get('BULK_UPLOAD_WORKERS', 2)))
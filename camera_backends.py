@@ -0,0 +1,361 @@
+"""
+Camera backends for RPi PhotoDoc OCR application.
+RPiCamera talks to the hardware through a CameraBackend so the capture and
+streaming paths can also run off-device against a simulated camera.
+
+Select the backend with environment variables:
+    CAMERA_BACKEND            'picamera2' (default) or 'simulated'
+    SIMULATED_CAMERA_SOURCE   Directory of images (or a single image) to replay;
+                              a synthetic document page is generated when unset
+    SIMULATED_CAMERA_FPS      Frame rate of the simulated stream (default 30)
+    SIMULATED_CAMERA_LATENCY  Seconds each still capture takes (default 0.0)
+"""
+
+import os
+import time
+import glob
+import logging
+from abc import ABC, abstractmethod
+from threading import Event, Lock, Thread
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class CameraBackend(ABC):
+    """
+    Minimal camera surface used by RPiCamera and the camera-based enhancers.
+
+    Method names follow Picamera2 (start, stop, capture_file, capture_array,
+    capture_metadata, set_controls) so enhancers that were written against a
+    Picamera2 object keep working with any backend.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def configure_video(self, main_size: Tuple[int, int], lores_size: Tuple[int, int],
+                        frame_rate: int, rotation: int = 0) -> None:
+        """Configure a main + lores (YUV420) stream pair for live preview."""
+
+    @abstractmethod
+    def configure_still(self, size: Tuple[int, int], buffer_count: Optional[int] = None) -> None:
+        """Configure a single full-resolution still stream."""
+
+    @abstractmethod
+    def start(self) -> None:
+        """Start the camera with the current configuration."""
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Stop the camera."""
+
+    @abstractmethod
+    def start_jpeg_encoder(self, output, quality: int) -> None:
+        """Encode the lores stream as MJPEG into output (anything with write(bytes))."""
+
+    @abstractmethod
+    def start_h264_encoder(self, output, bitrate: int, iperiod: int) -> None:
+        """Encode the lores stream as H.264 into output (a Picamera2-style Output)."""
+
+    @abstractmethod
+    def stop_encoder(self) -> None:
+        """Stop the running preview encoder."""
+
+    @abstractmethod
+    def capture_file(self, filepath: str, wait: bool = True) -> None:
+        """Capture a still from the main stream into filepath."""
+
+    @abstractmethod
+    def capture_array(self, name: str = 'main'):
+        """Capture a frame from the main stream as an RGB numpy array."""
+
+    @abstractmethod
+    def capture_metadata(self) -> dict:
+        """Metadata (ExposureTime, AfMode, AfState, LensPosition, ...) of the next frame."""
+
+    @abstractmethod
+    def set_controls(self, controls: dict) -> None:
+        """Set camera controls (ExposureTime, AfMode, AfTrigger, ...)."""
+
+    def current_controls(self) -> dict:
+        """Controls set since the camera was configured; the sensor defaults apply to the rest."""
+        return {}
+
+    def close(self) -> None:
+        """Release the camera."""
+
+
+class Picamera2Backend(CameraBackend):
+    """Raspberry Pi camera through Picamera2 and the hardware encoders."""
+
+    name = 'picamera2'
+
+    def __init__(self):
+        from picamera2 import Picamera2
+        self._camera = Picamera2()
+        self._controls = {}
+
+    def configure_video(self, main_size, lores_size, frame_rate, rotation=0):
+        from libcamera import Transform
+        transform = Transform(rotation=rotation) if rotation else Transform()
+        config = self._camera.create_video_configuration(
+            main={"size": main_size, "format": "RGB888"},
+            lores={"size": lores_size, "format": "YUV420"},
+            transform=transform,
+            controls={"FrameRate": frame_rate}
+        )
+        self._camera.configure(config)
+        self._controls = {"FrameRate": frame_rate}
+
+    def configure_still(self, size, buffer_count=None):
+        kwargs = {'buffer_count': buffer_count} if buffer_count else {}
+        config = self._camera.create_still_configuration(main={"size": size}, **kwargs)
+        self._camera.configure(config)
+        self._controls = {}
+
+    def start(self):
+        self._camera.start()
+
+    def stop(self):
+        self._camera.stop()
+
+    def start_jpeg_encoder(self, output, quality):
+        from picamera2.encoders import JpegEncoder
+        from picamera2.outputs import FileOutput
+        self._camera.start_encoder(JpegEncoder(q=quality), FileOutput(output), name='lores')
+
+    def start_h264_encoder(self, output, bitrate, iperiod):
+        from picamera2.encoders import H264Encoder
+        encoder = H264Encoder(bitrate=bitrate, repeat=True, iperiod=iperiod)
+        self._camera.start_encoder(encoder, output, name='lores')
+
+    def stop_encoder(self):
+        self._camera.stop_encoder()
+
+    def capture_file(self, filepath, wait=True):
+        self._camera.capture_file(filepath, wait=wait)
+
+    def capture_array(self, name='main'):
+        return self._camera.capture_array(name)
+
+    def capture_metadata(self):
+        return self._camera.capture_metadata()
+
+    def set_controls(self, controls):
+        self._camera.set_controls(controls)
+        self._controls.update(controls)
+
+    def current_controls(self):
+        # Picamera2 drops the controls set so far when it is reconfigured
+        return dict(self._controls)
+
+    def close(self):
+        self._camera.close()
+
+
+class SimulatedCameraBackend(CameraBackend):
+    """
+    Camera replaying an image sequence (or a synthetic page) with realistic timing.
+
+    Frames are served at the configured frame rate and every still capture
+    blocks for capture_latency seconds, so capture throughput, preview fan-out
+    and the enhancement/OCR pipeline can be load-tested without a Pi.
+    Controls are stored and echoed back in the metadata; autofocus always
+    reports "focused".
+    """
+
+    name = 'simulated'
+
+    def __init__(self, source: Optional[str] = None, fps: float = 30.0, capture_latency: float = 0.0):
+        """
+        Args:
+            source: Directory of images or a single image file; None for a synthetic page
+            fps: Frame rate of the simulated sensor
+            capture_latency: Seconds a still capture takes
+        """
+        import cv2
+        import numpy as np
+        self._cv2 = cv2
+        self._np = np
+
+        self.fps = max(float(fps), 1.0)
+        self.capture_latency = max(float(capture_latency), 0.0)
+        self.controls = {'AfMode': 0, 'ExposureTime': 20000, 'AnalogueGain': 1.0}
+        self.main_size = (1920, 1080)
+        self.lores_size = (1280, 720)
+        self.rotation = 0
+        self.running = False
+        self.frame_index = 0
+
+        self._sources = self._load_sources(source)
+        self._lock = Lock()
+        self._encoder_stop = Event()
+        self._encoder_thread = None
+        logger.info(f"Simulated camera using {len(self._sources)} source frame(s) at {self.fps} fps, "
+                    f"capture latency {self.capture_latency}s")
+
+    def _load_sources(self, source):
+        cv2 = self._cv2
+        if source:
+            if os.path.isdir(source):
+                paths = sorted(p for p in glob.glob(os.path.join(source, '*'))
+                               if p.lower().endswith(IMAGE_EXTENSIONS))
+            else:
+                paths = [source]
+            images = [img for img in (cv2.imread(p) for p in paths) if img is not None]
+            if images:
+                return images
+            logger.warning(f"No readable images in simulated camera source '{source}', using synthetic page")
+        return [self._synthetic_page()]
+
+    def _synthetic_page(self, size=(2304, 1296)):
+        """A document-like test image: off-white page with lines of dark text."""
+        cv2, np = self._cv2, self._np
+        width, height = size
+        page = np.full((height, width, 3), (205, 200, 190), dtype=np.uint8)
+        margin = width // 10
+        cv2.rectangle(page, (margin, margin // 2), (width - margin, height - margin // 2), (245, 245, 240), -1)
+        line_height = 48
+        text = "The quick brown fox jumps over the lazy dog 0123456789"
+        for i, y in enumerate(range(margin, height - margin, line_height)):
+            cv2.putText(page, f"{i + 1:02d} {text}", (margin + 40, y), cv2.FONT_HERSHEY_SIMPLEX,
+                        1.1, (30, 30, 30), 2, cv2.LINE_AA)
+        return page
+
+    def _next_frame(self, size):
+        """Next source frame (BGR) resized to size, advancing at the simulated frame rate."""
+        cv2 = self._cv2
+        with self._lock:
+            image = self._sources[self.frame_index % len(self._sources)]
+            self.frame_index += 1
+        if self.rotation in (90, 270):
+            image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE if self.rotation == 90 else cv2.ROTATE_90_COUNTERCLOCKWISE)
+        if (image.shape[1], image.shape[0]) != tuple(size):
+            image = cv2.resize(image, tuple(size), interpolation=cv2.INTER_AREA)
+        return image
+
+    def configure_video(self, main_size, lores_size, frame_rate, rotation=0):
+        self.main_size = tuple(main_size)
+        self.lores_size = tuple(lores_size)
+        self.rotation = rotation
+        self.controls['FrameRate'] = frame_rate
+
+    def configure_still(self, size, buffer_count=None):
+        self.main_size = tuple(size)
+        self.rotation = 0
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def _run_encoder(self, encode):
+        interval = 1.0 / self.fps
+        next_time = time.monotonic()
+        while not self._encoder_stop.is_set():
+            encode(self._next_frame(self.lores_size))
+            next_time += interval
+            self._encoder_stop.wait(max(0.0, next_time - time.monotonic()))
+
+    def _start_encoder_thread(self, encode):
+        self.stop_encoder()
+        self._encoder_stop.clear()
+        self._encoder_thread = Thread(target=self._run_encoder, args=(encode,),
+                                      name='SimulatedEncoder', daemon=True)
+        self._encoder_thread.start()
+
+    def start_jpeg_encoder(self, output, quality):
+        cv2 = self._cv2
+
+        def encode(frame):
+            ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if ok:
+                output.write(buf.tobytes())
+
+        self._start_encoder_thread(encode)
+
+    def start_h264_encoder(self, output, bitrate, iperiod):
+        # No software H.264 encoder here: push structurally valid but synthetic
+        # access units so fan-out and muxing can still be load-tested.
+        from h264_stream import FakeH264Source
+        source = FakeH264Source(output, fps=int(self.fps), keyframe_interval=iperiod,
+                                frame_size=max(bitrate // (8 * int(self.fps)), 100))
+        counter = {'index': 0}
+
+        def encode(_frame):
+            data, keyframe = source.make_frame(counter['index'])
+            counter['index'] += 1
+            output.outputframe(data, keyframe, int(time.monotonic() * 1_000_000))
+
+        self._start_encoder_thread(encode)
+
+    def stop_encoder(self):
+        self._encoder_stop.set()
+        if self._encoder_thread and self._encoder_thread.is_alive():
+            self._encoder_thread.join(timeout=2.0)
+        self._encoder_thread = None
+
+    def capture_file(self, filepath, wait=True):
+        frame = self._capture_still()
+        if not self._cv2.imwrite(filepath, frame):
+            raise RuntimeError(f"Simulated camera could not write {filepath}")
+
+    def _capture_still(self):
+        if self.capture_latency:
+            time.sleep(self.capture_latency)
+        return self._next_frame(self.main_size)
+
+    def capture_array(self, name='main'):
+        frame = self._capture_still()
+        exposure = self.controls.get('ExposureTime')
+        if exposure:
+            # Scale brightness with exposure so bracketing produces different frames
+            frame = self._cv2.convertScaleAbs(frame, alpha=min(exposure / 20000.0, 4.0))
+        return self._cv2.cvtColor(frame, self._cv2.COLOR_BGR2RGB)
+
+    def capture_metadata(self):
+        time.sleep(1.0 / self.fps)
+        af_mode = self.controls.get('AfMode', 0)
+        return {
+            'ExposureTime': self.controls.get('ExposureTime', 20000),
+            'AnalogueGain': self.controls.get('AnalogueGain', 1.0),
+            'FrameDuration': int(1_000_000 / self.fps),
+            'SensorTimestamp': time.monotonic_ns(),
+            'AfMode': af_mode,
+            'AfState': 2 if af_mode else 0,  # 2 = focused
+            'LensPosition': 1.0
+        }
+
+    def set_controls(self, controls):
+        self.controls.update(controls)
+
+    def current_controls(self):
+        return dict(self.controls)
+
+    def close(self):
+        self.stop_encoder()
+        self.running = False
+
+
+def create_camera_backend(backend: Optional[str] = None) -> CameraBackend:
+    """
+    Create the camera backend selected by CAMERA_BACKEND (or the argument).
+
+    Raises:
+        ValueError: Unknown backend name
+        Exception: Whatever the backend raises when the camera cannot be opened
+    """
+    backend = (backend or os.environ.get('CAMERA_BACKEND', 'picamera2')).lower()
+    if backend == 'picamera2':
+        return Picamera2Backend()
+    if backend == 'simulated':
+        return SimulatedCameraBackend(
+            source=os.environ.get('SIMULATED_CAMERA_SOURCE') or None,
+            fps=float(os.environ.get('SIMULATED_CAMERA_FPS', 30)),
+            capture_latency=float(os.environ.get('SIMULATED_CAMERA_LATENCY', 0.0))
+        )
+    raise ValueError(f"Unknown camera backend '{backend}' (expected 'picamera2' or 'simulated')")
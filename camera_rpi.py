@@ -1,10 +1,9 @@
 import time
 import io
 from threading import Condition, Lock
-from picamera2 import Picamera2
-from picamera2.encoders import JpegEncoder
-from picamera2.outputs import FileOutput
-from libcamera import Transform
+from camera_backends import create_camera_backend
+from h264_stream import H264StreamingOutput
+from startup import startup_tracker
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,9 +19,21 @@ class StreamingOutput(io.BufferedIOBase):
             self.condition.notify_all()
 
 class RPiCamera:
+    # Preview stream parameters (lores stream + MJPEG encoder)
+    STREAM_MAIN_SIZE = (1920, 1080)
+    STREAM_LORES_SIZE = (1280, 720)
+    STREAM_JPEG_QUALITY = 70
+    STREAM_FRAME_RATE = 30
+    STILL_SIZE = (4608, 2592)
+    # H.264 preview (hardware encoder, one keyframe per second)
+    STREAM_H264_BITRATE = 2_000_000
+    PREVIEW_CODECS = ('mjpeg', 'h264')
+
     _instance = None
     _camera = None
     _streaming_output = None
+    _h264_output = None
+    preview_codec = 'mjpeg'
     _is_streaming = False
     _is_initialized = False
     _camera_lock = Lock()
@@ -32,19 +43,16 @@ class RPiCamera:
         if cls._instance is None:
             cls._instance = super(RPiCamera, cls).__new__(cls)
             try:
-                cls._camera = Picamera2()
+                cls._camera = create_camera_backend()
                 # Initial configuration
-                cls.video_config = cls._camera.create_video_configuration(
-                    main={"size": (1920, 1080), "format": "RGB888"},
-                    lores={"size": (1280, 720), "format": "YUV420"},
-                    controls={"FrameRate": 30}
-                )
-                cls._camera.configure(cls.video_config)
+                cls._camera.configure_video(cls.STREAM_MAIN_SIZE, cls.STREAM_LORES_SIZE, cls.STREAM_FRAME_RATE)
                 cls._streaming_output = StreamingOutput()
+                width, height = cls.STREAM_LORES_SIZE
+                cls._h264_output = H264StreamingOutput(width, height, cls.STREAM_FRAME_RATE)
                 cls._is_initialized = True
-                logger.info("RPiCamera initialized successfully.")
+                logger.info(f"RPiCamera initialized successfully ({cls._camera.name} backend).")
             except Exception as e:
-                logger.error(f"Critical: Failed to initialize Picamera2: {e}. RPi Camera features will be unavailable.")
+                logger.error(f"Critical: Failed to initialize camera backend: {e}. RPi Camera features will be unavailable.")
                 cls._camera = None
                 cls._is_initialized = False
         return cls._instance
@@ -64,6 +72,34 @@ class RPiCamera:
                 self._stop_streaming_internal()
                 self._start_streaming_internal()
 
+    def set_preview_codec(self, codec: str):
+        """Switch the live preview between MJPEG and hardware H.264 (restarts an active stream)"""
+        if codec not in self.PREVIEW_CODECS:
+            logger.warning(f"Unknown preview codec '{codec}', keeping {self.preview_codec}")
+            return
+        with self._camera_lock:
+            if self.preview_codec == codec:
+                return
+            self.preview_codec = codec
+            logger.info(f"Preview codec set to {codec}. Restarting stream if active.")
+            if self._is_streaming:
+                self._stop_streaming_internal()
+                self._start_streaming_internal()
+
+    def _start_preview_encoder(self):
+        """Start the lores encoder for the selected preview codec, falling back to MJPEG"""
+        if self.preview_codec == 'h264':
+            try:
+                width, height = self.get_stream_size()
+                self._h264_output.reset(width, height)
+                self._camera.start_h264_encoder(self._h264_output, self.STREAM_H264_BITRATE, self.STREAM_FRAME_RATE)
+                return
+            except Exception as e:
+                logger.error(f"Could not start H.264 preview encoder, falling back to MJPEG: {e}")
+                self.preview_codec = 'mjpeg'
+
+        self._camera.start_jpeg_encoder(self._streaming_output, self.STREAM_JPEG_QUALITY)
+
     def _start_streaming_internal(self):
         """Internal method that assumes lock is already held"""
         if not self.is_available():
@@ -73,26 +109,16 @@ class RPiCamera:
             logger.info("Streaming is already active.")
             return True
         try:
-            # Set up transform for portrait mode
-            transform = Transform()
-            if self.portrait_mode:
-                transform = Transform(rotation=90)
-            
-            # Create and apply video configuration
-            self.video_config = self._camera.create_video_configuration(
-                main={"size": (1920, 1080), "format": "RGB888"},
-                lores={"size": (1280, 720), "format": "YUV420"},
-                transform=transform,
-                controls={"FrameRate": 30}
-            )
-            self._camera.configure(self.video_config)
+            # Create and apply video configuration (rotated for portrait mode)
+            rotation = 90 if self.portrait_mode else 0
+            self._camera.configure_video(self.STREAM_MAIN_SIZE, self.STREAM_LORES_SIZE,
+                                         self.STREAM_FRAME_RATE, rotation=rotation)
             
             # Start encoder and camera
-            encoder = JpegEncoder(q=70)
-            self._camera.start_encoder(encoder, FileOutput(self._streaming_output), name='lores')
+            self._start_preview_encoder()
             self._camera.start()
             self._is_streaming = True
-            logger.info(f"Camera streaming started. Portrait mode: {self.portrait_mode}.")
+            logger.info(f"Camera streaming started. Portrait mode: {self.portrait_mode}. Codec: {self.preview_codec}.")
             return True
         except Exception as e:
             logger.error(f"Could not start camera streaming: {e}")
@@ -119,6 +145,21 @@ class RPiCamera:
         with self._camera_lock:
             self._stop_streaming_internal()
 
+    def get_stream_size(self):
+        """(width, height) of the preview frames as delivered to clients (after portrait rotation)"""
+        width, height = self.STREAM_LORES_SIZE
+        return (height, width) if self.portrait_mode else (width, height)
+
+    def get_stream_width(self):
+        """Width of the preview frames as delivered to clients (after portrait rotation)"""
+        return self.get_stream_size()[0]
+
+    def get_h264_output(self):
+        """Shared H.264 preview output, or None when the H.264 preview is not running"""
+        if not self.is_available() or not self._is_streaming or self.preview_codec != 'h264':
+            return None
+        return self._h264_output
+
     def get_frame(self):
         if not self.is_available() or not self._is_streaming:
             logger.warning("get_frame called but camera not available or not streaming.")
@@ -157,13 +198,9 @@ class RPiCamera:
                 logger.info(f"Configuring for still capture (portrait mode: {self.portrait_mode})...")
                 
                 # Always capture in landscape mode first - no transforms
-                still_config = self._camera.create_still_configuration(
-                    main={"size": (4608, 2592)}
-                )
-                
                 # Configure the camera with the still config
                 logger.info("Applying still configuration to camera...")
-                self._camera.configure(still_config)
+                self._camera.configure_still(self.STILL_SIZE)
                 
                 # Start camera and capture
                 logger.info("Starting camera and capturing image...")
@@ -319,13 +356,28 @@ class RPiCamera:
             logger.error(f"Failed to get autofocus state: {e}")
             return {"available": False, "error": str(e)}
 
-# Global instance for easy access from Flask routes
-rpi_camera_instance = RPiCamera()
+# Shared instance for Flask routes, created on first use so importing this
+# module does not open and configure the camera
+_camera_instance = None
+_camera_instance_lock = Lock()
+
+def get_camera():
+    """Return the shared RPiCamera, initializing the camera on first call"""
+    global _camera_instance
+    if _camera_instance is None:
+        with _camera_instance_lock:
+            if _camera_instance is None:
+                with startup_tracker.warming('camera'):
+                    camera = RPiCamera()
+                    if not camera.is_available():
+                        startup_tracker.mark_failed('camera', 'Camera backend failed to initialize')
+                _camera_instance = camera
+    return _camera_instance
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
     print("Attempting to initialize RPiCamera...")
-    cam = rpi_camera_instance
+    cam = get_camera()
 
     if cam.is_available():
         print("Camera is available.")
@@ -0,0 +1,167 @@
+"""
+Capture quality gate for RPi PhotoDoc OCR application.
+Scores sharpness and exposure of a captured frame (or a preview frame) in a
+few milliseconds so blurry or badly exposed shots are re-taken before the
+enhance -> OCR -> LLM pipeline spends any time on them.
+"""
+
+import os
+import time
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# libcamera AfState values
+AF_STATE_FOCUSED = 2
+AF_STATE_FAILED = 3
+
+
+class CaptureQualityScorer:
+    """
+    Sharpness and exposure scores on a small grayscale copy.
+
+    Every frame is scaled to the same analysis width, so thresholds do not
+    depend on the capture or preview resolution.
+    """
+
+    def __init__(self, min_sharpness: float = 60.0, min_brightness: float = 40.0,
+                 max_brightness: float = 225.0, max_clipped: float = 0.05, analysis_width: int = 1024):
+        """
+        Args:
+            min_sharpness: Minimum variance of the Laplacian
+            min_brightness: Minimum mean gray level
+            max_brightness: Maximum mean gray level
+            max_clipped: Maximum fraction of fully black or fully white pixels
+            analysis_width: Width the frame is scaled to before scoring
+        """
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.max_clipped = max_clipped
+        self.analysis_width = analysis_width
+
+    @classmethod
+    def from_settings(cls, ingest_settings: dict) -> 'CaptureQualityScorer':
+        return cls(
+            min_sharpness=float(ingest_settings.get('min_sharpness', 60.0)),
+            min_brightness=float(ingest_settings.get('min_brightness', 40.0)),
+            max_brightness=float(ingest_settings.get('max_brightness', 225.0))
+        )
+
+    def score(self, gray: np.ndarray) -> dict:
+        """
+        Score a grayscale frame.
+
+        Args:
+            gray: Grayscale image (any size)
+
+        Returns:
+            dict: sharpness, brightness, clipped, ok and the reasons for failing
+        """
+        if gray.shape[1] != self.analysis_width:
+            scale = self.analysis_width / gray.shape[1]
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        sharpness = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+        brightness = float(gray.mean())
+        clipped = float(np.count_nonzero((gray <= 2) | (gray >= 253))) / gray.size
+
+        reasons = []
+        if sharpness < self.min_sharpness:
+            reasons.append('blurry')
+        if brightness < self.min_brightness:
+            reasons.append('underexposed')
+        elif brightness > self.max_brightness:
+            reasons.append('overexposed')
+        if clipped > self.max_clipped:
+            reasons.append('clipped')
+
+        return {
+            'sharpness': round(sharpness, 1),
+            'brightness': round(brightness, 1),
+            'clipped': round(clipped, 4),
+            'ok': not reasons,
+            'reasons': reasons
+        }
+
+    def score_file(self, filepath: str):
+        """
+        Score an image file. Large JPEGs are decoded at reduced size directly.
+
+        Returns:
+            dict: See score(), or None if the file cannot be read
+        """
+        gray = cv2.imread(filepath, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if gray is None:
+            logger.error(f"Failed to read image for quality scoring: {filepath}")
+            return None
+        return self.score(gray)
+
+    def score_jpeg(self, jpeg_bytes: bytes):
+        """
+        Score an encoded preview frame.
+
+        Returns:
+            dict: See score(), or None if the frame cannot be decoded
+        """
+        gray = cv2.imdecode(np.frombuffer(jpeg_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        return self.score(gray) if gray is not None else None
+
+
+def _wait_for_focus(camera, timeout: float = 2.0) -> None:
+    """Poll the autofocus state until the lens settles or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = camera.get_autofocus_state()
+        if not state.get('available') or state.get('af_state') in (AF_STATE_FOCUSED, AF_STATE_FAILED):
+            return
+        time.sleep(0.1)
+
+
+def capture_with_quality_gate(camera, filepath: str, ingest_settings: dict) -> dict:
+    """
+    Score a capture that was just written to filepath and re-shoot it (with
+    an autofocus trigger) while it fails the gate. The best attempt is kept
+    at filepath.
+
+    Args:
+        camera: RPiCamera used for the original capture
+        filepath: Path of the captured image
+        ingest_settings: User ingest settings
+
+    Returns:
+        dict: Score of the kept image plus 'attempts'
+    """
+    scorer = CaptureQualityScorer.from_settings(ingest_settings)
+    max_attempts = max(1, int(ingest_settings.get('max_capture_attempts', 3)))
+    refocus = ingest_settings.get('autofocus_on_retry', True)
+
+    best = scorer.score_file(filepath) or {'ok': False, 'reasons': ['unreadable'], 'sharpness': 0.0}
+    best['attempts'] = 1
+    logger.info(f"Capture quality attempt 1: {best}")
+
+    root, extension = os.path.splitext(filepath)
+    retry_path = f"{root}_retry{extension}"
+    attempt = 1
+    while not best['ok'] and attempt < max_attempts:
+        attempt += 1
+        if refocus and 'blurry' in best['reasons']:
+            if camera.trigger_autofocus():
+                _wait_for_focus(camera)
+
+        if not camera.capture_image(retry_path):
+            logger.warning(f"Re-capture attempt {attempt} failed")
+            continue
+
+        score = scorer.score_file(retry_path)
+        logger.info(f"Capture quality attempt {attempt}: {score}")
+        if score and (score['ok'] or score['sharpness'] > best['sharpness']):
+            os.replace(retry_path, filepath)
+            best = score
+        best['attempts'] = attempt
+
+    if os.path.exists(retry_path):
+        os.remove(retry_path)
+    return best
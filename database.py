@@ -14,6 +14,22 @@ logger = logging.getLogger(__name__)
 
 DATABASE_NAME = 'photodoc.db'
 
+# Columns added after the first release: (table, column, definition).
+# CREATE TABLE IF NOT EXISTS leaves existing tables alone, so init_db adds these.
+ADDED_COLUMNS = [
+    ('photos', 'processing_timings', 'TEXT'),  # JSON: milliseconds per pipeline stage
+    ('photos', 'source_sha256', 'TEXT'),  # SHA-256 of the file as uploaded, before enhancement
+    ('photos', 'phash', 'TEXT'),  # dHash of the image before enhancement (hex)
+    ('photos', 'duplicate_of', 'TEXT'),  # Photo this one was flagged as a near-duplicate of
+    ('photos', 'processing_inputs', 'TEXT'),  # JSON: fingerprints of the OCR/cleanup inputs (reprocess.py)
+]
+
+# Indexes on ADDED_COLUMNS, created once the columns exist: (name, table, columns)
+ADDED_INDEXES = [
+    ('idx_photos_user_source_sha256', 'photos', 'user_id, source_sha256'),
+    ('idx_photos_user_phash', 'photos', 'user_id, phash'),
+]
+
 def get_db_path():
     """Get the path to the SQLite database file"""
     config_dir = os.path.join(current_app.root_path, 'config')
@@ -74,6 +90,11 @@ def init_db():
             original_ocr_text TEXT,
             ai_cleaned_text TEXT,
             edited_text TEXT,
+            processing_timings TEXT,
+            source_sha256 TEXT,
+            phash TEXT,
+            duplicate_of TEXT,
+            processing_inputs TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
@@ -112,6 +133,18 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
         );
         
+        -- OCR results keyed by the SHA-256 of the OCR'd image and the OCR parameters
+        CREATE TABLE IF NOT EXISTS ocr_cache (
+            image_sha256 TEXT NOT NULL,
+            params TEXT NOT NULL,       -- JSON: languages, detail_level, paragraph_mode, preprocessing
+            engine TEXT NOT NULL,       -- 'easyocr-<version>' or 'remote:<server url>'
+            result TEXT NOT NULL,       -- JSON: text, or detections for detail_level > 0
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (image_sha256, params, engine)
+        );
+        
         -- Indexes for better performance
         CREATE INDEX IF NOT EXISTS idx_photos_user_id ON photos(user_id);
         CREATE INDEX IF NOT EXISTS idx_photos_created_at ON photos(created_at);
@@ -119,6 +152,7 @@ def init_db():
         CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents(created_at);
         CREATE INDEX IF NOT EXISTS idx_document_photos_order ON document_photos(document_id, order_index);
         CREATE INDEX IF NOT EXISTS idx_user_settings_user_category ON user_settings(user_id, category);
+        CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache(last_used_at);
         
         -- Triggers to automatically update timestamps
         CREATE TRIGGER IF NOT EXISTS update_users_timestamp 
@@ -146,9 +180,20 @@ def init_db():
             WHERE user_id = NEW.user_id AND category = NEW.category AND setting_key = NEW.setting_key;
         END;
         ''')
-        
+
+        add_missing_columns(conn)
         logger.info(f"Database initialized successfully at {db_path}")
 
+def add_missing_columns(conn):
+    """Add ADDED_COLUMNS (and ADDED_INDEXES) to tables created by an older version"""
+    for table, column, definition in ADDED_COLUMNS:
+        existing = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            logger.info(f"Added column {table}.{column}")
+    for name, table, columns in ADDED_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+
 def reset_db():
     """Reset the database by dropping all tables and recreating them"""
     db_path = get_db_path()
@@ -165,6 +210,7 @@ def reset_db():
         conn.execute("DROP TABLE IF EXISTS documents")
         conn.execute("DROP TABLE IF EXISTS photos")
         conn.execute("DROP TABLE IF EXISTS user_settings")
+        conn.execute("DROP TABLE IF EXISTS ocr_cache")
         conn.execute("DROP TABLE IF EXISTS users")
         
         logger.info("Database reset - all tables dropped")
@@ -7,9 +7,11 @@ import uuid
 import logging
 from datetime import datetime
 from database import get_db, get_db_connection
+from metrics import timed
 
 logger = logging.getLogger(__name__)
 
+@timed('db.create_document')
 def create_document(user_id, name, photo_ids):
     """Create a new document with specified photos"""
     try:
@@ -125,6 +127,7 @@ def load_all_documents_for_user(user_id):
         logger.error(f"Error loading documents for user {user_id}: {e}")
         return []
 
+@timed('db.update_document')
 def update_document(user_id, doc_id, update_data):
     """Update a document's data"""
     try:
@@ -178,6 +181,7 @@ def update_document(user_id, doc_id, update_data):
         logger.error(f"Error updating document {doc_id}: {e}")
         return False
 
+@timed('db.delete_document')
 def delete_document(user_id, doc_id):
     """Delete a document and its photo associations"""
     try:
@@ -199,6 +203,7 @@ def delete_document(user_id, doc_id):
         logger.error(f"Error deleting document {doc_id}: {e}")
         return False
 
+@timed('db.remove_photo_from_document')
 def remove_photo_from_document(user_id, doc_id, photo_id):
     """Remove a specific photo from a document"""
     try:
@@ -0,0 +1,139 @@
+"""
+Near-duplicate detection for RPi PhotoDoc OCR application.
+A difference hash (dHash) of each captured or uploaded image is stored with
+the photo. New images are compared against the user's recent photos by
+Hamming distance, so a page that was shot or uploaded twice can be flagged
+or skipped before enhancement, OCR and LLM cleanup run on it.
+
+On a text page many neighbouring cells are within a gray level or two of
+each other. Their gradient bits flip with sensor noise, a small shift or the
+illumination falloff. The hash therefore stores a mask of the gradients
+that are clear enough to trust, and only those bits are compared.
+"""
+
+import logging
+from typing import Optional
+import cv2
+import numpy as np
+from database import get_db
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# 16x16 gradients (256 bits): document pages share the same overall layout,
+# so the usual 8x8 hash cannot tell different pages of one book apart
+HASH_SIZE = 16
+# Gradients smaller than this (gray levels, between cell means) are treated as ties and not compared
+TIE_LEVELS = 2.5
+# Fewer comparable bits than this (blank or very flat pages) cannot tell pages apart
+MIN_COMPARED_BITS = 32
+
+duplicate_checks = registry.counter(
+    'duplicate_checks_total', 'Near-duplicate checks at ingest by outcome.', ['source', 'outcome'])
+
+
+def dhash(image_path: str, hash_size: int = HASH_SIZE) -> Optional[str]:
+    """
+    Difference hash of an image file.
+
+    Args:
+        image_path: Image file
+        hash_size: Gradients per row and column
+
+    Returns:
+        str: Gradient bits followed by the mask of trusted bits, as hex (2 * hash_size * hash_size bits),
+             or None if the image cannot be read
+    """
+    # Decoding at 1/8 scale skips most of the JPEG work on a 12 MP capture
+    gray = cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        logger.warning(f"Could not read {image_path} for hashing")
+        return None
+    # Float cell means: a uint8 resize rounds small gradients to ties that noise then decides
+    small = cv2.resize(gray.astype(np.float32), (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    gradient = small[:, 1:] - small[:, :-1]
+    bits = (gradient > 0).flatten()
+    mask = (np.abs(gradient) >= TIE_LEVELS).flatten()
+    return np.packbits(bits).tobytes().hex() + np.packbits(mask).tobytes().hex()
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """
+    Differing bits between two hashes from dhash(), counted over the bits both
+    masks trust and scaled to the full hash length. Hashes with too few
+    comparable bits are as far apart as possible.
+    """
+    half = len(hash_a) // 2
+    bits = half * 4
+    compared = int(hash_a[half:], 16) & int(hash_b[half:], 16)
+    compared_bits = bin(compared).count('1')
+    if compared_bits < MIN_COMPARED_BITS:
+        return bits
+    differing = bin((int(hash_a[:half], 16) ^ int(hash_b[:half], 16)) & compared).count('1')
+    return round(differing * bits / compared_bits)
+
+
+def find_near_duplicate(user_id, phash: str, max_distance: int, window: int = 200) -> Optional[dict]:
+    """
+    Closest of the user's recent photos within max_distance bits of phash.
+
+    Args:
+        user_id: Owner of the photos to compare against
+        phash: Hash of the new image
+        max_distance: Largest Hamming distance that counts as a duplicate
+        window: Number of most recent photos to compare against
+
+    Returns:
+        dict: {'id', 'image_filename', 'distance'} of the closest match, or None
+    """
+    try:
+        db = get_db()
+        rows = db.execute('''
+            SELECT id, image_filename, phash FROM photos
+            WHERE user_id = ? AND phash IS NOT NULL
+            ORDER BY created_at DESC
+            LIMIT ?
+        ''', (user_id, window)).fetchall()
+
+        best = None
+        for row in rows:
+            if len(row['phash']) != len(phash):
+                continue  # Hashed with a different HASH_SIZE, or before masks were stored
+            distance = hamming_distance(phash, row['phash'])
+            if distance <= max_distance and (best is None or distance < best['distance']):
+                best = {'id': row['id'], 'image_filename': row['image_filename'], 'distance': distance}
+        return best
+
+    except Exception as e:
+        logger.error(f"Error checking for near-duplicates for user {user_id}: {e}")
+        return None
+
+
+def check_duplicate(image_path: str, user_id, ingest_settings: dict, source: str) -> dict:
+    """
+    Hash an incoming image and look for a near-duplicate according to the user's settings.
+
+    Args:
+        image_path: Captured or uploaded file, before enhancement
+        user_id: Owner
+        ingest_settings: User ingest settings
+        source: 'capture' or 'upload' (metrics label)
+
+    Returns:
+        dict: {'phash': str or None, 'duplicate': match dict or None, 'action': 'off', 'flag' or 'skip'}
+    """
+    action = ingest_settings.get('duplicate_check', 'flag')
+    phash = dhash(image_path)
+    if action not in ('flag', 'skip') or phash is None:
+        return {'phash': phash, 'duplicate': None, 'action': 'off'}
+
+    duplicate = find_near_duplicate(user_id, phash,
+                                    int(ingest_settings.get('duplicate_max_distance', 12)),
+                                    int(ingest_settings.get('duplicate_window', 200)))
+    if duplicate:
+        duplicate_checks.inc(source=source, outcome='skipped' if action == 'skip' else 'flagged')
+        logger.info(f"{source.capitalize()} {image_path} is a near-duplicate of photo {duplicate['id']} "
+                    f"(distance {duplicate['distance']}), action: {action}")
+    else:
+        duplicate_checks.inc(source=source, outcome='unique')
+    return {'phash': phash, 'duplicate': duplicate, 'action': action}
@@ -0,0 +1,456 @@
+"""
+H.264 preview streaming for RPi PhotoDoc OCR application.
+Packages the output of Picamera2's hardware H264Encoder as fragmented MP4
+so browsers can play the preview through Media Source Extensions.
+
+The output layer does not depend on picamera2: H264StreamingOutput only needs
+Annex-B access units pushed into outputframe(), so it can be driven by
+FakeH264Source on machines without a camera (see the __main__ block).
+"""
+
+import time
+import struct
+import logging
+from collections import deque
+from threading import Condition, Thread, Event
+
+logger = logging.getLogger(__name__)
+
+try:
+    from picamera2.outputs import Output as _EncoderOutputBase
+except ImportError:  # Not on a Pi - the output still works with FakeH264Source
+    _EncoderOutputBase = object
+
+# MP4 timescale for the video track (90 kHz, the usual video clock)
+TIMESCALE = 90000
+
+# H.264 NAL unit types we care about
+NAL_IDR = 5
+NAL_SEI = 6
+NAL_SPS = 7
+NAL_PPS = 8
+NAL_AUD = 9
+
+# trun sample flags
+SAMPLE_FLAGS_SYNC = 0x02000000      # sample_depends_on = 2 (I-frame)
+SAMPLE_FLAGS_NON_SYNC = 0x01010000  # depends on others, non-sync sample
+
+UNITY_MATRIX = (0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+
+
+def split_annexb(data: bytes) -> list:
+    """
+    Split an Annex-B byte stream into NAL units (start codes removed).
+
+    Args:
+        data: Bytes containing one or more 00 00 01 / 00 00 00 01 prefixed NALs
+
+    Returns:
+        list: NAL unit payloads
+    """
+    nals = []
+    length = len(data)
+    start = data.find(b'\x00\x00\x01')
+    while start != -1:
+        start += 3
+        end = data.find(b'\x00\x00\x01', start)
+        if end == -1:
+            nal = data[start:]
+        else:
+            nal = data[start:end]
+            # A 4-byte start code leaves a trailing zero on the previous NAL
+            if nal.endswith(b'\x00'):
+                nal = nal.rstrip(b'\x00')
+        if nal:
+            nals.append(nal)
+        start = end if end != -1 and end < length else -1
+    return nals
+
+
+def _box(box_type: bytes, *payload: bytes) -> bytes:
+    body = b''.join(payload)
+    return struct.pack('>I', 8 + len(body)) + box_type + body
+
+
+def _full_box(box_type: bytes, version: int, flags: int, *payload: bytes) -> bytes:
+    return _box(box_type, struct.pack('>I', (version << 24) | flags), *payload)
+
+
+def _matrix() -> bytes:
+    return struct.pack('>9I', *UNITY_MATRIX)
+
+
+def avc_codec_string(sps: bytes) -> str:
+    """RFC 6381 codec string (e.g. avc1.64001f) for a given SPS NAL unit."""
+    return 'avc1.' + sps[1:4].hex()
+
+
+def build_init_segment(sps: bytes, pps: bytes, width: int, height: int) -> bytes:
+    """
+    Build the fMP4 initialization segment (ftyp + moov) for one H.264 track.
+
+    Args:
+        sps: Sequence parameter set NAL unit (without start code)
+        pps: Picture parameter set NAL unit (without start code)
+        width: Frame width in pixels
+        height: Frame height in pixels
+
+    Returns:
+        bytes: ftyp and moov boxes
+    """
+    ftyp = _box(b'ftyp', b'isom', struct.pack('>I', 0x200), b'isom', b'iso6', b'avc1', b'mp41')
+
+    mvhd = _full_box(
+        b'mvhd', 0, 0,
+        struct.pack('>IIII', 0, 0, TIMESCALE, 0),
+        struct.pack('>IH', 0x00010000, 0x0100),
+        b'\x00' * 10,
+        _matrix(),
+        b'\x00' * 24,
+        struct.pack('>I', 2)
+    )
+
+    tkhd = _full_box(
+        b'tkhd', 0, 0x000003,
+        struct.pack('>IIIII', 0, 0, 1, 0, 0),
+        b'\x00' * 8,
+        struct.pack('>hhhH', 0, 0, 0, 0),
+        _matrix(),
+        struct.pack('>II', width << 16, height << 16)
+    )
+
+    mdhd = _full_box(b'mdhd', 0, 0, struct.pack('>IIIIHH', 0, 0, TIMESCALE, 0, 0x55C4, 0))
+    hdlr = _full_box(b'hdlr', 0, 0, struct.pack('>I', 0), b'vide', b'\x00' * 12, b'VideoHandler\x00')
+
+    avcc = _box(
+        b'avcC',
+        struct.pack('>BBBBB', 1, sps[1], sps[2], sps[3], 0xFF),
+        struct.pack('>BH', 0xE1, len(sps)), sps,
+        struct.pack('>BH', 1, len(pps)), pps
+    )
+    compressor = b'\x00' * 32
+    avc1 = _box(
+        b'avc1',
+        b'\x00' * 6, struct.pack('>H', 1),
+        b'\x00' * 16,
+        struct.pack('>HH', width, height),
+        struct.pack('>II', 0x00480000, 0x00480000),
+        struct.pack('>IH', 0, 1),
+        compressor,
+        struct.pack('>Hh', 0x0018, -1),
+        avcc
+    )
+    stsd = _full_box(b'stsd', 0, 0, struct.pack('>I', 1), avc1)
+    stbl = _box(
+        b'stbl',
+        stsd,
+        _full_box(b'stts', 0, 0, struct.pack('>I', 0)),
+        _full_box(b'stsc', 0, 0, struct.pack('>I', 0)),
+        _full_box(b'stsz', 0, 0, struct.pack('>II', 0, 0)),
+        _full_box(b'stco', 0, 0, struct.pack('>I', 0))
+    )
+    dinf = _box(b'dinf', _full_box(b'dref', 0, 0, struct.pack('>I', 1), _full_box(b'url ', 0, 1)))
+    vmhd = _full_box(b'vmhd', 0, 1, struct.pack('>HHHH', 0, 0, 0, 0))
+    minf = _box(b'minf', vmhd, dinf, stbl)
+    mdia = _box(b'mdia', mdhd, hdlr, minf)
+    trak = _box(b'trak', tkhd, mdia)
+    trex = _full_box(b'trex', 0, 0, struct.pack('>IIIII', 1, 1, 0, 0, 0))
+    mvex = _box(b'mvex', trex)
+    moov = _box(b'moov', mvhd, trak, mvex)
+
+    return ftyp + moov
+
+
+def build_media_segment(sequence: int, decode_time: int, duration: int,
+                        sample: bytes, keyframe: bool) -> bytes:
+    """
+    Build one fMP4 media segment (moof + mdat) holding a single frame.
+
+    Args:
+        sequence: Fragment sequence number (starts at 1 for each client)
+        decode_time: Decode timestamp in TIMESCALE units
+        duration: Frame duration in TIMESCALE units
+        sample: Frame data as length-prefixed (AVCC) NAL units
+        keyframe: Whether the frame is an IDR frame
+
+    Returns:
+        bytes: moof and mdat boxes
+    """
+    flags = SAMPLE_FLAGS_SYNC if keyframe else SAMPLE_FLAGS_NON_SYNC
+
+    def moof(data_offset):
+        mfhd = _full_box(b'mfhd', 0, 0, struct.pack('>I', sequence))
+        tfhd = _full_box(b'tfhd', 0, 0x020000, struct.pack('>I', 1))  # default-base-is-moof
+        tfdt = _full_box(b'tfdt', 1, 0, struct.pack('>Q', decode_time))
+        trun = _full_box(b'trun', 0, 0x000701,  # data-offset, duration, size, flags present
+                         struct.pack('>Ii', 1, data_offset),
+                         struct.pack('>III', duration, len(sample), flags))
+        return _box(b'moof', mfhd, _box(b'traf', tfhd, tfdt, trun))
+
+    moof_size = len(moof(0))
+    return moof(moof_size + 8) + _box(b'mdat', sample)
+
+
+def parse_boxes(data: bytes, offset: int = 0, end: int = None) -> list:
+    """
+    List the top-level MP4 boxes in data as (type, offset, size) tuples.
+    Used for self-checks and debugging.
+    """
+    boxes = []
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        size, box_type = struct.unpack('>I4s', data[offset:offset + 8])
+        if size < 8 or offset + size > end:
+            raise ValueError(f"Invalid box {box_type!r} of size {size} at offset {offset}")
+        boxes.append((box_type.decode('ascii'), offset, size))
+        offset += size
+    return boxes
+
+
+class H264StreamingOutput(_EncoderOutputBase):
+    """
+    Encoder output that fans H.264 frames out to fMP4 preview clients.
+
+    Picamera2 calls outputframe() for every encoded frame. Frames are kept in
+    a short ring buffer as AVCC samples; every client muxes its own fragments
+    from it (so each client's timeline starts at zero) and always starts on a
+    keyframe. A client that falls off the end of the ring waits for the next
+    keyframe instead of receiving stale frames, which keeps latency bounded.
+    """
+
+    def __init__(self, width: int, height: int, fps: int, buffer_frames: int = None):
+        """
+        Args:
+            width: Encoded frame width in pixels
+            height: Encoded frame height in pixels
+            fps: Nominal frame rate (used for frame durations)
+            buffer_frames: Ring buffer length (defaults to two seconds of video)
+        """
+        if _EncoderOutputBase is not object:
+            super().__init__()
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.condition = Condition()
+        self.frames = deque(maxlen=buffer_frames or max(2 * fps, 10))
+        self.sequence = 0
+        self.sps = None
+        self.pps = None
+        self._first_timestamp = None
+        self._last_timestamp = None
+
+    @property
+    def frame_duration(self) -> int:
+        return int(TIMESCALE / self.fps)
+
+    @property
+    def codec_string(self):
+        return avc_codec_string(self.sps) if self.sps else None
+
+    def reset(self, width: int = None, height: int = None):
+        """Drop buffered frames, e.g. when the stream is restarted with a new size."""
+        with self.condition:
+            if width:
+                self.width = width
+            if height:
+                self.height = height
+            self.frames.clear()
+            self.sps = None
+            self.pps = None
+            self._first_timestamp = None
+            self._last_timestamp = None
+            self.condition.notify_all()
+
+    def outputframe(self, frame, keyframe=True, timestamp=None, *args, **kwargs):
+        """
+        Receive one encoded access unit (Picamera2 Output interface).
+
+        Args:
+            frame: Annex-B encoded bytes for one frame
+            keyframe: True for IDR frames
+            timestamp: Sensor timestamp in microseconds
+        """
+        if kwargs.get('audio'):
+            return
+
+        nals = split_annexb(bytes(frame))
+        sample_nals = []
+        for nal in nals:
+            nal_type = nal[0] & 0x1F
+            if nal_type == NAL_SPS:
+                self.sps = nal
+            elif nal_type == NAL_PPS:
+                self.pps = nal
+            elif nal_type == NAL_AUD:
+                continue
+            else:
+                if nal_type == NAL_IDR:
+                    keyframe = True
+                sample_nals.append(nal)
+
+        if not sample_nals:
+            return
+
+        sample = b''.join(struct.pack('>I', len(nal)) + nal for nal in sample_nals)
+
+        if timestamp is None:
+            timestamp = int(time.monotonic() * 1_000_000)
+        if self._first_timestamp is None:
+            self._first_timestamp = timestamp
+        if self._last_timestamp is not None and timestamp <= self._last_timestamp:
+            timestamp = self._last_timestamp + int(1_000_000 / self.fps)
+        self._last_timestamp = timestamp
+
+        with self.condition:
+            self.sequence += 1
+            self.frames.append((self.sequence, bool(keyframe), timestamp, sample))
+            self.condition.notify_all()
+
+    def get_init_segment(self, timeout: float = 2.0):
+        """
+        Wait until SPS/PPS have been seen and return the init segment.
+
+        Returns:
+            bytes or None: ftyp+moov, or None if no parameter sets arrived in time
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.sps is None or self.pps is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+            return build_init_segment(self.sps, self.pps, self.width, self.height)
+
+    def iter_segments(self, is_active=None, wait_timeout: float = 0.5):
+        """
+        Generate fMP4 media segments for one client, starting at a keyframe.
+
+        Args:
+            is_active: Optional callable; iteration stops when it returns False
+            wait_timeout: Seconds to wait for a new frame before re-checking is_active
+
+        Yields:
+            bytes: moof+mdat for each frame
+        """
+        last_sequence = self.sequence
+        client_sequence = 0
+        base_timestamp = None
+        synced = False
+
+        while is_active is None or is_active():
+            with self.condition:
+                if not self.frames or self.frames[-1][0] <= last_sequence:
+                    self.condition.wait(wait_timeout)
+                pending = [f for f in self.frames if f[0] > last_sequence]
+
+            if not pending:
+                continue
+            if synced and pending[0][0] != last_sequence + 1:
+                # Fell behind the ring buffer - resync on the next keyframe
+                logger.info("H.264 preview client fell behind, waiting for next keyframe")
+                synced = False
+
+            for sequence, keyframe, timestamp, sample in pending:
+                last_sequence = sequence
+                if not synced:
+                    if not keyframe:
+                        continue
+                    synced = True
+                if base_timestamp is None:
+                    base_timestamp = timestamp
+                client_sequence += 1
+                decode_time = (timestamp - base_timestamp) * TIMESCALE // 1_000_000
+                yield build_media_segment(client_sequence, decode_time, self.frame_duration, sample, keyframe)
+
+
+class FakeH264Source:
+    """
+    Pushes synthetic H.264 access units into an output at a fixed rate.
+
+    The NAL payloads are not decodable video; they only carry the structure
+    (SPS/PPS on keyframes, IDR/non-IDR slices) needed to exercise the muxer,
+    fan-out and client pacing without a camera or hardware encoder.
+    """
+
+    # Baseline profile, level 3.1 - only the first bytes matter to the muxer
+    FAKE_SPS = bytes([0x67, 0x42, 0xC0, 0x1F, 0xDA, 0x01, 0x40, 0x16, 0xE8])
+    FAKE_PPS = bytes([0x68, 0xCE, 0x3C, 0x80])
+
+    def __init__(self, output, fps: int = 30, keyframe_interval: int = 30, frame_size: int = 4000):
+        self.output = output
+        self.fps = fps
+        self.keyframe_interval = keyframe_interval
+        self.frame_size = frame_size
+        self._stop = Event()
+        self._thread = None
+        self.frames_sent = 0
+
+    def make_frame(self, index: int):
+        keyframe = index % self.keyframe_interval == 0
+        start = b'\x00\x00\x00\x01'
+        aud = start + bytes([0x09, 0xF0])
+        if keyframe:
+            slice_nal = bytes([0x65]) + bytes([index & 0xFF]) * self.frame_size
+            data = aud + start + self.FAKE_SPS + start + self.FAKE_PPS + start + slice_nal
+        else:
+            slice_nal = bytes([0x41]) + bytes([index & 0xFF]) * (self.frame_size // 4)
+            data = aud + start + slice_nal
+        return data, keyframe
+
+    def push(self, count: int, start_timestamp: int = 0):
+        """Push count frames synchronously with synthetic timestamps."""
+        for _ in range(count):
+            data, keyframe = self.make_frame(self.frames_sent)
+            timestamp = start_timestamp + self.frames_sent * 1_000_000 // self.fps
+            self.output.outputframe(data, keyframe, timestamp)
+            self.frames_sent += 1
+
+    def start(self):
+        """Push frames in real time from a background thread."""
+        def run():
+            interval = 1.0 / self.fps
+            while not self._stop.is_set():
+                data, keyframe = self.make_frame(self.frames_sent)
+                self.output.outputframe(data, keyframe, int(time.monotonic() * 1_000_000))
+                self.frames_sent += 1
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._thread = Thread(target=run, name='FakeH264Source', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    print("Self-check: muxing synthetic H.264 frames into fMP4...")
+
+    output = H264StreamingOutput(1280, 720, fps=30)
+    source = FakeH264Source(output, fps=30, keyframe_interval=10)
+
+    # Frames before the client connects must not be replayed
+    source.push(5)
+    init = output.get_init_segment(timeout=0.1)
+    assert init is not None, "init segment missing after keyframe"
+    assert [b[0] for b in parse_boxes(init)] == ['ftyp', 'moov'], parse_boxes(init)
+    print(f"Codec: {output.codec_string}, init segment {len(init)} bytes")
+
+    received = []
+    segments = output.iter_segments(is_active=lambda: len(received) < 12, wait_timeout=0.05)
+    source.start()
+    for segment in segments:
+        boxes = [b[0] for b in parse_boxes(segment)]
+        assert boxes == ['moof', 'mdat'], boxes
+        received.append(segment)
+    source.stop()
+
+    # The first fragment a client sees must be a keyframe
+    first_trun = received[0].find(b'trun')
+    first_flags = struct.unpack('>I', received[0][first_trun + 24:first_trun + 28])[0]
+    assert first_flags == SAMPLE_FLAGS_SYNC, hex(first_flags)
+    print(f"Received {len(received)} fragments, first is a keyframe. OK")
@@ -5,12 +5,18 @@ with the existing camera and OCR processing workflow.
 """
 
 import os
+import json
+import time
 import logging
 import cv2
 import numpy as np
 import yaml
 from typing import Optional
+from threading import Lock
 from user_settings import get_image_enhancement_settings
+from startup import startup_tracker
+from metrics import timed
+from memory_governor import get_memory_governor
 from rpi_cam_enchance import (
     ImageEnhancer,
     OptimalSettingsEnhancer,
@@ -19,7 +25,9 @@ from rpi_cam_enchance import (
     SharpenEnhancer,
     ColorCorrectionEnhancer,
     HDREnhancer,
-    ImageStackingEnhancer
+    ImageStackingEnhancer,
+    FusedEnhancer,
+    PerspectiveCropEnhancer
 )
 
 logger = logging.getLogger(__name__)
@@ -95,9 +103,20 @@ class ImageEnhancementManager:
     does NOT initialize its own camera to prevent conflicts.
     """
     
+    # Weight of the newest sample in the full-pipeline timing average
+    TIMING_EWMA_ALPHA = 0.3
+    # The full pipeline is timed on a crop of this size every FULL_TIMING_INTERVAL adaptive images
+    FULL_TIMING_SAMPLE_MP = 1.0
+    FULL_TIMING_INTERVAL = 20
+    
     def __init__(self):
         self.enhancer = None
         self.settings = None
+        self.analyzer = None
+        self._adaptive_pipelines = {}
+        self._full_seconds_per_mp = None
+        self._adaptive_images = 0
+        self._low_memory = None
         self._initialized = False
         # Ensure OCR server config exists
         ensure_ocr_server_config()
@@ -131,54 +150,17 @@ class ImageEnhancementManager:
                 self.enhancer = None
                 return
             
-            # Build enhancement pipeline based on settings
-            enhancers = []
-            
-            # Color correction
-            if self.settings.get('color_correction_enabled', False):
-                color_enhancer = ColorCorrectionEnhancer(
-                    white_balance=self.settings.get('color_white_balance', True),
-                    saturation_factor=self.settings.get('color_saturation_factor', 1.1),
-                    temperature_adjustment=self.settings.get('color_temperature_adjustment', 0.0)
-                )
-                enhancers.append(color_enhancer)
-                logger.info("Added color correction enhancer")
-            
-            # Noise reduction
-            if self.settings.get('denoise_enabled', False):
-                denoise_enhancer = DenoiseEnhancer(
-                    h_luminance=self.settings.get('denoise_strength', 5),
-                    h_color=self.settings.get('denoise_strength', 5),
-                    preserve_colors=True,
-                    fast_mode=self.settings.get('denoise_fast_mode', True),
-                    downscale_factor=2 if self.settings.get('denoise_fast_mode', True) else 1
-                )
-                enhancers.append(denoise_enhancer)
-                logger.info("Added denoising enhancer")
-            
-            # Contrast enhancement
-            if self.settings.get('contrast_enabled', False):
-                contrast_enhancer = ContrastEnhancer(
-                    clip_limit=self.settings.get('contrast_clip_limit', 2.0),
-                    tile_grid_size=(8, 8),
-                    color_space='YCRCB',
-                    preserve_tone=self.settings.get('contrast_preserve_tone', True)
-                )
-                enhancers.append(contrast_enhancer)
-                logger.info("Added contrast enhancer")
-            
-            # Sharpening
-            if self.settings.get('sharpen_enabled', False):
-                sharpen_enhancer = SharpenEnhancer(
-                    strength=self.settings.get('sharpen_strength', 0.8)
-                )
-                enhancers.append(sharpen_enhancer)
-                logger.info("Added sharpening enhancer")
+            enhancers = self._create_enhancers()
+            self.analyzer = ImageQualityAnalyzer() if self.settings.get('adaptive_enabled', False) else None
+            self._adaptive_pipelines = {}
+            self._full_seconds_per_mp = None
+            self._adaptive_images = 0
+            self._low_memory = None
             
             if enhancers:
                 # IMPORTANT: Do NOT call initialize_camera() on this enhancer
                 # to avoid conflicts with the Flask app's camera instance
-                self.enhancer = ImageEnhancer(enhancers, input_format='BGR')
+                self.enhancer = self._create_image_enhancer(enhancers)
                 logger.info(f"Image enhancer initialized with {len(enhancers)} enhancers")
             else:
                 logger.info("No enhancers enabled, image enhancement disabled")
@@ -191,12 +173,184 @@ class ImageEnhancementManager:
             self.enhancer = None
             self._initialized = True
     
+    def _create_enhancers(self, plan=None, settings=None):
+        """
+        Build the enhancer list from the current settings.
+        
+        Args:
+            plan: Optional per-image adjustments from ImageQualityAnalyzer.plan(),
+                  keyed by step ('color', 'denoise', 'contrast', 'sharpen');
+                  a step mapped to None is skipped, a dict overrides its parameters
+            settings: Enhancement settings to build from (default: the current settings)
+            
+        Returns:
+            list: Enhancers in pipeline order
+        """
+        plan = plan or {}
+        settings = settings or self.settings
+        enhancers = []
+        
+        # Page crop runs first so every later stage processes fewer pixels
+        if settings.get('page_crop_enabled', False):
+            enhancers.append(PerspectiveCropEnhancer())
+            logger.info("Added page detection and perspective crop enhancer")
+        
+        # Color correction
+        if settings.get('color_correction_enabled', False) and plan.get('color', {}) is not None:
+            color_plan = plan.get('color', {})
+            color_enhancer = ColorCorrectionEnhancer(
+                white_balance=color_plan.get('white_balance', settings.get('color_white_balance', True)),
+                saturation_factor=settings.get('color_saturation_factor', 1.1),
+                temperature_adjustment=settings.get('color_temperature_adjustment', 0.0)
+            )
+            enhancers.append(color_enhancer)
+            logger.info("Added color correction enhancer")
+        
+        # Noise reduction
+        if settings.get('denoise_enabled', False) and plan.get('denoise', {}) is not None:
+            denoise_strength = plan.get('denoise', {}).get('strength', settings.get('denoise_strength', 5))
+            denoise_enhancer = DenoiseEnhancer(
+                h_luminance=denoise_strength,
+                h_color=denoise_strength,
+                preserve_colors=True,
+                fast_mode=settings.get('denoise_fast_mode', True),
+                downscale_factor=2 if settings.get('denoise_fast_mode', True) else 1
+            )
+            enhancers.append(denoise_enhancer)
+            logger.info("Added denoising enhancer")
+        
+        # Contrast enhancement
+        if settings.get('contrast_enabled', False) and plan.get('contrast', {}) is not None:
+            contrast_enhancer = ContrastEnhancer(
+                clip_limit=plan.get('contrast', {}).get('clip_limit', settings.get('contrast_clip_limit', 2.0)),
+                tile_grid_size=(8, 8),
+                color_space='YCRCB',
+                preserve_tone=settings.get('contrast_preserve_tone', True)
+            )
+            enhancers.append(contrast_enhancer)
+            logger.info("Added contrast enhancer")
+        
+        # Sharpening
+        if settings.get('sharpen_enabled', False) and plan.get('sharpen', {}) is not None:
+            sharpen_enhancer = SharpenEnhancer(
+                strength=plan.get('sharpen', {}).get('strength', settings.get('sharpen_strength', 0.8))
+            )
+            enhancers.append(sharpen_enhancer)
+            logger.info("Added sharpening enhancer")
+        
+        return enhancers
+    
+    def _create_image_enhancer(self, enhancers, settings=None):
+        """Wrap enhancers in an ImageEnhancer, fused and tiled according to the settings (default: the current settings)."""
+        settings = settings or self.settings
+        # IMPORTANT: Do NOT call initialize_camera() on this enhancer
+        # to avoid conflicts with the Flask app's camera instance
+        tile_workers = (os.cpu_count() or 1) if settings.get('tiled_processing', True) else 1
+        return ImageEnhancer(self._build_pipeline(enhancers, settings), input_format='BGR', tile_workers=tile_workers)
+    
+    def _adaptive_enhancer(self, image):
+        """
+        Pick the enhancer pipeline for one image from its measured quality.
+        
+        Returns:
+            tuple: (ImageEnhancer or None if every step can be skipped, decision dict)
+        """
+        metrics = self.analyzer.analyze(image)
+        plan = self.analyzer.plan(metrics, self.settings)
+        signature = json.dumps(plan, sort_keys=True)
+        
+        if signature not in self._adaptive_pipelines:
+            if len(self._adaptive_pipelines) >= 16:
+                self._adaptive_pipelines.clear()
+            enhancers = self._create_enhancers(plan)
+            self._adaptive_pipelines[signature] = self._create_image_enhancer(enhancers) if enhancers else None
+        
+        return self._adaptive_pipelines[signature], {'signature': signature, 'metrics': metrics, 'plan': plan}
+    
+    def _sample_full_pipeline(self, image):
+        """
+        Time the configured (non-adaptive) pipeline on a centre crop of the image.
+        An adaptive plan almost never runs every step as configured, so the
+        baseline for the time saved has to be measured explicitly.
+        """
+        height, width = image.shape[:2]
+        scale = min(1.0, (self.FULL_TIMING_SAMPLE_MP * 1e6 / (height * width)) ** 0.5)
+        crop_height, crop_width = max(1, int(height * scale)), max(1, int(width * scale))
+        top, left = (height - crop_height) // 2, (width - crop_width) // 2
+        sample = np.ascontiguousarray(image[top:top + crop_height, left:left + crop_width])
+        try:
+            start_time = time.monotonic()
+            self.enhancer.enhance_image(sample)
+            per_mp = (time.monotonic() - start_time) / (crop_height * crop_width / 1e6)
+        except Exception as e:
+            logger.warning(f"Timing the full enhancement pipeline failed: {e}")
+            return
+        previous = self._full_seconds_per_mp
+        self._full_seconds_per_mp = per_mp if previous is None else previous + self.TIMING_EWMA_ALPHA * (per_mp - previous)
+    
+    def _record_adaptive_timing(self, decision, seconds, megapixels, image):
+        """Log the per-image decision and the time saved against the full pipeline."""
+        if self.enhancer is not None and (self._full_seconds_per_mp is None or
+                                          self._adaptive_images % self.FULL_TIMING_INTERVAL == 0):
+            self._sample_full_pipeline(image)
+        self._adaptive_images += 1
+        
+        full = self._full_seconds_per_mp
+        skipped = [step for step, params in decision['plan'].items() if params is None]
+        adjusted = {step: params for step, params in decision['plan'].items() if params}
+        saved = f"{max(0.0, full * megapixels - seconds):.2f}s saved" if full is not None else "no full-pipeline timing yet"
+        logger.info(f"Adaptive enhancement: skipped={skipped or 'none'}, adjusted={adjusted or 'none'}, "
+                    f"metrics={decision['metrics']}, took {seconds:.2f}s ({saved})")
+    
+    def _build_pipeline(self, enhancers, settings=None):
+        """
+        Replace the standard enhancer chain with a single fused pass when possible.
+        
+        Args:
+            enhancers: Enhancers in the order they should run
+            settings: Enhancement settings (default: the current settings)
+            
+        Returns:
+            list: Enhancers to hand to ImageEnhancer
+        """
+        settings = settings or self.settings
+        # The page crop changes the frame geometry, so it stays a separate first stage
+        leading = []
+        if enhancers and isinstance(enhancers[0], PerspectiveCropEnhancer):
+            leading, enhancers = enhancers[:1], enhancers[1:]
+        
+        if not enhancers or not settings.get('fused_pipeline', False):
+            return leading + enhancers
+        try:
+            fused = FusedEnhancer.from_enhancers(enhancers)
+        except Exception as e:
+            logger.warning(f"Could not build fused enhancer, using sequential chain: {e}")
+            return leading + enhancers
+        if fused is None:
+            logger.info("Enhancer chain cannot be fused, using sequential chain")
+            return leading + enhancers
+        logger.info("Using fused single-pass enhancer")
+        return leading + [fused]
+    
+    def _low_memory_enhancer(self):
+        """
+        Pipeline used under memory pressure: the same enabled steps, but fused into
+        one pass, denoising at half resolution and one tile worker, so only a
+        couple of full-size frames are alive at once.
+        """
+        if self._low_memory is None:
+            # Passed down rather than swapped into self.settings, which other workers read meanwhile
+            settings = dict(self.settings, fused_pipeline=True, denoise_fast_mode=True, tiled_processing=False)
+            enhancers = self._create_enhancers(settings=settings)
+            self._low_memory = self._create_image_enhancer(enhancers, settings) if enhancers else None
+        return self._low_memory
+    
     def apply_camera_settings(self, camera, user_id=None):
         """
         Apply optimal camera settings before capture if enabled.
         
         Args:
-            camera: Picamera2 camera object
+            camera: Camera backend (see camera_backends.py)
             user_id: User ID for settings lookup
         """
         try:
@@ -227,7 +381,7 @@ class ImageEnhancementManager:
         Apply experimental camera-based enhancers that capture their own images.
         
         Args:
-            camera: Picamera2 camera object
+            camera: Camera backend (see camera_backends.py)
             output_path: Path where to save the final image
             user_id: User ID for settings lookup
             
@@ -251,16 +405,23 @@ class ImageEnhancementManager:
                 return None
                 
             enhanced_image = None
+            low_memory = get_memory_governor().under_pressure()
             
             # Apply HDR if enabled (has priority over stacking)
             if hdr_enabled:
                 logger.info("Applying experimental HDR enhancement")
+                merge_scale = self.settings.get('experimental_hdr_merge_scale', 1.0)
+                if low_memory and merge_scale > 0.5:
+                    merge_scale = 0.5  # Merge at half resolution: a quarter of the float32 radiance map
+                    get_memory_governor().record_downgrade('hdr')
                 try:
                     hdr_enhancer = HDREnhancer(
                         exposure_times=self.settings.get('experimental_hdr_exposure_times', [5000, 20000, 50000]),
                         camera=camera,
                         gamma=self.settings.get('experimental_hdr_gamma', 2.2),
-                        color_input_format='RGB'  # Camera native format
+                        color_input_format='RGB',  # Camera native format
+                        merge_method=self.settings.get('experimental_hdr_merge_method', 'debevec'),
+                        merge_scale=merge_scale
                     )
                     # HDR enhancer captures and processes its own images
                     enhanced_image = hdr_enhancer.enhance(None)  # Input image ignored
@@ -272,12 +433,17 @@ class ImageEnhancementManager:
             # Apply Image Stacking if enabled and HDR not used
             elif stacking_enabled:
                 logger.info("Applying experimental image stacking enhancement")
+                streaming = self.settings.get('experimental_stacking_streaming', True)
+                if low_memory and not streaming:
+                    streaming = True  # Accumulate frames one at a time instead of holding them all
+                    get_memory_governor().record_downgrade('stacking')
                 try:
                     stacking_enhancer = ImageStackingEnhancer(
                         num_images=self.settings.get('experimental_stacking_num_images', 5),
                         camera=camera,
                         alignment_threshold=self.settings.get('experimental_stacking_alignment_threshold', 0.7),
-                        color_input_format='RGB'  # Camera native format
+                        color_input_format='RGB',  # Camera native format
+                        streaming=streaming
                     )
                     # Stacking enhancer captures and processes its own images
                     enhanced_image = stacking_enhancer.enhance(None)  # Input image ignored
@@ -304,6 +470,7 @@ class ImageEnhancementManager:
             logger.error(f"Error in experimental capture enhancement: {e}")
             return None
 
+    @timed('enhance')
     def enhance_image(self, image_path: str, user_id=None) -> bool:
         """
         Enhance an image file in place.
@@ -340,8 +507,24 @@ class ImageEnhancementManager:
                 logger.error(f"Failed to load image: {image_path}")
                 return False
             
-            # Apply enhancements
-            enhanced_image = self.enhancer.enhance_image(image)
+            # Apply enhancements (only the steps this image needs, in adaptive mode)
+            enhancer, decision = self.enhancer, None
+            if get_memory_governor().under_pressure():
+                enhancer = self._low_memory_enhancer()
+                get_memory_governor().record_downgrade('enhance')
+            elif self.analyzer is not None:
+                enhancer, decision = self._adaptive_enhancer(image)
+            
+            megapixels = image.shape[0] * image.shape[1] / 1e6
+            if enhancer is None:
+                if decision is not None:
+                    self._record_adaptive_timing(decision, 0.0, megapixels, image)
+                logger.info(f"Image already meets quality targets, skipping enhancement: {image_path}")
+                return True
+            start_time = time.monotonic()
+            enhanced_image = enhancer.enhance_image(image)
+            if decision is not None:
+                self._record_adaptive_timing(decision, time.monotonic() - start_time, megapixels, image)
             
             # Safety check: Ensure enhanced image is valid
             if enhanced_image is None:
@@ -381,5 +564,295 @@ class ImageEnhancementManager:
         self._initialized = False
         self._initialize_enhancer()
 
-# Global instance
-enhancement_manager = ImageEnhancementManager()
\ No newline at end of file
+class ImageQualityAnalyzer:
+    """
+    Fast image-quality measurements used to decide which enhancers an image
+    actually needs.
+    
+    Noise and sharpness are measured on a full-resolution center crop (a
+    downscaled copy would average the noise away); contrast, brightness and
+    color cast on a downscaled copy.
+    """
+    
+    def __init__(self, analysis_width: int = 640, crop_size: int = 512,
+                 noise_threshold: float = 2.0, contrast_threshold: float = 170.0,
+                 sharpness_threshold: float = 400.0, cast_threshold: float = 0.06):
+        """
+        Args:
+            analysis_width: Width of the downscaled copy
+            crop_size: Side of the full-resolution center crop
+            noise_threshold: Noise sigma (gray levels) below which denoising is skipped
+            contrast_threshold: 5th-95th percentile luminance spread above which CLAHE is skipped
+            sharpness_threshold: Laplacian variance above which sharpening is skipped
+            cast_threshold: Relative channel deviation below which white balance is skipped
+        """
+        self.analysis_width = analysis_width
+        self.crop_size = crop_size
+        self.noise_threshold = noise_threshold
+        self.contrast_threshold = contrast_threshold
+        self.sharpness_threshold = sharpness_threshold
+        self.cast_threshold = cast_threshold
+        self._noise_kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    
+    def analyze(self, image: np.ndarray) -> dict:
+        """
+        Measure an image.
+        
+        Args:
+            image: BGR image
+            
+        Returns:
+            dict: noise_sigma, sharpness, contrast, brightness, color_cast and analysis_ms
+        """
+        start_time = time.monotonic()
+        height, width = image.shape[:2]
+        
+        side = min(self.crop_size, height, width)
+        top, left = (height - side) // 2, (width - side) // 2
+        crop = cv2.cvtColor(image[top:top + side, left:left + side], cv2.COLOR_BGR2GRAY)
+        # Immerkaer noise estimate, made robust to text edges with the median absolute response
+        response = np.abs(cv2.filter2D(crop, cv2.CV_32F, self._noise_kernel)[1:-1, 1:-1])
+        noise_sigma = 1.4826 * float(np.median(response)) / 6.0
+        sharpness = float(cv2.Laplacian(crop, cv2.CV_32F).var())
+        
+        scale = min(1.0, self.analysis_width / width)
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        histogram = np.cumsum(cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel())
+        total = histogram[-1]
+        low = int(np.searchsorted(histogram, 0.05 * total))
+        high = int(np.searchsorted(histogram, 0.95 * total))
+        channel_means = np.array(cv2.mean(small)[:3])
+        gray_mean = max(float(channel_means.mean()), 1.0)
+        
+        return {
+            'noise_sigma': round(noise_sigma, 2),
+            'sharpness': round(sharpness, 1),
+            'contrast': high - low,
+            'brightness': round(float(gray.mean()), 1),
+            'color_cast': round(float(np.abs(channel_means - gray_mean).max() / gray_mean), 3),
+            'analysis_ms': round((time.monotonic() - start_time) * 1000, 1)
+        }
+    
+    def plan(self, metrics: dict, settings: dict) -> dict:
+        """
+        Decide per enabled step whether it runs and with what strength.
+        
+        Args:
+            metrics: Output of analyze()
+            settings: User image enhancement settings
+            
+        Returns:
+            dict: step -> None (skip) or parameter overrides; steps left out run as configured
+        """
+        plan = {}
+        
+        if settings.get('denoise_enabled', False):
+            if metrics['noise_sigma'] < self.noise_threshold:
+                plan['denoise'] = None
+            else:
+                configured = settings.get('denoise_strength', 5)
+                plan['denoise'] = {'strength': int(min(configured, max(1, round(metrics['noise_sigma'] * 1.5))))}
+        
+        if settings.get('contrast_enabled', False) and metrics['contrast'] >= self.contrast_threshold:
+            plan['contrast'] = None
+        
+        if settings.get('sharpen_enabled', False) and metrics['sharpness'] >= self.sharpness_threshold:
+            plan['sharpen'] = None
+        
+        if settings.get('color_correction_enabled', False) and settings.get('color_white_balance', True):
+            if metrics['color_cast'] < self.cast_threshold:
+                other_adjustments = (settings.get('color_saturation_factor', 1.1) != 1.0 or
+                                     settings.get('color_temperature_adjustment', 0.0) != 0.0)
+                plan['color'] = {'white_balance': False} if other_adjustments else None
+        
+        return plan
+
+
+class OCRPreprocessor:
+    """
+    Prepares an image for OCR while the archived file stays untouched.
+    
+    EasyOCR only needs legible glyphs, so the frame is reduced to grayscale,
+    cropped to the page, deskewed and downscaled until a typical text line is
+    target_text_height pixels tall. Adaptive binarization is optional. Page
+    and skew analysis run on a small copy; the full-resolution gray image is
+    only cropped, rotated and resized once.
+    """
+    
+    def __init__(self, target_text_height: int = 32, crop: bool = True, deskew: bool = True,
+                 binarize: bool = False, analysis_width: int = 1024, max_skew: float = 15.0):
+        """
+        Args:
+            target_text_height: Desired height in pixels of a typical text line
+            crop: Crop to the page (perspective-corrected outline, else the largest bright region)
+            deskew: Rotate so text lines are horizontal
+            binarize: Apply adaptive thresholding after resizing
+            analysis_width: Width of the copy used for page, skew and text-size analysis
+            max_skew: Larger detected angles are treated as detection errors and ignored
+        """
+        self.target_text_height = max(8, int(target_text_height))
+        self.crop = crop
+        self.deskew = deskew
+        self.binarize = binarize
+        self.analysis_width = analysis_width
+        self.max_skew = max_skew
+        self._page_detector = PerspectiveCropEnhancer(detection_width=analysis_width) if crop else None
+    
+    @classmethod
+    def from_settings(cls, ocr_settings: dict) -> Optional['OCRPreprocessor']:
+        """
+        Build a preprocessor from the user's OCR settings.
+        
+        Returns:
+            OCRPreprocessor, or None if preprocessing is disabled
+        """
+        if not ocr_settings or not ocr_settings.get('preprocess_enabled', False):
+            return None
+        return cls(
+            target_text_height=ocr_settings.get('preprocess_target_text_height', 32),
+            crop=ocr_settings.get('preprocess_crop', True),
+            deskew=ocr_settings.get('preprocess_deskew', True),
+            binarize=ocr_settings.get('preprocess_binarize', False)
+        )
+    
+    def _analysis_copy(self, gray: np.ndarray):
+        scale = min(1.0, self.analysis_width / gray.shape[1])
+        if scale == 1.0:
+            return gray, 1.0
+        size = (int(gray.shape[1] * scale), int(gray.shape[0] * scale))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA), scale
+    
+    def _page_bounds(self, small: np.ndarray):
+        """Bounding box (x, y, w, h) of the largest bright region, or None."""
+        _, mask = cv2.threshold(cv2.GaussianBlur(small, (5, 5), 0), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        coverage = (w * h) / float(small.shape[0] * small.shape[1])
+        # Tiny regions are not a page; a box covering everything is not worth cropping
+        if coverage < 0.2 or coverage > 0.95:
+            return None
+        return x, y, w, h
+    
+    @staticmethod
+    def _ink_mask(small: np.ndarray) -> np.ndarray:
+        return cv2.adaptiveThreshold(small, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 25, 15)
+    
+    def _skew_angle(self, ink: np.ndarray) -> float:
+        """Text line angle in degrees from the minimum-area rectangle of the ink."""
+        # Smear characters into lines so the rectangle follows the text rows
+        lines = cv2.dilate(ink, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3)))
+        points = cv2.findNonZero(lines)
+        if points is None or len(points) < 100:
+            return 0.0
+        (_, _), (w, h), angle = cv2.minAreaRect(points)
+        if w < h:
+            angle -= 90
+        if angle < -45:
+            angle += 90
+        elif angle > 45:
+            angle -= 90
+        return angle if abs(angle) <= self.max_skew else 0.0
+    
+    @staticmethod
+    def _text_height(ink: np.ndarray) -> Optional[float]:
+        """Median height of character-sized connected components."""
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        keep = (heights >= 3) & (heights <= ink.shape[0] // 10) & (widths <= ink.shape[1] // 5)
+        if count < 2 or keep.sum() < 20:
+            return None
+        return float(np.median(heights[keep]))
+    
+    def process(self, image: np.ndarray):
+        """
+        Run the preprocessing steps.
+        
+        Args:
+            image: BGR or grayscale image
+            
+        Returns:
+            tuple: (processed grayscale image, info dict with the applied steps)
+        """
+        info = {'input_size': [image.shape[1], image.shape[0]], 'steps': []}
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        small, scale = self._analysis_copy(gray)
+        
+        if self.crop:
+            corners = self._page_detector.detect(small)
+            bounds = None if corners is not None else self._page_bounds(small)
+            if corners is not None:
+                gray = self._page_detector.rectify(gray, corners / scale)
+                small, scale = self._analysis_copy(gray)
+                info['steps'].append('perspective_crop')
+            elif bounds:
+                x, y, w, h = (int(round(v / scale)) for v in bounds)
+                gray = gray[y:y + h, x:x + w]
+                small = small[bounds[1]:bounds[1] + bounds[3], bounds[0]:bounds[0] + bounds[2]]
+                info['steps'].append('crop')
+        
+        ink = self._ink_mask(small)
+        angle = self._skew_angle(ink) if self.deskew else 0.0
+        if abs(angle) >= 0.3:
+            center = (gray.shape[1] / 2, gray.shape[0] / 2)
+            matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+            gray = cv2.warpAffine(gray, matrix, (gray.shape[1], gray.shape[0]),
+                                  flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+            info['steps'].append('deskew')
+            info['skew_degrees'] = round(angle, 2)
+        
+        text_height = self._text_height(ink)
+        if text_height:
+            full_res_height = text_height / scale
+            info['text_height'] = round(full_res_height, 1)
+            resize = self.target_text_height / full_res_height
+            if resize < 0.9:
+                size = (max(1, int(gray.shape[1] * resize)), max(1, int(gray.shape[0] * resize)))
+                gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+                info['steps'].append('downscale')
+        
+        if self.binarize:
+            gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+            info['steps'].append('binarize')
+        
+        info['output_size'] = [gray.shape[1], gray.shape[0]]
+        return gray, info
+    
+    def process_file(self, image_path: str):
+        """
+        Load and preprocess an image file.
+        
+        Returns:
+            tuple: (processed image, info dict), or (None, None) if the file cannot be read
+        """
+        image = cv2.imread(image_path)
+        if image is None:
+            logger.error(f"Failed to load image for OCR preprocessing: {image_path}")
+            return None, None
+        processed, info = self.process(image)
+        logger.info(f"OCR preprocessing for {os.path.basename(image_path)}: {info}")
+        return processed, info
+    
+    @staticmethod
+    def encode_png(image: np.ndarray) -> Optional[bytes]:
+        """Lossless encoding of a preprocessed image for upload to the OCR server."""
+        success, buffer = cv2.imencode('.png', image)
+        return buffer.tobytes() if success else None
+
+# Shared instance, created on first use (inside a request, so the OCR server
+# config can be written to the app's config directory)
+_enhancement_manager = None
+_enhancement_manager_lock = Lock()
+
+def get_enhancement_manager() -> ImageEnhancementManager:
+    """Return the shared ImageEnhancementManager, creating it on first call"""
+    global _enhancement_manager
+    if _enhancement_manager is None:
+        with _enhancement_manager_lock:
+            if _enhancement_manager is None:
+                with startup_tracker.warming('enhancement'):
+                    _enhancement_manager = ImageEnhancementManager()
+    return _enhancement_manager
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+Memory budget management for RPi PhotoDoc OCR application.
+On a 4 GB Raspberry Pi, EasyOCR readers, full-resolution float frames and
+concurrent requests can push the app into the OOM killer mid-capture. The
+governor tracks RSS plus the estimated cost of in-flight jobs, admits or
+delays new capture/upload jobs against a budget, unloads idle OCR readers,
+and tells the enhancement pipeline when to switch to lower-memory modes.
+
+Configuration (environment):
+    MEMORY_BUDGET_MB          Budget for this process (default: 60% of physical memory)
+    MEMORY_RESERVE_MB         System-wide MemAvailable to keep free (default: 300)
+    MEMORY_ADMISSION_TIMEOUT  Seconds a job may wait for memory before it is rejected (default: 30)
+    OCR_READER_IDLE_SECONDS   Unload OCR readers unused for this long (default: 600)
+"""
+
+import os
+import gc
+import time
+import logging
+from threading import Condition, Lock, Thread
+from itertools import count
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Rough costs, measured on a Pi 4 with the default 12 MP still resolution
+CAPTURE_MEGAPIXELS = 12.0
+FRAME_COPIES = 6            # decode, enhancement intermediates, output, encoder buffer
+OCR_READER_MB = 450         # EasyOCR detector + recognizer, per language set
+OCR_INFERENCE_MB = 250
+PRESSURE_RATIO = 0.85       # Fraction of the budget at which low-memory modes kick in
+
+
+def _read_proc_kb(path: str, field: str):
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (0 where /proc is unavailable)."""
+    kb = _read_proc_kb('/proc/self/status', 'VmRSS')
+    return kb / 1024 if kb is not None else 0.0
+
+
+def available_mb():
+    """System-wide MemAvailable in MB, or None where /proc is unavailable."""
+    kb = _read_proc_kb('/proc/meminfo', 'MemAvailable')
+    return kb / 1024 if kb is not None else None
+
+
+def _default_budget_mb() -> float:
+    total_kb = _read_proc_kb('/proc/meminfo', 'MemTotal')
+    return total_kb / 1024 * 0.6 if total_kb else 2048.0
+
+
+class MemoryBudgetExceeded(Exception):
+    """A job could not be admitted within the admission timeout."""
+
+
+class MemoryGovernor:
+    """Admission control and memory reclamation for one process."""
+
+    def __init__(self, budget_mb: float = None, reserve_mb: float = 300.0,
+                 admission_timeout: float = 30.0, reader_idle_seconds: float = 600.0):
+        """
+        Args:
+            budget_mb: Memory budget for this process
+            reserve_mb: MemAvailable below which the system counts as under pressure
+            admission_timeout: Seconds a job may wait for memory before it is rejected
+            reader_idle_seconds: Idle time after which OCR readers are unloaded
+        """
+        self.budget_mb = budget_mb or _default_budget_mb()
+        self.reserve_mb = reserve_mb
+        self.admission_timeout = admission_timeout
+        self.reader_idle_seconds = reader_idle_seconds
+        self._jobs = {}
+        self._ids = count(1)
+        self._cond = Condition(Lock())
+        self._reclaimers = {}
+        self._monitor = None
+
+        self.admissions = registry.counter(
+            'memory_admissions_total', 'Memory admission decisions by job kind.', ['kind', 'decision'])
+        self.admission_wait = registry.histogram(
+            'memory_admission_wait_seconds', 'Time jobs waited for memory.', ['kind'],
+            buckets=(0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+        self.downgrades = registry.counter(
+            'memory_downgrades_total', 'Low-memory fallbacks taken under pressure.', ['component'])
+        self.reclaimed = registry.counter(
+            'memory_reclaimed_total', 'Objects released by memory reclaimers.', ['reclaimer'])
+        registry.gauge('memory_rss_bytes', 'Resident set size of this process.',
+                       callback=lambda: int(rss_mb() * 1024 * 1024))
+        registry.gauge('memory_budget_bytes', 'Configured memory budget.',
+                       callback=lambda: int(self.budget_mb * 1024 * 1024))
+        registry.gauge('memory_inflight_estimate_bytes', 'Estimated memory of admitted jobs.',
+                       callback=lambda: int(self.inflight_mb() * 1024 * 1024))
+        registry.gauge('memory_inflight_jobs', 'Admitted jobs that have not finished.',
+                       callback=lambda: len(self._jobs))
+        registry.gauge('memory_under_pressure', '1 while low-memory modes are active.',
+                       callback=lambda: int(self.under_pressure()))
+
+    @classmethod
+    def from_environment(cls) -> 'MemoryGovernor':
+        budget = os.environ.get('MEMORY_BUDGET_MB')
+        return cls(
+            budget_mb=float(budget) if budget else None,
+            reserve_mb=float(os.environ.get('MEMORY_RESERVE_MB', 300)),
+            admission_timeout=float(os.environ.get('MEMORY_ADMISSION_TIMEOUT', 30)),
+            reader_idle_seconds=float(os.environ.get('OCR_READER_IDLE_SECONDS', 600))
+        )
+
+    # --- estimates ---
+
+    @staticmethod
+    def estimate_pipeline_mb(enhancement_settings: dict = None, ocr_local: bool = True,
+                             reader_loaded: bool = True, megapixels: float = CAPTURE_MEGAPIXELS) -> float:
+        """
+        Estimated peak memory of one capture/upload through enhancement and OCR.
+
+        Args:
+            enhancement_settings: User image enhancement settings
+            ocr_local: Whether OCR runs in this process
+            reader_loaded: Whether the OCR reader for the user's languages is already loaded
+            megapixels: Frame size
+
+        Returns:
+            float: Estimate in MB
+        """
+        settings = enhancement_settings or {}
+        frame_mb = megapixels * 3  # 8-bit BGR
+        estimate = frame_mb * FRAME_COPIES
+        if settings.get('enabled', False):
+            if settings.get('experimental_hdr_enabled', False):
+                brackets = len(settings.get('experimental_hdr_exposure_times', [0, 0, 0]))
+                estimate += frame_mb * (brackets + 8)  # brackets + float32 radiance map and tone-mapped copy
+            elif settings.get('experimental_stacking_enabled', False):
+                frames = int(settings.get('experimental_stacking_num_images', 5))
+                streaming = settings.get('experimental_stacking_streaming', True)
+                estimate += frame_mb * ((2 if streaming else frames) + 8)  # frames + float32 accumulator
+        if ocr_local:
+            estimate += OCR_INFERENCE_MB + (0 if reader_loaded else OCR_READER_MB)
+        return estimate
+
+    # --- admission ---
+
+    def inflight_mb(self) -> float:
+        return sum(job['mb'] for job in self._jobs.values())
+
+    def under_pressure(self) -> bool:
+        """True when the pipeline should pick lower-memory modes."""
+        if rss_mb() + self.inflight_mb() > self.budget_mb * PRESSURE_RATIO:
+            return True
+        available = available_mb()
+        return available is not None and available < self.reserve_mb
+
+    def _fits(self, estimate_mb: float) -> bool:
+        return rss_mb() + self.inflight_mb() + estimate_mb <= self.budget_mb
+
+    def acquire(self, kind: str, estimate_mb: float) -> dict:
+        """
+        Admit a job, reclaiming memory or waiting for other jobs to finish if needed.
+        A job is always admitted when nothing else is running, since waiting
+        cannot help; the pipeline then runs in its low-memory modes.
+
+        Args:
+            kind: Job kind for metrics ('capture', 'upload', ...)
+            estimate_mb: Estimated peak memory of the job
+
+        Returns:
+            dict: Ticket to pass to release()
+
+        Raises:
+            MemoryBudgetExceeded: If memory did not free up within the admission timeout
+        """
+        started = time.monotonic()
+        decision = 'admitted'
+        with self._cond:
+            if not self._fits(estimate_mb):
+                self.reclaim(aggressive=True)
+                decision = 'admitted_after_reclaim'
+            while not self._fits(estimate_mb) and self._jobs:
+                decision = 'delayed'
+                remaining = self.admission_timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.admissions.inc(kind=kind, decision='rejected')
+                    self.admission_wait.observe(time.monotonic() - started, kind=kind)
+                    logger.warning(f"Rejected {kind} job: needs ~{estimate_mb:.0f} MB, RSS {rss_mb():.0f} MB, "
+                                   f"in flight {self.inflight_mb():.0f} MB, budget {self.budget_mb:.0f} MB")
+                    raise MemoryBudgetExceeded(
+                        f"Not enough memory for another {kind} right now; try again when the current job finishes.")
+                self._cond.wait(timeout=min(remaining, 1.0))
+            if not self._fits(estimate_mb):
+                decision = 'admitted_over_budget'
+
+            ticket = {'id': next(self._ids), 'kind': kind, 'mb': estimate_mb}
+            self._jobs[ticket['id']] = ticket
+
+        waited = time.monotonic() - started
+        self.admissions.inc(kind=kind, decision=decision)
+        self.admission_wait.observe(waited, kind=kind)
+        if decision != 'admitted':
+            logger.info(f"Memory governor: {kind} job {decision} after {waited:.1f}s "
+                        f"(~{estimate_mb:.0f} MB, RSS {rss_mb():.0f} MB, budget {self.budget_mb:.0f} MB)")
+        self._ensure_monitor()
+        return ticket
+
+    def release(self, ticket: dict) -> None:
+        if ticket is None:
+            return
+        with self._cond:
+            self._jobs.pop(ticket['id'], None)
+            self._cond.notify_all()
+
+    def record_downgrade(self, component: str) -> None:
+        self.downgrades.inc(component=component)
+        logger.info(f"Memory pressure: using low-memory mode for {component}")
+
+    # --- reclamation ---
+
+    def register_reclaimer(self, name: str, func) -> None:
+        """
+        Register a callable that frees memory. It receives aggressive=True under
+        pressure (idle-time limits may be relaxed) and returns how many objects it released.
+        """
+        self._reclaimers[name] = func
+
+    def reclaim(self, aggressive: bool = False) -> int:
+        released = 0
+        for name, func in list(self._reclaimers.items()):
+            try:
+                freed = func(aggressive=aggressive) or 0
+            except Exception as e:
+                logger.warning(f"Memory reclaimer {name} failed: {e}")
+                continue
+            if freed:
+                self.reclaimed.inc(freed, reclaimer=name)
+                released += freed
+        if released or aggressive:
+            gc.collect()
+        return released
+
+    def _ensure_monitor(self, interval: float = 60.0) -> None:
+        """Start the background thread that unloads idle readers between jobs."""
+        if self._monitor is not None:
+            return
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reclaim(aggressive=self.under_pressure())
+        self._monitor = Thread(target=run, name='memory-governor', daemon=True)
+        self._monitor.start()
+
+
+_governor = None
+_governor_lock = Lock()
+
+
+def get_memory_governor() -> MemoryGovernor:
+    """Return the shared MemoryGovernor, creating it on first call"""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = MemoryGovernor.from_environment()
+                logger.info(f"Memory governor budget: {_governor.budget_mb:.0f} MB")
+    return _governor
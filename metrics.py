@@ -0,0 +1,241 @@
+"""
+Stage timing metrics for RPi PhotoDoc OCR application.
+In-process counters and histograms for capture, enhancement, OCR, LLM and
+database stages, rendered in the Prometheus text exposition format at
+/metrics. Shared by the web app and the standalone OCR server; no client
+library is needed.
+"""
+
+import time
+import logging
+from functools import wraps
+from contextlib import contextmanager
+from threading import Lock
+from tracing import span as trace_span
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers millisecond DB writes up to multi-minute LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge:
+    """Value that can go up and down; optionally read from a callback at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values = {}
+        self._lock = Lock()
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                self.set(self.callback())
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} callback failed: {e}")
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: (list(s['counts']), s['sum'], s['count']) for key, s in self._series.items()}
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them for scraping."""
+
+    def __init__(self, namespace: str = 'photodoc'):
+        self.namespace = namespace
+        self._metrics = {}
+        self._lock = Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(f"{self.namespace}_{name}", documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=(), callback=None) -> Gauge:
+        return self._register(Gauge(f"{self.namespace}_{name}", documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.namespace}_{name}", documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in Prometheus text format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    'stage_duration_seconds', 'Time spent in each pipeline stage.', ['stage'])
+stage_errors = registry.counter(
+    'stage_errors_total', 'Pipeline stages that raised an exception.', ['stage'])
+enhancer_seconds = registry.histogram(
+    'enhancer_duration_seconds', 'Time spent in each image enhancer.', ['enhancer'])
+http_request_seconds = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by endpoint.', ['endpoint', 'method', 'status'])
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Time a block as a pipeline stage. Exceptions are counted and re-raised.
+    The block is also recorded as a span of the current trace, if any.
+
+    Usage:
+        with stage_timer('ocr_local'):
+            ...
+    """
+    started = time.perf_counter()
+    try:
+        with trace_span(stage):
+            yield
+    except Exception:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        stage_seconds.observe(time.perf_counter() - started, stage=stage)
+
+
+def timed(stage: str):
+    """Decorator form of stage_timer()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def install_flask_metrics(app, route: str = '/metrics') -> None:
+    """
+    Time every request of a Flask app and serve the registry at route.
+
+    Args:
+        app: Flask application
+        route: URL of the scrape endpoint
+    """
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None and request.endpoint != 'metrics':
+            http_request_seconds.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unmatched',
+                                         method=request.method, status=str(response.status_code))
+        return response
+
+    def metrics():
+        return Response(registry.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+    app.add_url_rule(route, 'metrics', metrics, methods=['GET'])
+    logger.info(f"Prometheus metrics served at {route}")
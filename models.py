@@ -3,6 +3,7 @@ User models for RPi PhotoDoc OCR application.
 Now using SQLite database instead of JSON files.
 """
 
+import os
 import logging
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -26,6 +27,14 @@ class User(UserMixin):
         """Check if provided password matches stored hash"""
         return check_password_hash(self.password_hash, password)
 
+    @property
+    def is_admin(self):
+        """Usernames listed in ADMIN_USERS (comma separated); without it, the first registered user"""
+        admins = [name.strip() for name in os.environ.get('ADMIN_USERS', '').split(',') if name.strip()]
+        if admins:
+            return self.username in admins
+        return self.id == 1
+
     def save(self):
         """Save user changes to database"""
         try:
@@ -0,0 +1,164 @@
+"""
+OCR result cache for RPi PhotoDoc OCR application.
+OCR results are stored in SQLite keyed by the SHA-256 of the image that was
+OCR'd (after enhancement) and the parameters that affect the output, so the
+same page is only read once per engine and settings.
+"""
+
+import json
+import time
+import hashlib
+import logging
+import requests
+from database import get_db
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 5000
+REMOTE_INFO_TTL = 60  # seconds a remote OCR server's reported engine is trusted
+
+ocr_cache_requests = registry.counter(
+    'ocr_cache_requests_total', 'OCR cache lookups by engine and result.', ['engine', 'result'])
+
+# OCR settings that change the text produced for the same image
+_PARAM_KEYS = ('languages', 'detail_level', 'paragraph_mode')
+_PREPROCESS_KEYS = ('preprocess_crop', 'preprocess_deskew', 'preprocess_binarize', 'preprocess_target_text_height')
+
+_easyocr_version = None
+_remote_engines = {}  # OCR server URL -> (engine or None, fetched at)
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_engine() -> str:
+    """Engine identifier for local EasyOCR, including its installed version"""
+    global _easyocr_version
+    if _easyocr_version is None:
+        try:
+            from importlib.metadata import version
+            _easyocr_version = version('easyocr')
+        except Exception:
+            _easyocr_version = 'unknown'
+    return f"easyocr-{_easyocr_version}"
+
+
+def _info_url(ocr_server_url: str) -> str:
+    base = ocr_server_url.rstrip('/')
+    if base.endswith('/ocr'):
+        base = base[:-len('/ocr')]
+    return base + '/info'
+
+
+def remote_engine(ocr_server_url: str):
+    """
+    Engine identifier for a remote OCR server. It combines the server's EasyOCR
+    version with the languages and options from the server's own config. The
+    server ignores the user's OCR settings, so these decide the text it returns.
+    The identifier comes from /info and is kept for REMOTE_INFO_TTL seconds.
+
+    Returns:
+        str, or None if the server does not report it (results are then not cached)
+    """
+    cached = _remote_engines.get(ocr_server_url)
+    if cached is not None and time.monotonic() - cached[1] < REMOTE_INFO_TTL:
+        return cached[0]
+    try:
+        reported = requests.get(_info_url(ocr_server_url), timeout=5).json().get('engine')
+    except Exception as e:
+        logger.warning(f"Could not read engine info from OCR server {ocr_server_url}: {e}")
+        reported = None
+    engine = f"remote:{ocr_server_url}:{reported}" if reported else None
+    _remote_engines[ocr_server_url] = (engine, time.monotonic())
+    return engine
+
+
+def note_remote_engine(ocr_server_url: str, reported: str) -> str:
+    """Record the engine a server reported with a result, and return its cache identifier"""
+    engine = f"remote:{ocr_server_url}:{reported}"
+    cached = _remote_engines.get(ocr_server_url)
+    if cached is not None and cached[0] != engine:
+        logger.info(f"OCR server {ocr_server_url} now reports engine {reported}")
+    _remote_engines[ocr_server_url] = (engine, time.monotonic())
+    return engine
+
+
+def cache_params(ocr_settings: dict, remote: bool = False) -> str:
+    """
+    Canonical JSON of the OCR settings that are part of the cache key. A remote
+    server ignores the user's languages and output options (they are part of
+    its engine identifier instead), so only client-side preprocessing counts there.
+    """
+    settings = ocr_settings or {}
+    params = {} if remote else {key: settings.get(key) for key in _PARAM_KEYS}
+    if not remote:
+        params['languages'] = sorted(params['languages'] or [])
+    if settings.get('preprocess_enabled', False):
+        params.update({key: settings.get(key) for key in _PREPROCESS_KEYS})
+    return json.dumps(params, sort_keys=True)
+
+
+def _engine_label(engine: str) -> str:
+    return 'remote' if engine.startswith('remote') else 'local'
+
+
+def get_cached_ocr(image_sha256: str, params: str, engine: str):
+    """
+    Look up a cached OCR result.
+
+    Returns:
+        The cached result (text, or list of detections for detail_level > 0), or None on a miss
+    """
+    try:
+        db = get_db()
+        row = db.execute('''
+            SELECT result FROM ocr_cache
+            WHERE image_sha256 = ? AND params = ? AND engine = ?
+        ''', (image_sha256, params, engine)).fetchone()
+        if row is None:
+            ocr_cache_requests.inc(engine=_engine_label(engine), result='miss')
+            return None
+        db.execute('''
+            UPDATE ocr_cache SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP
+            WHERE image_sha256 = ? AND params = ? AND engine = ?
+        ''', (image_sha256, params, engine))
+        db.commit()
+        ocr_cache_requests.inc(engine=_engine_label(engine), result='hit')
+        logger.info(f"OCR cache hit for image {image_sha256[:12]} ({engine})")
+        return json.loads(row['result'])
+
+    except Exception as e:
+        logger.warning(f"OCR cache lookup failed: {e}")
+        return None
+
+
+def store_ocr_result(image_sha256: str, params: str, engine: str, result) -> bool:
+    """Store an OCR result, evicting the least recently used entries beyond MAX_ENTRIES"""
+    try:
+        # EasyOCR detections contain numpy scalars and arrays
+        result_json = json.dumps(result, ensure_ascii=False,
+                                 default=lambda o: o.tolist() if hasattr(o, 'tolist') else str(o))
+        db = get_db()
+        db.execute('''
+            INSERT OR REPLACE INTO ocr_cache (image_sha256, params, engine, result)
+            VALUES (?, ?, ?, ?)
+        ''', (image_sha256, params, engine, result_json))
+        db.execute('''
+            DELETE FROM ocr_cache WHERE rowid IN (
+                SELECT rowid FROM ocr_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (MAX_ENTRIES,))
+        db.commit()
+        return True
+
+    except Exception as e:
+        logger.warning(f"Failed to store OCR result in cache: {e}")
+        return False
+
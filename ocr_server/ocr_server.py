@@ -10,10 +10,15 @@ Optional configuration file: ocr_server_config.yaml
 """
 
 import os
+import sys
+import hmac
 import json
 import logging
+import time
 import tempfile
+import threading
 import uuid
+from contextlib import nullcontext
 from datetime import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
@@ -28,6 +33,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Stage metrics are shared with the main app (metrics.py one directory up).
+# A copy of this file deployed on its own runs without them.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from metrics import install_flask_metrics, stage_timer
+    from tracing import start_trace, end_trace
+    from profiler import ProfilerController, create_profiler_blueprint
+except ImportError:
+    install_flask_metrics = start_trace = end_trace = create_profiler_blueprint = None
+    stage_timer = lambda stage: nullcontext()  # noqa: E731
+
 class OCRServer:
     def __init__(self, config_file='./config/ocr_server_config.yaml'):
         self.app = Flask(__name__)
@@ -37,6 +53,8 @@ class OCRServer:
         self.setup_cors()
         self.setup_routes()
         self.reader = None
+        # EasyOCR is not thread-safe; requests queue here and the wait is reported back
+        self.reader_lock = threading.Lock()
         self.initialize_ocr()
 
     def load_config(self):
@@ -139,10 +157,27 @@ class OCRServer:
                 'server': 'OCR Server',
                 'version': '1.0.0',
                 'supported_languages': self.config['ocr']['languages'],
+                'engine': self.engine_id(),
                 'max_file_size': self.config['upload']['max_file_size'],
                 'allowed_extensions': self.config['upload']['allowed_extensions']
             })
 
+        if install_flask_metrics is not None:
+            install_flask_metrics(self.app)
+
+        # Sampling profiler, driven from the app's settings page with a shared PROFILER_TOKEN
+        profiler_token = os.environ.get('PROFILER_TOKEN', '')
+        if create_profiler_blueprint is not None and profiler_token:
+            self.profiler = ProfilerController(label='ocr_server')
+            self.app.register_blueprint(
+                create_profiler_blueprint(
+                    self.profiler,
+                    authorize=lambda: hmac.compare_digest(request.headers.get('X-Profiler-Token', ''), profiler_token),
+                    endpoints=['process_ocr']
+                ),
+                url_prefix='/profiler'
+            )
+
         @self.app.route('/ocr', methods=['POST'])
         def process_ocr():
             """Main OCR processing endpoint"""
@@ -175,8 +210,16 @@ class OCRServer:
                         'error': f'File type not allowed. Supported: {self.config["upload"]["allowed_extensions"]}'
                     }), 400
 
-                # Process the image
-                result = self.process_image(file)
+                # Process the image, continuing the caller's trace if it sent a traceparent
+                trace = start_trace('ocr_request', service='ocr_server', headers=request.headers,
+                                    filename=file.filename) if start_trace else None
+                try:
+                    result = self.process_image(file)
+                finally:
+                    if trace is not None:
+                        end_trace(trace)
+                if trace is not None:
+                    result['trace_id'] = trace.trace_id
                 return jsonify(result)
 
             except Exception as e:
@@ -217,6 +260,13 @@ class OCRServer:
             logger.error(f"Failed to initialize EasyOCR: {e}")
             logger.error("OCR functionality will not be available")
 
+    def engine_id(self):
+        """EasyOCR version and the OCR options that decide the returned text (clients key their caches on it)"""
+        ocr_config = self.config['ocr']
+        return (f"easyocr-{getattr(easyocr, '__version__', 'unknown')}"
+                f"|{','.join(sorted(ocr_config['languages']))}"
+                f"|detail={ocr_config['detail']}|paragraph={ocr_config['paragraph']}")
+
     def process_image(self, file):
         """Process uploaded image with OCR"""
         temp_file = None
@@ -230,12 +280,25 @@ class OCRServer:
             
             # Perform OCR
             ocr_config = self.config['ocr']
-            result = self.reader.readtext(
-                temp_file_path,
-                detail=ocr_config['detail'],
-                paragraph=ocr_config['paragraph'],
-                workers=ocr_config['workers']
-            )
+            queued = time.perf_counter()
+            with stage_timer('ocr_server_queue_wait'):
+                self.reader_lock.acquire()
+            try:
+                started = time.perf_counter()
+                with stage_timer('ocr_server_inference'):
+                    result = self.reader.readtext(
+                        temp_file_path,
+                        detail=ocr_config['detail'],
+                        paragraph=ocr_config['paragraph'],
+                        workers=ocr_config['workers']
+                    )
+                finished = time.perf_counter()
+            finally:
+                self.reader_lock.release()
+            timings = {
+                'queue_wait': round((started - queued) * 1000, 1),
+                'inference': round((finished - started) * 1000, 1)
+            }
 
             # Extract text
             if ocr_config['detail'] == 0:
@@ -255,6 +318,8 @@ class OCRServer:
                 'success': True,
                 'text': text,
                 'length': len(text),
+                'engine': self.engine_id(),
+                'timings': timings,
                 'timestamp': datetime.utcnow().isoformat()
             }
 
@@ -311,6 +376,7 @@ class OCRServer:
         logger.info("Endpoints:")
         logger.info("  GET  /health - Health check")
         logger.info("  GET  /info   - Server information")
+        logger.info("  GET  /metrics - Prometheus metrics")
         logger.info("  POST /ocr    - OCR processing")
         logger.info("="*50)
         
@@ -0,0 +1,190 @@
+"""
+PDF import for RPi PhotoDoc OCR application.
+Pages of an uploaded PDF are rasterized by a small process pool and handed to
+the ingest pipeline in page order as soon as each one is rendered, so
+enhancement and OCR of the first pages overlap with rendering of the rest.
+Pages that already carry a text layer (born-digital PDFs, or scans the
+scanner OCR'd) keep that text and skip OCR.
+
+PyMuPDF is optional (pip install pymupdf); without it PDFs are rejected.
+
+Configuration (environment):
+    PDF_RENDER_WORKERS  Processes rasterizing pages (default: 2)
+    PDF_MAX_PAGES       Pages imported from one PDF (default: 500)
+"""
+
+import os
+import time
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from document_manager import create_document
+from user_settings import get_ingest_settings
+from metrics import registry
+from pdf_render import fitz, PDF_AVAILABLE, render_page
+
+logger = logging.getLogger(__name__)
+
+RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 2))
+MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', 500))
+MIN_DPI, MAX_DPI = 72, 600
+
+pdf_pages = registry.counter(
+    'pdf_pages_total', 'PDF pages imported by text source and outcome.', ['source', 'status'])
+pdf_render_seconds = registry.histogram(
+    'pdf_page_render_seconds', 'Time to rasterize one PDF page.',
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+
+class PdfImportError(Exception):
+    """The PDF cannot be imported (PyMuPDF missing, encrypted, empty or too long)."""
+
+
+def is_pdf(filename: str) -> bool:
+    return filename.lower().endswith('.pdf')
+
+
+def page_count(pdf_path: str) -> int:
+    """
+    Number of pages to import.
+
+    Raises:
+        PdfImportError: If the PDF cannot be imported
+    """
+    if not PDF_AVAILABLE:
+        raise PdfImportError("PDF import needs PyMuPDF (pip install pymupdf)")
+    try:
+        with fitz.open(pdf_path) as doc:
+            if doc.needs_pass:
+                raise PdfImportError("PDF is password protected")
+            pages = doc.page_count
+    except PdfImportError:
+        raise
+    except Exception as e:
+        raise PdfImportError(f"Could not open PDF: {e}")
+    if pages == 0:
+        raise PdfImportError("PDF has no pages")
+    if pages > MAX_PAGES:
+        raise PdfImportError(f"PDF has {pages} pages; at most {MAX_PAGES} can be imported")
+    return pages
+
+
+def render_pages(pdf_path: str, out_dir: str, dpi: int = 200, use_text_layer: bool = True,
+                 workers: int = RENDER_WORKERS, pages: int = None):
+    """
+    Rasterize the pages of a PDF, yielding each page in order as soon as it is rendered.
+    Only a few pages are rendered ahead of the consumer, so a long PDF does not
+    pile up on disk while OCR catches up.
+
+    Args:
+        pdf_path: PDF file
+        out_dir: Directory the page images are written to (the upload folder)
+        dpi: Render resolution, clamped to MIN_DPI..MAX_DPI
+        use_text_layer: Return the embedded text of pages that have one
+        workers: Render processes
+        pages: Page count from page_count(), if the caller already has it
+
+    Yields:
+        dict: {'index', 'filepath', 'stored_filename', 'text': text layer or None, 'dpi'},
+              or {'index', 'error'} for a page that failed to render
+    """
+    pages = pages or page_count(pdf_path)
+    dpi = max(MIN_DPI, min(MAX_DPI, int(dpi)))
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    workers = max(1, min(workers, pages))
+
+    # spawn, not fork: forking the threaded app can leave a child stuck on a lock
+    # another thread held. Spawned workers import pdf_render and the app's main
+    # module (app.py skips its background preloads there).
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    pending = deque()
+    next_index = 0
+    try:
+        while pending or next_index < pages:
+            while next_index < pages and len(pending) < workers * 2:
+                # The stored PDF name is already unique
+                stored_filename = f"{stem}_p{next_index + 1:04d}.png"
+                filepath = os.path.join(out_dir, stored_filename)
+                future = pool.submit(render_page, pdf_path, next_index, dpi, filepath, use_text_layer)
+                pending.append((next_index, stored_filename, filepath, future))
+                next_index += 1
+
+            index, stored_filename, filepath, future = pending.popleft()
+            try:
+                rendered = future.result()
+            except Exception as e:
+                logger.error(f"Rendering page {index + 1} of {pdf_path} failed: {e}")
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                yield {'index': index, 'error': str(e)}
+                continue
+            pdf_render_seconds.observe(rendered['seconds'])
+            yield {'index': index, 'filepath': filepath, 'stored_filename': stored_filename,
+                   'text': rendered['text'], 'dpi': rendered['dpi']}
+    finally:
+        # Consumer stopped early: drop queued pages and their files
+        for _, _, filepath, future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+        for _, _, filepath, future in pending:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+
+def import_pdf(pdf_path: str, display_name: str, user_id, upload_folder: str, process,
+               document_name: str = None, on_page=None) -> dict:
+    """
+    Rasterize a PDF, run every page through the ingest pipeline as soon as it is
+    rendered, and combine the pages into a document. Must be called inside an app
+    context. The PDF itself is removed afterwards; the page images become the photos.
+
+    Args:
+        pdf_path: Uploaded PDF, already saved in the upload folder
+        display_name: Original file name, used for page and document names
+        user_id: Owner of the new photos
+        upload_folder: Directory the page images are written to
+        process: process(filepath, stored_filename, page_name, user_id, ocr_text=None) -> result dict
+                 as returned by routes.ingest_uploaded_file
+        document_name: Name of the new document (default: the file name)
+        on_page: Optional callback(pages, result) after each page
+
+    Returns:
+        dict: {'pages': one result dict per page in page order, 'document': new document or None}
+
+    Raises:
+        PdfImportError: If the PDF cannot be imported
+    """
+    settings = get_ingest_settings(user_id)
+    dpi = int(settings.get('pdf_dpi', 200))
+    use_text_layer = settings.get('pdf_use_text_layer', True)
+    stem = os.path.splitext(display_name)[0]
+    results = []
+    text_pages = 0
+    started = time.monotonic()
+    try:
+        pages = page_count(pdf_path)
+        for page in render_pages(pdf_path, upload_folder, dpi, use_text_layer, pages=pages):
+            if 'error' in page:
+                result = {'status': 'failed', 'photo': None, 'duplicate': None, 'warnings': [],
+                          'error': f"Rendering failed: {page['error']}"}
+            else:
+                result = process(page['filepath'], page['stored_filename'], f"{stem} p{page['index'] + 1}",
+                                 user_id, ocr_text=page['text'])
+            if page.get('text'):
+                text_pages += 1
+            pdf_pages.inc(source='text_layer' if page.get('text') else 'ocr', status=result['status'])
+            results.append(result)
+            if on_page:
+                on_page(pages, result)
+    finally:
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+    # Pages that were already in the gallery are reused; skipped duplicates are left out
+    photo_ids = [result['photo']['id'] for result in results if result['photo']]
+    document = create_document(user_id, document_name or stem, photo_ids) if photo_ids else None
+    logger.info(f"Imported {len(photo_ids)} of {len(results)} page(s) of '{display_name}' for user {user_id} "
+                f"at {dpi} DPI ({text_pages} from the text layer) in {time.monotonic() - started:.1f}s")
+    return {'pages': results, 'document': document}
@@ -0,0 +1,48 @@
+"""
+PDF page rendering for RPi PhotoDoc OCR application.
+Runs in the render processes started by pdf_import. Kept apart from
+pdf_import so the spawned processes only need PyMuPDF, not the app's modules.
+
+PyMuPDF is optional (pip install pymupdf).
+"""
+
+import math
+import time
+
+try:
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        import fitz  # PyMuPDF before 1.24.3
+    PDF_AVAILABLE = True
+except ImportError:
+    fitz = None
+    PDF_AVAILABLE = False
+
+MAX_PAGE_MEGAPIXELS = 36  # large-format pages are rendered at a lower DPI
+MIN_TEXT_LAYER_CHARS = 20  # page numbers or stray marks alone do not count as a text layer
+
+_worker_doc = None  # (path, document) kept open by each render process
+
+
+def render_page(pdf_path: str, index: int, dpi: int, out_path: str, use_text_layer: bool) -> dict:
+    """Write one page as PNG and return its text layer"""
+    global _worker_doc
+    started = time.monotonic()
+    if _worker_doc is None or _worker_doc[0] != pdf_path:
+        if _worker_doc is not None:
+            _worker_doc[1].close()
+        _worker_doc = (pdf_path, fitz.open(pdf_path))
+    page = _worker_doc[1].load_page(index)
+
+    text = page.get_text('text').strip() if use_text_layer else ''
+    area_sq_in = (page.rect.width / 72) * (page.rect.height / 72)
+    if area_sq_in > 0:
+        dpi = min(dpi, int(math.sqrt(MAX_PAGE_MEGAPIXELS * 1e6 / area_sq_in)))
+    page.get_pixmap(dpi=dpi, alpha=False).save(out_path)
+    return {
+        'index': index,
+        'text': text if len(text) >= MIN_TEXT_LAYER_CHARS else None,
+        'dpi': dpi,
+        'seconds': time.monotonic() - started
+    }
@@ -4,22 +4,30 @@ Now using SQLite database instead of JSON files.
 """
 
 import uuid
+import json
 import logging
 from datetime import datetime
 from database import get_db, get_db_connection
+from metrics import timed
 
 logger = logging.getLogger(__name__)
 
-def create_photo(user_id, image_filename, original_ocr, ai_cleaned_text):
+@timed('db.create_photo')
+def create_photo(user_id, image_filename, original_ocr, ai_cleaned_text, processing_timings=None,
+                 source_sha256=None, phash=None, duplicate_of=None, processing_inputs=None):
     """Create a new photo record"""
     try:
         photo_id = str(uuid.uuid4())
-        
+        timings_json = json.dumps(processing_timings) if processing_timings else None
+        inputs_json = json.dumps(processing_inputs) if processing_inputs else None
+
         db = get_db()
         db.execute('''
-            INSERT INTO photos (id, user_id, image_filename, original_ocr_text, ai_cleaned_text, edited_text)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (photo_id, user_id, image_filename, original_ocr, ai_cleaned_text, ai_cleaned_text))
+            INSERT INTO photos (id, user_id, image_filename, original_ocr_text, ai_cleaned_text, edited_text,
+                                processing_timings, source_sha256, phash, duplicate_of, processing_inputs)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (photo_id, user_id, image_filename, original_ocr, ai_cleaned_text, ai_cleaned_text, timings_json,
+              source_sha256, phash, duplicate_of, inputs_json))
         db.commit()
         
         logger.info(f"Photo {photo_id} created for user {user_id}")
@@ -34,12 +42,12 @@ def get_photo_by_id(photo_id, user_id):
     try:
         db = get_db()
         photo = db.execute('''
-            SELECT id, user_id, image_filename, original_ocr_text, ai_cleaned_text, edited_text, 
-                   created_at, updated_at
-            FROM photos 
+            SELECT id, user_id, image_filename, original_ocr_text, ai_cleaned_text, edited_text,
+                   processing_timings, duplicate_of, created_at, updated_at
+            FROM photos
             WHERE id = ? AND user_id = ?
         ''', (photo_id, user_id)).fetchone()
-        
+
         if photo:
             return {
                 'id': photo['id'],
@@ -48,6 +56,8 @@ def get_photo_by_id(photo_id, user_id):
                 'original_ocr_text': photo['original_ocr_text'],
                 'ai_cleaned_text': photo['ai_cleaned_text'],
                 'edited_text': photo['edited_text'],
+                'processing_timings': json.loads(photo['processing_timings']) if photo['processing_timings'] else None,
+                'duplicate_of': photo['duplicate_of'],
                 'created_at': photo['created_at'],
                 'updated_at': photo['updated_at'],
                 'created_at_dt': datetime.fromisoformat(photo['created_at'].replace('Z', '+00:00')) if photo['created_at'] else None
@@ -58,13 +68,29 @@ def get_photo_by_id(photo_id, user_id):
         logger.error(f"Error getting photo {photo_id}: {e}")
         return None
 
+def find_photo_by_source_hash(user_id, source_sha256):
+    """Get the user's photo whose original upload had this SHA-256, if any"""
+    try:
+        db = get_db()
+        row = db.execute('''
+            SELECT id FROM photos
+            WHERE user_id = ? AND source_sha256 = ?
+            ORDER BY created_at DESC
+            LIMIT 1
+        ''', (user_id, source_sha256)).fetchone()
+        return get_photo_by_id(row['id'], user_id) if row else None
+        
+    except Exception as e:
+        logger.error(f"Error looking up photo by hash for user {user_id}: {e}")
+        return None
+
 def load_all_photos_for_user(user_id):
     """Load all photos for a specific user"""
     try:
         db = get_db()
         photos = db.execute('''
             SELECT id, user_id, image_filename, original_ocr_text, ai_cleaned_text, edited_text,
-                   created_at, updated_at
+                   duplicate_of, created_at, updated_at
             FROM photos 
             WHERE user_id = ?
             ORDER BY created_at DESC
@@ -79,6 +105,7 @@ def load_all_photos_for_user(user_id):
                 'original_ocr_text': photo['original_ocr_text'],
                 'ai_cleaned_text': photo['ai_cleaned_text'],
                 'edited_text': photo['edited_text'],
+                'duplicate_of': photo['duplicate_of'],
                 'created_at': photo['created_at'],
                 'updated_at': photo['updated_at'],
                 'created_at_dt': datetime.fromisoformat(photo['created_at'].replace('Z', '+00:00')) if photo['created_at'] else None
@@ -91,6 +118,7 @@ def load_all_photos_for_user(user_id):
         logger.error(f"Error loading photos for user {user_id}: {e}")
         return []
 
+@timed('db.update_photo')
 def update_photo(user_id, photo_id, update_data):
     """Update a photo's data"""
     try:
@@ -131,6 +159,7 @@ def update_photo(user_id, photo_id, update_data):
         logger.error(f"Error updating photo {photo_id}: {e}")
         return False
 
+@timed('db.delete_photo')
 def delete_photo(user_id, photo_id):
     """Delete a photo"""
     try:
@@ -150,6 +179,40 @@ def delete_photo(user_id, photo_id):
         logger.error(f"Error deleting photo {photo_id}: {e}")
         return False
 
+def load_photos_for_reprocessing(user_id=None):
+    """Photo IDs, owners, files and recorded processing inputs, oldest first (all users by default)"""
+    try:
+        db = get_db()
+        query = 'SELECT id, user_id, image_filename, processing_inputs FROM photos'
+        params = ()
+        if user_id is not None:
+            query += ' WHERE user_id = ?'
+            params = (user_id,)
+        rows = db.execute(query + ' ORDER BY created_at', params).fetchall()
+        return [{
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'image_filename': row['image_filename'],
+            'processing_inputs': json.loads(row['processing_inputs']) if row['processing_inputs'] else {}
+        } for row in rows]
+        
+    except Exception as e:
+        logger.error(f"Error loading photos for reprocessing: {e}")
+        return []
+
+def set_processing_inputs(photo_id, processing_inputs):
+    """Record the fingerprints of the inputs a photo's texts were produced from"""
+    try:
+        db = get_db()
+        db.execute('UPDATE photos SET processing_inputs = ? WHERE id = ?',
+                   (json.dumps(processing_inputs), photo_id))
+        db.commit()
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error recording processing inputs for photo {photo_id}: {e}")
+        return False
+
 def get_photos_count_for_user(user_id):
     """Get total number of photos for a user"""
     try:
@@ -0,0 +1,269 @@
+"""
+Adaptive MJPEG preview streaming for RPi PhotoDoc OCR application.
+Measures how fast each viewer actually receives frames and lowers JPEG quality,
+resolution or frame rate for slow clients instead of letting frames pile up
+in the TCP send buffer.
+"""
+
+import time
+import logging
+from threading import Lock
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Quality ladder, best first. A width of None means "native lores width".
+# Level 0 must match what the camera encoder produces so fast clients get the
+# encoder output untouched (no decode/re-encode on the Pi).
+PREVIEW_LEVELS = [
+    {'quality': 70, 'width': None, 'fps': 30},
+    {'quality': 60, 'width': 960, 'fps': 20},
+    {'quality': 50, 'width': 640, 'fps': 15},
+    {'quality': 40, 'width': 480, 'fps': 10},
+    {'quality': 30, 'width': 320, 'fps': 5},
+]
+
+# Limits for per-client query parameter overrides
+MIN_QUALITY, MAX_QUALITY = 10, 95
+MIN_WIDTH = 160
+MIN_FPS, MAX_FPS = 1, 30
+
+# A frame whose send blocks for more than this share of the frame interval
+# means the socket buffer is full and latency is starting to build up.
+CONGESTION_RATIO = 0.5
+# Sends faster than this share of the interval count as headroom.
+HEADROOM_RATIO = 0.15
+# Seconds of uninterrupted headroom before trying the next better level
+UPGRADE_AFTER = 3.0
+# Minimum seconds between two downgrades so a single hiccup doesn't cascade
+DOWNGRADE_COOLDOWN = 1.0
+# Smoothing factor for the throughput estimate
+THROUGHPUT_ALPHA = 0.3
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def parse_preview_overrides(args):
+    """
+    Parse per-client preview overrides from request query parameters.
+
+    Supported parameters: quality (JPEG quality), width (pixels), fps,
+    adaptive (0/1, default 1). Invalid values are ignored.
+
+    Returns:
+        dict: Overrides with keys 'quality', 'width', 'fps' (None when not set)
+              and 'adaptive' (bool)
+    """
+    overrides = {'quality': None, 'width': None, 'fps': None, 'adaptive': True}
+
+    for key, low, high in (('quality', MIN_QUALITY, MAX_QUALITY),
+                           ('width', MIN_WIDTH, None),
+                           ('fps', MIN_FPS, MAX_FPS)):
+        raw = args.get(key)
+        if raw in (None, ''):
+            continue
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring invalid preview override {key}={raw!r}")
+            continue
+        overrides[key] = _clamp(value, low, high if high is not None else value)
+
+    adaptive = args.get('adaptive')
+    if adaptive is not None:
+        overrides['adaptive'] = str(adaptive).lower() not in ('0', 'false', 'no', 'off')
+
+    return overrides
+
+
+class PreviewTranscoder:
+    """
+    Re-encodes camera preview frames at lower quality/resolution.
+
+    Results are cached for the current source frame, so several clients
+    sitting on the same level share one decode/encode per frame.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._source = None
+        self._decoded = None
+        self._cache = {}
+
+    def transcode(self, frame: bytes, quality: int, width: int) -> bytes:
+        """
+        Return the frame encoded at the given JPEG quality and width.
+
+        Args:
+            frame: Source JPEG bytes from the camera encoder
+            quality: Target JPEG quality
+            width: Target width in pixels (height keeps the aspect ratio)
+
+        Returns:
+            bytes: Encoded JPEG, or the source frame if transcoding fails
+        """
+        key = (quality, width)
+        with self._lock:
+            if frame is not self._source:
+                self._source = frame
+                self._decoded = None
+                self._cache = {}
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+            try:
+                if self._decoded is None:
+                    self._decoded = cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_COLOR)
+                image = self._decoded
+                if image is None:
+                    return frame
+
+                if width and width < image.shape[1]:
+                    height = max(1, round(image.shape[0] * width / image.shape[1]))
+                    image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+                ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                if not ok:
+                    return frame
+                result = encoded.tobytes()
+                self._cache[key] = result
+                return result
+            except Exception as e:
+                logger.error(f"Preview transcoding failed: {e}")
+                return frame
+
+
+# Shared by all preview clients
+preview_transcoder = PreviewTranscoder()
+
+
+class AdaptivePreviewClient:
+    """
+    Per-viewer preview state: current quality level, pacing and throughput.
+
+    The stream generator asks should_send() before every camera frame,
+    encodes the frame with prepare() and reports how long the write took with
+    record_send(). Time spent inside the WSGI write is the time the socket
+    needed to accept the chunk, so long sends mean the client is not keeping up.
+    """
+
+    def __init__(self, overrides: dict = None, source_quality: int = None,
+                 source_width: int = None, transcoder: PreviewTranscoder = None):
+        """
+        Args:
+            overrides: Output of parse_preview_overrides()
+            source_quality: JPEG quality used by the camera encoder
+            source_width: Width of the frames produced by the camera encoder
+            transcoder: Shared transcoder (defaults to the module instance)
+        """
+        self.overrides = overrides or {'quality': None, 'width': None, 'fps': None, 'adaptive': True}
+        self.source_quality = source_quality or PREVIEW_LEVELS[0]['quality']
+        self.source_width = source_width
+        self.transcoder = transcoder or preview_transcoder
+
+        self.level = 0
+        self.throughput = None  # bytes per second, smoothed
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self._next_frame_time = 0.0
+        self._headroom_since = None
+        self._last_downgrade = 0.0
+
+    @property
+    def adaptive(self) -> bool:
+        return self.overrides.get('adaptive', True)
+
+    def settings(self) -> dict:
+        """Effective quality, width and fps for this client right now."""
+        level = PREVIEW_LEVELS[self.level]
+        quality = self.overrides.get('quality') or level['quality']
+        width = self.overrides.get('width') or level['width']
+        fps = self.overrides.get('fps') or level['fps']
+        return {
+            'quality': min(quality, self.source_quality),
+            'width': width,
+            'fps': fps
+        }
+
+    def frame_interval(self) -> float:
+        return 1.0 / self.settings()['fps']
+
+    def should_send(self, now: float = None) -> bool:
+        """Frame pacing: True when this client is due for another frame."""
+        now = time.monotonic() if now is None else now
+        if now < self._next_frame_time:
+            return False
+        interval = self.frame_interval()
+        # Don't try to "catch up" after a stall - that would burst old frames
+        self._next_frame_time = max(self._next_frame_time + interval, now)
+        return True
+
+    def prepare(self, frame: bytes) -> bytes:
+        """Encode the camera frame for this client's current settings."""
+        settings = self.settings()
+        width = settings['width']
+        if self.source_width and width and width >= self.source_width:
+            width = None
+
+        if settings['quality'] >= self.source_quality and not width:
+            return frame
+        return self.transcoder.transcode(frame, settings['quality'], width)
+
+    def record_send(self, num_bytes: int, elapsed: float, now: float = None) -> None:
+        """
+        Feed back how long writing a chunk to the client took.
+
+        Args:
+            num_bytes: Size of the chunk that was written
+            elapsed: Seconds the write blocked
+            now: Current monotonic time (for testing)
+        """
+        now = time.monotonic() if now is None else now
+        self.frames_sent += 1
+        self.bytes_sent += num_bytes
+
+        if elapsed > 0:
+            sample = num_bytes / elapsed
+            if self.throughput is None:
+                self.throughput = sample
+            else:
+                self.throughput = THROUGHPUT_ALPHA * sample + (1 - THROUGHPUT_ALPHA) * self.throughput
+
+        if not self.adaptive:
+            return
+
+        interval = self.frame_interval()
+        if elapsed > interval * CONGESTION_RATIO:
+            self._headroom_since = None
+            if self.level < len(PREVIEW_LEVELS) - 1 and now - self._last_downgrade >= DOWNGRADE_COOLDOWN:
+                self.level += 1
+                self._last_downgrade = now
+                logger.info(f"Preview client congested (send {elapsed * 1000:.0f} ms, "
+                            f"~{self._throughput_kbps()} kB/s). Lowering to level {self.level}: {self.settings()}")
+        elif elapsed < interval * HEADROOM_RATIO:
+            if self._headroom_since is None:
+                self._headroom_since = now
+            elif self.level > 0 and now - self._headroom_since >= UPGRADE_AFTER:
+                self.level -= 1
+                self._headroom_since = now
+                logger.info(f"Preview client has headroom (~{self._throughput_kbps()} kB/s). "
+                            f"Raising to level {self.level}: {self.settings()}")
+        else:
+            self._headroom_since = None
+
+    def _throughput_kbps(self) -> str:
+        return f"{self.throughput / 1024:.0f}" if self.throughput else "?"
+
+    def stats(self) -> dict:
+        """Summary for logging when the client disconnects."""
+        return {
+            'level': self.level,
+            'settings': self.settings(),
+            'frames_sent': self.frames_sent,
+            'bytes_sent': self.bytes_sent,
+            'throughput_bps': round(self.throughput) if self.throughput else None
+        }
@@ -0,0 +1,283 @@
+"""
+Sampling profiler for RPi PhotoDoc OCR application.
+A background thread periodically samples Python stacks (sys._current_frames)
+and counts them, so a slow capture can be profiled in production without a
+restart under cProfile. Profiles are saved in the collapsed-stack format read
+by flamegraph.pl, speedscope and similar tools.
+
+Two modes:
+    continuous  samples every thread until stopped
+    requests    profiles only the threads serving the next N requests to chosen endpoints
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get('PHOTODOC_PROFILE_DIR', os.path.join('logs', 'profiles'))
+DEFAULT_INTERVAL = 0.01  # 100 Hz keeps overhead to a few percent on a Pi 4
+MAX_PROFILES = 50
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+\.folded$')
+
+
+class SamplingProfiler:
+    """Counts the Python stacks of selected threads at a fixed interval."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_ids=None, max_depth: int = 128):
+        """
+        Args:
+            interval: Seconds between samples
+            thread_ids: Thread idents to sample (None samples every thread but the sampler)
+            max_depth: Frames kept per stack, innermost first
+        """
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                self.stacks[self._collapse(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+
+    def _collapse(self, thread_name: str, frame) -> str:
+        frames = []
+        while frame is not None and len(frames) < self.max_depth:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ';'.join(reversed(frames))
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format: 'root;caller;callee count' per line."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfilerController:
+    """Runs profiles for one process and keeps the results on disk."""
+
+    def __init__(self, directory: str = PROFILE_DIR, label: str = 'app'):
+        self.directory = directory
+        self.label = label
+        self._lock = threading.Lock()
+        self._continuous: Optional[SamplingProfiler] = None
+        self._armed = {'endpoints': set(), 'remaining': 0, 'interval': DEFAULT_INTERVAL}
+        self._active_requests = {}
+
+    # --- continuous mode ---
+
+    def start(self, interval: float = DEFAULT_INTERVAL) -> bool:
+        with self._lock:
+            if self._continuous is not None:
+                return False
+            self._continuous = SamplingProfiler(interval=interval)
+            self._continuous.start()
+        logger.info(f"Sampling profiler started ({self.label}, {interval * 1000:.0f} ms interval)")
+        return True
+
+    def stop(self) -> Optional[str]:
+        """Stop continuous profiling. Returns the saved profile name, if one was running."""
+        with self._lock:
+            profiler, self._continuous = self._continuous, None
+        if profiler is None:
+            return None
+        profiler.stop()
+        return self._save(profiler, 'continuous')
+
+    # --- per-request mode ---
+
+    def arm(self, endpoints, count: int, interval: float = DEFAULT_INTERVAL) -> None:
+        """Profile the next `count` requests to any of `endpoints` (Flask endpoint names)."""
+        with self._lock:
+            self._armed = {'endpoints': set(endpoints), 'remaining': max(0, int(count)), 'interval': interval}
+        logger.info(f"Profiler armed for the next {count} request(s) to {sorted(endpoints)}")
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._armed['remaining'] = 0
+
+    def request_started(self, endpoint: str) -> None:
+        with self._lock:
+            armed = self._armed
+            if armed['remaining'] <= 0 or endpoint not in armed['endpoints']:
+                return
+            armed['remaining'] -= 1
+            profiler = SamplingProfiler(interval=armed['interval'], thread_ids=[threading.get_ident()])
+            self._active_requests[threading.get_ident()] = (endpoint, profiler)
+        profiler.start()
+
+    def request_finished(self) -> None:
+        with self._lock:
+            entry = self._active_requests.pop(threading.get_ident(), None)
+        if entry is not None:
+            endpoint, profiler = entry
+            profiler.stop()
+            self._save(profiler, endpoint)
+
+    # --- results ---
+
+    def _save(self, profiler: SamplingProfiler, kind: str) -> Optional[str]:
+        if not profiler.stacks:
+            logger.info(f"Profile '{kind}' collected no samples, not saved")
+            return None
+        name = f"{self.label}_{kind}_{profiler.started_at.strftime('%Y%m%d-%H%M%S')}_{profiler.samples}.folded"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+                f.write(profiler.collapsed())
+            self._prune()
+            logger.info(f"Saved profile {name}: {profiler.samples} samples over {profiler.duration:.1f} s")
+            return name
+        except OSError as e:
+            logger.error(f"Failed to save profile {name}: {e}")
+            return None
+
+    def _prune(self) -> None:
+        profiles = self.list_profiles()
+        for entry in profiles[MAX_PROFILES:]:
+            os.remove(os.path.join(self.directory, entry['name']))
+
+    def list_profiles(self) -> list:
+        """Saved profiles, newest first."""
+        try:
+            names = [n for n in os.listdir(self.directory) if PROFILE_NAME_RE.match(n)]
+        except FileNotFoundError:
+            return []
+        profiles = []
+        for name in names:
+            stat = os.stat(os.path.join(self.directory, name))
+            profiles.append({'name': name, 'size': stat.st_size,
+                             'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds')})
+        return sorted(profiles, key=lambda p: p['created_at'], reverse=True)
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Path of a saved profile, or None for unknown or unsafe names."""
+        if not PROFILE_NAME_RE.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def status(self) -> dict:
+        with self._lock:
+            continuous = self._continuous
+            return {
+                'target': self.label,
+                'continuous': {
+                    'running': continuous is not None,
+                    'started_at': continuous.started_at.isoformat(timespec='seconds') if continuous else None,
+                    'samples': continuous.samples if continuous else 0
+                },
+                'requests': {
+                    'endpoints': sorted(self._armed['endpoints']),
+                    'remaining': self._armed['remaining'],
+                    'in_progress': len(self._active_requests)
+                },
+                'profiles': self.list_profiles()
+            }
+
+
+def create_profiler_blueprint(controller: ProfilerController, authorize, endpoints):
+    """
+    JSON API for a ProfilerController, and request hooks for per-request mode.
+
+    Args:
+        controller: Controller of this process
+        authorize: Callable returning True if the current request may use the profiler
+        endpoints: Endpoint names that may be selected for per-request profiling
+
+    Returns:
+        Blueprint: Register with the URL prefix of choice
+    """
+    from flask import Blueprint, jsonify, request, send_file, abort
+
+    bp = Blueprint('profiler', __name__)
+
+    @bp.before_app_request
+    def _profile_request():
+        if request.endpoint:
+            controller.request_started(request.endpoint)
+
+    @bp.teardown_app_request
+    def _finish_profile(exc=None):
+        controller.request_finished()
+
+    @bp.before_request
+    def _authorize():
+        if not authorize():
+            abort(403)
+
+    def _status():
+        result = controller.status()
+        result['available_endpoints'] = list(endpoints)
+        return result
+
+    @bp.route('/status', methods=['GET'])
+    def status():
+        return jsonify(_status())
+
+    @bp.route('/start', methods=['POST'])
+    def start():
+        data = request.get_json(silent=True) or {}
+        interval = min(max(float(data.get('interval_ms', DEFAULT_INTERVAL * 1000)), 1.0), 1000.0) / 1000
+        if data.get('mode') == 'requests':
+            selected = [e for e in data.get('endpoints', endpoints) if e in endpoints]
+            if not selected:
+                return jsonify({'success': False, 'error': f'Choose endpoints from {list(endpoints)}'}), 400
+            controller.arm(selected, min(int(data.get('count', 1)), 100), interval)
+            return jsonify({'success': True, 'status': _status()})
+        if not controller.start(interval):
+            return jsonify({'success': False, 'error': 'Profiler is already running'}), 409
+        return jsonify({'success': True, 'status': _status()})
+
+    @bp.route('/stop', methods=['POST'])
+    def stop():
+        controller.disarm()
+        name = controller.stop()
+        return jsonify({'success': True, 'profile': name, 'status': _status()})
+
+    @bp.route('/profiles/<name>', methods=['GET'])
+    def download(name):
+        path = controller.profile_path(name)
+        if path is None:
+            abort(404)
+        return send_file(os.path.abspath(path), mimetype='text/plain', as_attachment=True, download_name=name)
+
+    return bp
@@ -0,0 +1,303 @@
+"""
+Archive reprocessing for RPi PhotoDoc OCR application.
+Re-runs OCR and/or LLM cleanup over the stored photos, for example after the
+OCR languages or the `cleanup_ocr` prompt changed. New results are written to
+`original_ocr_text` and `ai_cleaned_text`; the user's `edited_text` is never
+modified.
+
+Each photo records a fingerprint of the inputs its texts were produced from
+(image bytes, OCR settings and engine; OCR text, prompt and model), so photos
+whose inputs have not changed since the last run are skipped. PDF pages whose
+text came from the PDF's text layer are never re-OCR'd. Progress is
+checkpointed, and an interrupted run continues with --resume.
+
+Usage:
+    python reprocess.py [--steps ocr,cleanup] [--user ID] [--workers N] [--limit N]
+                        [--force] [--dry-run] [--resume] [--checkpoint PATH]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+ALL_STEPS = ('ocr', 'cleanup')
+DEFAULT_CHECKPOINT = os.path.join('logs', 'reprocess_checkpoint.json')
+CHECKPOINT_EVERY = 10  # completed photos between checkpoint writes
+PROGRESS_INTERVAL = 10.0  # seconds between progress lines
+TEXT_LAYER = 'text_layer'  # recorded OCR input of PDF pages whose text came from the text layer
+
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+
+
+def ocr_inputs(filepath, user_ocr_settings):
+    """
+    OCR mode, engine and input fingerprint for one image.
+
+    Returns:
+        tuple: (mode, fingerprint)
+    """
+    from settings_routes import get_ocr_mode, get_ocr_server_url
+    from ocr_cache import file_sha256, cache_params, local_engine, remote_engine
+    mode = user_ocr_settings.get('preferred_mode') or get_ocr_mode()
+    if mode == 'remote':
+        url = get_ocr_server_url()
+        engine = remote_engine(url) or f"remote:{url}"
+    else:
+        engine = local_engine()
+    return mode, _fingerprint(file_sha256(filepath), cache_params(user_ocr_settings, remote=mode == 'remote'), engine)
+
+
+def cleanup_inputs(ocr_text) -> str:
+    """Fingerprint of the LLM cleanup inputs: OCR text, prompt and model"""
+    from settings_routes import get_prompt, get_llm_model_name
+    return _fingerprint(ocr_text or '', get_prompt('cleanup_ocr'), get_llm_model_name())
+
+
+def _as_text(ocr_result) -> str:
+    """OCR output as plain text (detail_level > 0 returns detections)"""
+    if isinstance(ocr_result, list):
+        return "\n".join(str(item[1]) for item in ocr_result if len(item) > 1)
+    return ocr_result or ''
+
+
+def reprocess_photo(photo, steps, upload_folder, force=False, dry_run=False) -> dict:
+    """
+    Re-run the selected steps for one photo. Must be called inside an app context.
+
+    Args:
+        photo: Row from load_photos_for_reprocessing()
+        steps: Subset of ALL_STEPS
+        upload_folder: Directory holding the image files
+        force: Ignore recorded inputs (and the OCR cache)
+        dry_run: Only report which steps would run
+
+    Returns:
+        dict: {'id', 'status': 'updated'|'unchanged'|'would_update'|'failed', 'steps': [...], 'error'}
+    """
+    from routes import perform_ocr_local, perform_ocr_remote, call_llm
+    from photo_manager import get_photo_by_id, update_photo, set_processing_inputs
+    from user_settings import get_ocr_settings
+
+    result = {'id': photo['id'], 'status': 'unchanged', 'steps': []}
+    recorded = photo['processing_inputs'] or {}
+    inputs = dict(recorded)
+    updates = {}
+    current = get_photo_by_id(photo['id'], photo['user_id'])
+    if current is None:
+        return dict(result, status='failed', error='photo not found')
+    ocr_text = current['original_ocr_text']
+
+    try:
+        # The text layer is exact; OCR of the rendered page could only make it worse
+        if 'ocr' in steps and recorded.get('ocr') != TEXT_LAYER:
+            filepath = os.path.join(upload_folder, photo['image_filename'])
+            if not os.path.exists(filepath):
+                raise FileNotFoundError(f"image file missing: {photo['image_filename']}")
+            user_ocr_settings = get_ocr_settings(photo['user_id'])
+            mode, fingerprint = ocr_inputs(filepath, user_ocr_settings)
+            if force or recorded.get('ocr') != fingerprint:
+                result['steps'].append('ocr')
+                if not dry_run:
+                    # Local OCR shares one EasyOCR reader (routes.ocr_reader_lock), so only
+                    # remote OCR and LLM calls actually overlap between workers
+                    if mode == 'remote':
+                        ocr_result = perform_ocr_remote(filepath, user_ocr_settings, use_cache=not force)
+                    else:
+                        ocr_result = perform_ocr_local(filepath, user_ocr_settings, use_cache=not force)
+                    ocr_text = _as_text(ocr_result)
+                    updates['original_ocr_text'] = ocr_text
+                    inputs['ocr'] = fingerprint
+
+        if 'cleanup' in steps:
+            fingerprint = cleanup_inputs(ocr_text)
+            if force or recorded.get('cleanup') != fingerprint:
+                result['steps'].append('cleanup')
+                if not dry_run:
+                    if ocr_text and ocr_text.strip():
+                        cleaned = call_llm('cleanup_ocr', ocr_text)
+                        if cleaned.startswith('Error'):
+                            raise RuntimeError(cleaned)
+                    else:
+                        cleaned = "No text found by OCR."
+                    updates['ai_cleaned_text'] = cleaned
+                    inputs['cleanup'] = fingerprint
+
+    except Exception as e:
+        # Keep whatever finished (e.g. new OCR text when only the LLM failed)
+        if updates and update_photo(photo['user_id'], photo['id'], updates):
+            set_processing_inputs(photo['id'], inputs)
+        return dict(result, status='failed', error=str(e)[:200])
+
+    if dry_run:
+        return dict(result, status='would_update' if result['steps'] else 'unchanged')
+    if updates:
+        # update_photo only accepts text fields; edited_text is never part of `updates`
+        if not update_photo(photo['user_id'], photo['id'], updates):
+            return dict(result, status='failed', error='database update failed')
+        set_processing_inputs(photo['id'], inputs)
+        result['status'] = 'updated'
+    return result
+
+
+class Checkpoint:
+    """Photo IDs finished by a run, saved atomically so a run can resume."""
+
+    def __init__(self, path: str, options: dict):
+        self.path = path
+        self.options = options
+        self.done = set()
+        self.failed = {}
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._pending = 0
+
+    @classmethod
+    def resume(cls, path: str, options: dict) -> 'Checkpoint':
+        checkpoint = cls(path, options)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"No checkpoint at {path}, starting from the beginning")
+            return checkpoint
+        if data.get('options') != options:
+            logger.warning(f"Checkpoint options {data.get('options')} differ from this run's {options}")
+        checkpoint.done = set(data.get('done', []))
+        checkpoint.failed = data.get('failed', {})
+        checkpoint.started_at = data.get('started_at', checkpoint.started_at)
+        return checkpoint
+
+    def record(self, outcome: dict) -> None:
+        if outcome['status'] == 'failed':
+            self.failed[outcome['id']] = outcome.get('error')
+        else:
+            self.done.add(outcome['id'])
+            self.failed.pop(outcome['id'], None)
+        self._pending += 1
+        if self._pending >= CHECKPOINT_EVERY:
+            self.save()
+
+    def save(self, finished: bool = False) -> None:
+        data = {
+            'options': self.options,
+            'started_at': self.started_at,
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            'finished': finished,
+            'done': sorted(self.done),
+            'failed': self.failed
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._pending = 0
+
+
+def _format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def run(app, steps, user_id=None, workers=2, limit=None, force=False, dry_run=False,
+        checkpoint_path=DEFAULT_CHECKPOINT, resume=False) -> dict:
+    """
+    Reprocess the archive with a pool of workers.
+
+    Returns:
+        dict: Counts per status, elapsed seconds and throughput
+    """
+    from photo_manager import load_photos_for_reprocessing
+
+    options = {'steps': sorted(steps), 'user_id': user_id, 'force': force}
+    checkpoint = Checkpoint.resume(checkpoint_path, options) if resume else Checkpoint(checkpoint_path, options)
+    upload_folder = os.path.join(app.root_path, app.config['UPLOAD_FOLDER'])
+
+    with app.app_context():
+        photos = [p for p in load_photos_for_reprocessing(user_id) if p['id'] not in checkpoint.done]
+    if limit:
+        photos = photos[:limit]
+    total = len(photos)
+    logger.info(f"Reprocessing {total} photo(s): steps={','.join(steps)}, workers={workers}"
+                f"{', dry run' if dry_run else ''}{f', {len(checkpoint.done)} already done' if resume else ''}")
+
+    def work(photo):
+        with app.app_context():
+            return reprocess_photo(photo, steps, upload_folder, force=force, dry_run=dry_run)
+
+    counts = {'updated': 0, 'unchanged': 0, 'would_update': 0, 'failed': 0}
+    started = last_report = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(work, photo) for photo in photos]
+        try:
+            for completed, future in enumerate(as_completed(futures), 1):
+                outcome = future.result()
+                counts[outcome['status']] += 1
+                if outcome['status'] == 'failed':
+                    logger.warning(f"Photo {outcome['id']} failed: {outcome.get('error')}")
+                if not dry_run:
+                    checkpoint.record(outcome)
+
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL or completed == total:
+                    rate = completed / max(now - started, 1e-6)
+                    eta = _format_eta((total - completed) / rate) if rate > 0 else '?'
+                    logger.info(f"{completed}/{total} photos ({counts['updated']} updated, "
+                                f"{counts['unchanged']} unchanged, {counts['failed']} failed), "
+                                f"{rate:.2f} photos/s, ETA {eta}")
+                    last_report = now
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            if not dry_run:
+                checkpoint.save()
+            logger.warning(f"Interrupted; continue with --resume (checkpoint: {checkpoint_path})")
+            raise
+
+    if not dry_run:
+        checkpoint.save(finished=True)
+    elapsed = time.monotonic() - started
+    return dict(counts, total=total, elapsed_seconds=round(elapsed, 1),
+                photos_per_second=round(total / elapsed, 3) if elapsed > 0 else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', default=','.join(ALL_STEPS), help='Comma separated steps: ocr, cleanup')
+    parser.add_argument('--user', type=int, help='Only reprocess photos of this user ID')
+    parser.add_argument('--workers', type=int, default=2, help='Photos processed in parallel')
+    parser.add_argument('--limit', type=int, help='Process at most this many photos')
+    parser.add_argument('--force', action='store_true', help='Reprocess even if the inputs have not changed')
+    parser.add_argument('--dry-run', action='store_true', help='Only report how many photos would change')
+    parser.add_argument('--resume', action='store_true', help='Skip photos finished by the previous run')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='Checkpoint file')
+    args = parser.parse_args()
+
+    steps = [s.strip() for s in args.steps.split(',') if s.strip()]
+    unknown = set(steps) - set(ALL_STEPS)
+    if unknown or not steps:
+        parser.error(f"Unknown steps: {sorted(unknown)}; choose from {list(ALL_STEPS)}")
+
+    from app import app  # Configures logging, settings and the database
+    try:
+        summary = run(app, steps, user_id=args.user, workers=args.workers, limit=args.limit,
+                      force=args.force, dry_run=args.dry_run, checkpoint_path=args.checkpoint,
+                      resume=args.resume)
+    except KeyboardInterrupt:
+        return 130
+    print(json.dumps(summary, indent=2))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
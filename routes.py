@@ -3,21 +3,23 @@ import json
 import uuid
 import requests
 import time # For camera feed
+from functools import partial
+from threading import Lock
 from flask import render_template, Blueprint, request, redirect, url_for, flash, current_app, jsonify, Response
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 from urllib.parse import urlparse  # URL validation for Werkzeug 3.x compatibility
-import easyocr
 # import cv2 # cv2 is imported in app.py if needed for specific image operations there, not directly in routes.
 from models import User
-from settings_routes import get_prompt, get_llm_model_name, get_ocr_mode, get_ocr_server_url, DEFAULT_PROMPT_KEYS
-from user_settings import get_ocr_settings
+from settings_routes import get_prompt, get_llm_model_name, get_ocr_mode, get_ocr_server_url, get_preview_codec, DEFAULT_PROMPT_KEYS
+from user_settings import get_ocr_settings, get_ingest_settings, get_image_enhancement_settings
 from photo_manager import (
     create_photo,
     load_all_photos_for_user,
     get_photo_by_id,
     update_photo,
-    delete_photo
+    delete_photo,
+    find_photo_by_source_hash
 )
 from document_manager import (
     create_document,
@@ -29,21 +31,32 @@ from document_manager import (
     get_documents_containing_photo
 )
 from datetime import datetime
-from camera_rpi import rpi_camera_instance # Import the camera instance
-from image_enhancement import enhancement_manager # Import the enhancement manager
+from camera_rpi import get_camera # Camera is initialized on first use
+from image_enhancement import get_enhancement_manager, OCRPreprocessor
+from capture_quality import CaptureQualityScorer, capture_with_quality_gate
+from duplicates import check_duplicate
+from bulk_upload import bulk_batches, BatchLimitExceeded, MEMORY_WAIT_SECONDS
+from pdf_import import is_pdf
+from metrics import stage_timer, stage_errors, timed
+from tracing import start_trace, end_trace, current_trace, propagation_headers, load_traces
+from memory_governor import get_memory_governor, MemoryBudgetExceeded
+from ocr_cache import (
+    file_sha256, cache_params, local_engine, remote_engine, note_remote_engine, get_cached_ocr, store_ocr_result
+)
+from startup import startup_tracker
+from preview_stream import AdaptivePreviewClient, parse_preview_overrides
+from reprocess import ocr_inputs, cleanup_inputs, TEXT_LAYER
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Debug camera import
-logger.info("=== Routes module initializing ===")
-logger.info(f"Camera instance imported: {type(rpi_camera_instance)}")
-logger.info(f"Camera available at import: {rpi_camera_instance.is_available()}")
-
 main_bp = Blueprint('main', __name__)
 
 # OCR readers cache - will be initialized per user language preference
 ocr_readers = {}
+ocr_reader_last_used = {}  # languages key -> time.monotonic() of last use
+# One reader per language set is shared by concurrent uploads, like the OCR server's reader_lock
+ocr_reader_lock = Lock()
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -56,50 +69,131 @@ def get_or_create_ocr_reader(languages):
     if languages_key not in ocr_readers:
         try:
             logger.info(f"Initializing EasyOCR reader for languages: {languages}")
-            ocr_readers[languages_key] = easyocr.Reader(languages)
+            with startup_tracker.warming('ocr'):
+                import easyocr  # Slow import (pulls in torch), so only load it when OCR runs locally
+                ocr_readers[languages_key] = easyocr.Reader(languages)
         except Exception as e:
             logger.error(f"Error initializing EasyOCR reader for {languages}: {e}")
             raise Exception(f"EasyOCR reader initialization failed: {e}")
     
+    ocr_reader_last_used[languages_key] = time.monotonic()
     return ocr_readers[languages_key]
 
-def perform_ocr_local(filepath, user_ocr_settings):
-    """Perform OCR using local EasyOCR with user-specific settings"""
+def unload_idle_ocr_readers(aggressive=False):
+    """Drop OCR readers that have not been used recently; under memory pressure, after one minute"""
+    idle_limit = 60 if aggressive else get_memory_governor().reader_idle_seconds
+    now = time.monotonic()
+    unloaded = 0
+    for languages_key in list(ocr_readers):
+        if now - ocr_reader_last_used.get(languages_key, 0) >= idle_limit:
+            # A request already holding the reader keeps it alive until it finishes
+            ocr_readers.pop(languages_key, None)
+            ocr_reader_last_used.pop(languages_key, None)
+            logger.info(f"Unloaded idle EasyOCR reader for languages: {list(languages_key)}")
+            unloaded += 1
+    return unloaded
+
+get_memory_governor().register_reclaimer('ocr_readers', unload_idle_ocr_readers)
+
+def acquire_pipeline_memory(kind, user_id):
+    """Wait for memory for one capture/upload; raises MemoryBudgetExceeded if none frees up"""
+    governor = get_memory_governor()
+    ocr_settings = get_ocr_settings(user_id)
+    ocr_local = ocr_settings.get('preferred_mode', get_ocr_mode()) != 'remote'
+    reader_loaded = tuple(sorted(ocr_settings.get('languages', ['uk', 'en']))) in ocr_readers
+    estimate = governor.estimate_pipeline_mb(get_image_enhancement_settings(user_id), ocr_local, reader_loaded)
+    return governor.acquire(kind, estimate)
+
+@timed('ocr_preprocess')
+def prepare_ocr_input(filepath, user_ocr_settings):
+    """Preprocessed grayscale array for OCR, or None to OCR the stored file as-is"""
+    preprocessor = OCRPreprocessor.from_settings(user_ocr_settings)
+    if preprocessor is None:
+        return None
+    try:
+        processed, _ = preprocessor.process_file(filepath)
+        return processed
+    except Exception as e:
+        logger.warning(f"OCR preprocessing failed for {filepath}, using original image: {e}")
+        return None
+
+@timed('ocr_local')
+def perform_ocr_local(filepath, user_ocr_settings, use_cache=True):
+    """Perform OCR using local EasyOCR with user-specific settings (use_cache=False always re-reads)"""
     languages = user_ocr_settings.get('languages', ['uk', 'en'])
     detail_level = user_ocr_settings.get('detail_level', 0)
     paragraph_mode = user_ocr_settings.get('paragraph_mode', True)
     
     try:
-        reader = get_or_create_ocr_reader(languages)
-        result = reader.readtext(filepath, detail=detail_level, paragraph=paragraph_mode, workers=0)
+        # The file has already been enhanced, so this hashes exactly what EasyOCR would read
+        image_sha256 = file_sha256(filepath)
+        params, engine = cache_params(user_ocr_settings), local_engine()
+        cached = get_cached_ocr(image_sha256, params, engine) if use_cache else None
+        if cached is not None:
+            return cached
         
-        if detail_level > 0:
-            # Return detailed results with bounding boxes and confidence
-            return result
-        else:
+        ocr_input = prepare_ocr_input(filepath, user_ocr_settings)
+        if ocr_input is None:
+            ocr_input = filepath
+        with ocr_reader_lock:
+            reader = get_or_create_ocr_reader(languages)
+            result = reader.readtext(ocr_input, detail=detail_level, paragraph=paragraph_mode, workers=0)
+            ocr_reader_last_used[tuple(sorted(languages))] = time.monotonic()
+        
+        if detail_level == 0:
             # Return just the text
-            return "\n".join(result)
+            result = "\n".join(result)
+        # Otherwise return detailed results with bounding boxes and confidence
+        store_ocr_result(image_sha256, params, engine, result)
+        return result
     except Exception as e:
         logger.error(f"Local OCR processing failed for {filepath}: {e}")
         raise
 
-def perform_ocr_remote(filepath):
-    """Perform OCR using remote OCR server"""
+@timed('ocr_remote')
+def perform_ocr_remote(filepath, user_ocr_settings=None, use_cache=True):
+    """Perform OCR using remote OCR server (use_cache=False always re-reads)"""
     ocr_server_url = get_ocr_server_url()
     
     try:
-        with open(filepath, 'rb') as f:
-            files = {'image': (os.path.basename(filepath), f, 'image/jpeg')}
-            response = requests.post(ocr_server_url, files=files, timeout=60)
-            response.raise_for_status()
-            
-            result = response.json()
-            if result.get('success'):
-                return result.get('text', '')
-            else:
-                error_msg = result.get('error', 'Unknown error from OCR server')
-                logger.error(f"Remote OCR server error: {error_msg}")
-                raise Exception(f"OCR Server Error: {error_msg}")
+        image_sha256 = file_sha256(filepath)
+        params = cache_params(user_ocr_settings, remote=True)
+        engine = remote_engine(ocr_server_url) if use_cache else None
+        cached = get_cached_ocr(image_sha256, params, engine) if engine else None
+        if cached is not None:
+            return cached
+        
+        processed = prepare_ocr_input(filepath, user_ocr_settings)
+        png_bytes = OCRPreprocessor.encode_png(processed) if processed is not None else None
+        if png_bytes is not None:
+            # Send the smaller preprocessed image; the original stays archived locally
+            name = os.path.splitext(os.path.basename(filepath))[0] + '.png'
+            response = requests.post(ocr_server_url, files={'image': (name, png_bytes, 'image/png')},
+                                     headers=propagation_headers(), timeout=60)
+        else:
+            with open(filepath, 'rb') as f:
+                files = {'image': (os.path.basename(filepath), f, 'image/jpeg')}
+                response = requests.post(ocr_server_url, files=files, headers=propagation_headers(), timeout=60)
+        response.raise_for_status()
+        
+        result = response.json()
+        trace = current_trace()
+        if trace is not None:
+            # Server-side breakdown, so queueing on a busy OCR server shows up in this trace
+            for stage, ms in (result.get('timings') or {}).items():
+                trace.add_span(f"ocr_server.{stage}", ms)
+        if result.get('success'):
+            text = result.get('text', '')
+            # Key the result by the engine that actually produced it
+            if result.get('engine'):
+                engine = note_remote_engine(ocr_server_url, result['engine'])
+            if engine:
+                store_ocr_result(image_sha256, params, engine, text)
+            return text
+        else:
+            error_msg = result.get('error', 'Unknown error from OCR server')
+            logger.error(f"Remote OCR server error: {error_msg}")
+            raise Exception(f"OCR Server Error: {error_msg}")
                 
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to connect to OCR server at {ocr_server_url}: {e}")
@@ -110,8 +204,8 @@ def perform_ocr_remote(filepath):
 
 def perform_ocr(filepath, user_id=None):
     """Perform OCR using either local or remote method based on user and system settings"""
-    # Get user OCR settings if user is provided
-    if user_id and current_user.is_authenticated:
+    # Get user OCR settings if user is provided (also outside a request, e.g. bulk uploads)
+    if user_id:
         user_ocr_settings = get_ocr_settings(user_id)
         preferred_mode = user_ocr_settings.get('preferred_mode', 'local')
     else:
@@ -126,11 +220,39 @@ def perform_ocr(filepath, user_id=None):
     
     if ocr_mode == 'remote':
         logger.info(f"Using remote OCR for {filepath}")
-        return perform_ocr_remote(filepath)
+        return perform_ocr_remote(filepath, user_ocr_settings)
     else:
         logger.info(f"Using local OCR for {filepath} with settings: {user_ocr_settings}")
         return perform_ocr_local(filepath, user_ocr_settings)
 
+def initial_processing_inputs(filepath, user_id, ocr_text, cleaned_text, text_layer=False):
+    """
+    Fingerprints of the steps that produced a new photo's texts, so reprocess.py
+    skips them until the image, settings, prompt or model change.
+
+    Args:
+        filepath: Image the OCR ran on
+        user_id: Owner of the photo
+        ocr_text: OCR result, or None if OCR failed
+        cleaned_text: LLM cleanup result, or None if the cleanup failed
+        text_layer: ocr_text came from a PDF text layer; reprocess.py never re-OCRs it
+
+    Returns:
+        dict: {'ocr': ..., 'cleanup': ...} for the steps that succeeded, or None
+    """
+    inputs = {}
+    try:
+        if text_layer:
+            inputs['ocr'] = TEXT_LAYER
+        elif ocr_text is not None:
+            inputs['ocr'] = ocr_inputs(filepath, get_ocr_settings(user_id))[1]
+        if inputs and cleaned_text is not None:
+            inputs['cleanup'] = cleanup_inputs(ocr_text)
+    except Exception as e:
+        logger.warning(f"Could not fingerprint the processing inputs of {filepath}: {e}")
+    return inputs or None
+
+@timed('llm')
 def call_llm(prompt_text_key, text_to_process, custom_prompt_text=None):
     from settings_routes import load_system_settings
     system_settings = load_system_settings()
@@ -152,7 +274,7 @@ def call_llm(prompt_text_key, text_to_process, custom_prompt_text=None):
         "options": {"num_predict": 1024, "temperature": 0.3} # Example options
     }
     try:
-        response = requests.post(llm_url, json=payload, timeout=120) # Timeout can be configured
+        response = requests.post(llm_url, json=payload, headers=propagation_headers(), timeout=120) # Timeout can be configured
         response.raise_for_status()
         response_data = response.json()
 
@@ -169,9 +291,11 @@ def call_llm(prompt_text_key, text_to_process, custom_prompt_text=None):
 
     except requests.exceptions.RequestException as e:
         logger.error(f"LLM request failed: {e}")
+        stage_errors.inc(stage='llm')
         return f"Error communicating with LLM: {e}"
     except json.JSONDecodeError: # If response is not JSON
         logger.error(f"Failed to decode LLM JSON response: {response.text}")
+        stage_errors.inc(stage='llm')
         return "Error: Failed to decode LLM response (not JSON). Content: " + response.text[:200]
 
 def is_safe_url(target):
@@ -273,6 +397,28 @@ def logout():
     # flash('You have been logged out.', 'info') # Optional
     return redirect(url_for('main.login'))
 
+# Readiness probe: the app is serving requests; subsystems warm up lazily
+@main_bp.route('/ready', methods=['GET'])
+def ready():
+    report = startup_tracker.report()
+    report['ready'] = True
+    report['warm'] = [name for name, entry in report['subsystems'].items() if entry.get('state') == 'ready']
+    return jsonify(report)
+
+# Recorded traces of the current user's captures/uploads, newest first, with the
+# OCR server's spans for the same trace ID when it writes to the same trace file
+@main_bp.route('/traces', methods=['GET'])
+@main_bp.route('/traces/<trace_id>', methods=['GET'])
+@login_required
+def traces_view(trace_id=None):
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    traces = load_traces(trace_id=trace_id, limit=limit if trace_id is None else 1000)
+    own_ids = {t['trace_id'] for t in traces if t.get('attributes', {}).get('user_id') == current_user.id}
+    traces = [t for t in traces if t['trace_id'] in own_ids]
+    if trace_id is not None and not traces:
+        return jsonify({'error': 'Trace not found'}), 404
+    return jsonify({'traces': traces[:limit] if trace_id is None else traces})
+
 # New route to check camera availability
 @main_bp.route('/camera_status', methods=['GET'])
 @login_required
@@ -280,19 +426,24 @@ def camera_status():
     logger.info("=== Camera status endpoint called ===")
     try:
         logger.info("Checking camera availability...")
+        camera = get_camera()
         
         # Add detailed debug info
-        logger.info(f"Camera instance type: {type(rpi_camera_instance)}")
-        logger.info(f"Camera _is_initialized: {getattr(rpi_camera_instance, '_is_initialized', 'Not set')}")
-        logger.info(f"Camera _camera object: {getattr(rpi_camera_instance, '_camera', 'Not set')}")
+        logger.info(f"Camera instance type: {type(camera)}")
+        logger.info(f"Camera _is_initialized: {getattr(camera, '_is_initialized', 'Not set')}")
+        logger.info(f"Camera _camera object: {getattr(camera, '_camera', 'Not set')}")
         
-        available = rpi_camera_instance.is_available()
+        available = camera.is_available()
         logger.info(f"Camera available: {available}")
         
         if available:
-            streaming = rpi_camera_instance._is_streaming
+            streaming = camera._is_streaming
             logger.info(f"Camera streaming: {streaming}")
-            response_data = {'available': True, 'streaming': streaming}
+            response_data = {
+                'available': True,
+                'streaming': streaming,
+                'preview_codec': camera.preview_codec if streaming else get_preview_codec()
+            }
             logger.info(f"Returning positive response: {response_data}")
             return jsonify(response_data)
         else:
@@ -309,16 +460,22 @@ def camera_status():
 @main_bp.route('/start_camera_stream', methods=['POST'])
 @login_required
 def start_camera_stream():
+    camera = get_camera()
     logger.info(f"Start camera stream requested by user {current_user.id}")
     
-    if not rpi_camera_instance.is_available():
+    if not camera.is_available():
         logger.error("Start stream requested but camera not available")
         return jsonify({'success': False, 'error': 'Camera not available.'}), 503
     
     logger.info("Attempting to start camera stream")
-    if rpi_camera_instance.start_streaming():
+    # Browsers without Media Source Extensions ask for MJPEG explicitly
+    requested = (request.get_json(silent=True) or {}).get('preview_codec')
+    camera.set_preview_codec(requested or get_preview_codec())
+    if camera.start_streaming():
         logger.info("Camera stream started successfully")
-        return jsonify({'success': True, 'message': 'Camera stream started.'})
+        # The camera may have fallen back to MJPEG if the H.264 encoder failed
+        return jsonify({'success': True, 'message': 'Camera stream started.',
+                        'preview_codec': camera.preview_codec})
     else:
         logger.error("Failed to start camera stream")
         return jsonify({'success': False, 'error': 'Failed to start camera stream.'}), 500
@@ -326,67 +483,153 @@ def start_camera_stream():
 @main_bp.route('/stop_camera_stream', methods=['POST'])
 @login_required
 def stop_camera_stream():
-    if not rpi_camera_instance.is_available(): # Should not happen if stream was started
+    camera = get_camera()
+    if not camera.is_available(): # Should not happen if stream was started
         return jsonify({'success': False, 'error': 'Camera not available.'}), 503
-    rpi_camera_instance.stop_streaming()
+    camera.stop_streaming()
     return jsonify({'success': True, 'message': 'Camera stream stopped.'})
 
-def gen_camera_feed():
-    """Video streaming generator function."""
+def gen_camera_feed(client):
+    """Video streaming generator function.
+
+    Frames are paced and re-encoded per client by AdaptivePreviewClient. The
+    time spent blocked in the yield is the time the server needed to push the
+    chunk into the socket, which is what the client uses to adapt.
+    """
+    camera = get_camera()
     logger.info("gen_camera_feed called.")
-    if not rpi_camera_instance.is_available():
+    if not camera.is_available():
         logger.warning("gen_camera_feed: Camera feed requested but camera not available.")
         return
     
-    if not rpi_camera_instance._is_streaming:
+    if not camera._is_streaming:
         logger.warning("gen_camera_feed: Camera feed requested but stream not active. Client should start stream first.")
         return
 
-    logger.info("gen_camera_feed: Starting frame loop.")
+    logger.info(f"gen_camera_feed: Starting frame loop with settings {client.settings()}.")
     frames_yielded = 0
-    while True:
-        # Check camera state inside the loop
-        if not rpi_camera_instance.is_available() or not rpi_camera_instance._is_streaming:
-            logger.warning("gen_camera_feed: Camera became unavailable or stopped streaming. Exiting feed loop.")
-            break
-        frame = rpi_camera_instance.get_frame()
-        if frame is None:
-            time.sleep(0.01)
-            continue
-        if not isinstance(frame, bytes):
-            logger.error("gen_camera_feed: Frame is not bytes, skipping frame.")
-            continue
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-        frames_yielded += 1
-        if frames_yielded == 1:
-            logger.info(f"gen_camera_feed: Successfully yielded first frame of size {len(frame)} bytes.")
+    try:
+        while True:
+            # Check camera state inside the loop
+            if not camera.is_available() or not camera._is_streaming:
+                logger.warning("gen_camera_feed: Camera became unavailable or stopped streaming. Exiting feed loop.")
+                break
+            # get_frame() always waits for the newest frame, so skipped frames are
+            # simply dropped instead of queueing up for slow clients
+            frame = camera.get_frame()
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            if not isinstance(frame, bytes):
+                logger.error("gen_camera_feed: Frame is not bytes, skipping frame.")
+                continue
+            if not client.should_send():
+                continue
+
+            payload = client.prepare(frame)
+            chunk = (b'--frame\r\n'
+                     b'Content-Type: image/jpeg\r\n\r\n' + payload + b'\r\n')
+            send_started = time.monotonic()
+            yield chunk
+            client.record_send(len(chunk), time.monotonic() - send_started)
+
+            frames_yielded += 1
+            if frames_yielded == 1:
+                logger.info(f"gen_camera_feed: Successfully yielded first frame of size {len(payload)} bytes.")
+    finally:
+        logger.info(f"gen_camera_feed: Client disconnected. Stats: {client.stats()}")
 
 @main_bp.route('/camera_feed')
 @login_required
 def camera_feed():
-    """Video streaming route."""
+    """Video streaming route.
+
+    Optional query parameters override the adaptive preview per client:
+    quality (JPEG quality), width (pixels), fps, adaptive (0 to disable).
+    """
+    camera = get_camera()
     logger.info(f"Camera feed requested by user {current_user.id}")
     
-    if not rpi_camera_instance.is_available():
+    if not camera.is_available():
         logger.error("Camera feed requested but camera not available")
         flash("RPi Camera is not available.", "warning")
         return Response("Camera not available", status=503) # Service Unavailable
 
-    if not rpi_camera_instance._is_streaming:
+    if not camera._is_streaming:
         logger.error("Camera feed requested but streaming not active")
         return Response("Camera streaming not active", status=503)
 
+    if camera.preview_codec != 'mjpeg':
+        logger.error("MJPEG camera feed requested but the preview is running as H.264")
+        return Response("Camera preview is streaming H.264, use /camera_feed_h264", status=409)
+
+    client = AdaptivePreviewClient(
+        overrides=parse_preview_overrides(request.args),
+        source_quality=camera.STREAM_JPEG_QUALITY,
+        source_width=camera.get_stream_width()
+    )
+
     logger.info("Serving camera feed stream")
-    return Response(gen_camera_feed(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+    response = Response(gen_camera_feed(client),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
+    # Keep proxies from buffering the stream, which would add latency
+    response.headers['Cache-Control'] = 'no-cache, no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def gen_camera_feed_h264(output, init_segment):
+    """H.264 preview generator: fMP4 init segment followed by one fragment per frame."""
+    camera = get_camera()
+    def is_active():
+        return (camera.is_available() and camera._is_streaming
+                and camera.preview_codec == 'h264')
+
+    fragments = 0
+    bytes_sent = len(init_segment)
+    try:
+        yield init_segment
+        for segment in output.iter_segments(is_active=is_active):
+            yield segment
+            fragments += 1
+            bytes_sent += len(segment)
+    finally:
+        logger.info(f"gen_camera_feed_h264: Client disconnected after {fragments} fragments, {bytes_sent} bytes.")
+
+@main_bp.route('/camera_feed_h264')
+@login_required
+def camera_feed_h264():
+    """H.264 preview as fragmented MP4, for playback through Media Source Extensions."""
+    camera = get_camera()
+    logger.info(f"H.264 camera feed requested by user {current_user.id}")
+
+    if not camera.is_available():
+        logger.error("H.264 camera feed requested but camera not available")
+        return Response("Camera not available", status=503)
+
+    output = camera.get_h264_output()
+    if output is None:
+        logger.error("H.264 camera feed requested but the H.264 preview is not running")
+        return Response("H.264 preview not active", status=409)
+
+    init_segment = output.get_init_segment(timeout=2.0)
+    if init_segment is None:
+        logger.error("H.264 camera feed: no SPS/PPS received from the encoder")
+        return Response("H.264 stream not ready", status=503)
+
+    response = Response(gen_camera_feed_h264(output, init_segment), mimetype='video/mp4')
+    response.headers['Cache-Control'] = 'no-cache, no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # The browser needs the exact profile/level to create its SourceBuffer
+    response.headers['X-Video-Codec'] = output.codec_string
+    return response
 
 @main_bp.route('/capture_rpi_photo', methods=['POST'])
 @login_required
 def capture_rpi_photo():
+    camera = get_camera()
     logger.info("=== Starting RPi photo capture process ===")
     
-    if not rpi_camera_instance.is_available():
+    if not camera.is_available():
         logger.error("Camera not available for capture")
         return jsonify({'success': False, 'error': 'Camera not available.'}), 503
 
@@ -398,12 +641,19 @@ def capture_rpi_photo():
     timestamp = datetime.now()
     filename = f"rpi_capture_{timestamp.strftime('%Y-%m-%d_%H-%M-%S')}.jpg"
     filepath = os.path.join(upload_folder, filename)
+    trace = start_trace('capture', user_id=current_user.id, filename=filename)
+    try:
+        with stage_timer('memory_admission'):
+            memory_ticket = acquire_pipeline_memory('capture', current_user.id)
+    except MemoryBudgetExceeded as e:
+        end_trace(trace)
+        return jsonify({'success': False, 'error': str(e)}), 503
 
     try:
         # Step 0.5: Apply optimal camera settings if enabled
         logger.info(f"Step 0.5: Applying camera enhancement settings")
         try:
-            enhancement_manager.apply_camera_settings(rpi_camera_instance._camera, current_user.id)
+            get_enhancement_manager().apply_camera_settings(camera._camera, current_user.id)
             logger.info(f"Step 0.5 SUCCESS: Camera settings applied")
         except Exception as e:
             logger.warning(f"Step 0.5 WARNING: Camera settings error: {e}, continuing with default settings")
@@ -412,7 +662,8 @@ def capture_rpi_photo():
         logger.info(f"Step 1: Checking for experimental capture enhancers")
         experimental_result = None
         try:
-            experimental_result = enhancement_manager.apply_experimental_capture(rpi_camera_instance._camera, filepath, current_user.id)
+            with stage_timer('capture_experimental'):
+                experimental_result = get_enhancement_manager().apply_experimental_capture(camera._camera, filepath, current_user.id)
             if experimental_result:
                 logger.info(f"Step 1 SUCCESS: Experimental enhancement captured to {experimental_result}")
                 # Skip normal capture since experimental enhancer handled it
@@ -425,7 +676,8 @@ def capture_rpi_photo():
         # Step 1 (continued): Normal capture if experimental didn't handle it
         if not experimental_result:
             logger.info(f"Step 1: Attempting normal capture to {filepath}")
-            capture_success = rpi_camera_instance.capture_image(filepath)
+            with stage_timer('capture'):
+                capture_success = camera.capture_image(filepath)
         
         if not capture_success:
             logger.error(f"Step 1 FAILED: Camera capture returned False")
@@ -443,13 +695,43 @@ def capture_rpi_photo():
             logger.error(f"Step 1 FAILED: Image file too small: {file_size} bytes")
             return jsonify({'success': False, 'error': f'Captured image file too small: {file_size} bytes'}), 500
 
+        # Step 1.2: Quality gate - re-shoot blurry or badly exposed frames before any expensive stage
+        ingest_settings = get_ingest_settings(current_user.id)
+        if experimental_result or not ingest_settings.get('quality_gate_enabled', False):
+            logger.info(f"Step 1.2: Skipping capture quality gate")
+        else:
+            with stage_timer('quality_gate'):
+                quality = capture_with_quality_gate(camera, filepath, ingest_settings)
+            if quality['ok']:
+                logger.info(f"Step 1.2 SUCCESS: Capture passed quality gate after {quality['attempts']} attempt(s)")
+            elif ingest_settings.get('reject_low_quality', False):
+                reasons = ', '.join(quality['reasons'])
+                logger.warning(f"Step 1.2 FAILED: Capture rejected ({reasons}) after {quality['attempts']} attempt(s)")
+                os.remove(filepath)
+                return jsonify({'success': False,
+                                'error': f'Photo rejected ({reasons}) after {quality["attempts"]} attempts. Adjust focus or lighting and try again.',
+                                'quality': quality}), 422
+            else:
+                logger.warning(f"Step 1.2 WARNING: Keeping best capture despite quality issues: {quality['reasons']}")
+
+        # Step 1.3: Near-duplicate check against the user's recent photos
+        with stage_timer('duplicate_check'):
+            duplicate_check = check_duplicate(filepath, current_user.id, ingest_settings, 'capture')
+        duplicate = duplicate_check['duplicate']
+        if duplicate and duplicate_check['action'] == 'skip':
+            logger.info(f"Step 1.3: Capture skipped as a near-duplicate of photo {duplicate['id']}")
+            os.remove(filepath)
+            return jsonify({'success': False,
+                            'error': f'This page looks like {duplicate["image_filename"]}, which is already in your gallery.',
+                            'duplicate_of': duplicate['id']}), 409
+
         # Step 1.5: Apply image enhancement if enabled (skip if experimental was used)
         if experimental_result:
             logger.info(f"Step 1.5: Skipping standard enhancement (experimental enhancement already applied)")
         else:
             logger.info(f"Step 1.5: Applying standard image enhancement")
             try:
-                enhancement_success = enhancement_manager.enhance_image(filepath, current_user.id)
+                enhancement_success = get_enhancement_manager().enhance_image(filepath, current_user.id)
                 if enhancement_success:
                     logger.info(f"Step 1.5 SUCCESS: Image enhancement completed")
                 else:
@@ -462,9 +744,11 @@ def capture_rpi_photo():
         logger.info(f"Step 2: Starting OCR on {filepath} using {ocr_mode} mode")
         original_ocr_text = None
         ai_cleaned_text = "Error during processing or no text found."
+        ocr_succeeded = cleanup_succeeded = False
 
         try:
             original_ocr_text = perform_ocr(filepath, current_user.id if current_user.is_authenticated else None)
+            ocr_succeeded = True
             logger.info(f"Step 2 SUCCESS: OCR completed. Text length: {len(original_ocr_text if original_ocr_text else '')}")
             
             if original_ocr_text:
@@ -488,6 +772,7 @@ def capture_rpi_photo():
                     ai_cleaned_text = original_ocr_text  # Fallback to raw OCR
                 else:
                     ai_cleaned_text = ai_cleaned_text_result
+                    cleanup_succeeded = not ai_cleaned_text_result.startswith("Error")
                     logger.info(f"Step 3 SUCCESS: LLM cleanup completed. Length: {len(ai_cleaned_text)}")
                     
             except Exception as e:
@@ -496,11 +781,19 @@ def capture_rpi_photo():
         else:
             logger.info("Step 3 SKIPPED: No OCR text to process")
             ai_cleaned_text = "No text found by OCR."
+            cleanup_succeeded = True
 
         # Step 4: Create Photo record
         logger.info(f"Step 4: Creating photo record in database")
         try:
-            new_photo = create_photo(current_user.id, filename, original_ocr_text, ai_cleaned_text)
+            processing_inputs = initial_processing_inputs(
+                filepath, current_user.id, original_ocr_text if ocr_succeeded else None,
+                ai_cleaned_text if cleanup_succeeded else None)
+            new_photo = create_photo(current_user.id, filename, original_ocr_text, ai_cleaned_text,
+                                     processing_timings=trace.stage_timings(),
+                                     processing_inputs=processing_inputs,
+                                     phash=duplicate_check['phash'],
+                                     duplicate_of=duplicate['id'] if duplicate else None)
             if not new_photo:
                 logger.error(f"Step 4 FAILED: create_photo returned None")
                 return jsonify({'success': False, 'error': 'Failed to save photo metadata to database.'}), 500
@@ -514,12 +807,16 @@ def capture_rpi_photo():
         # All steps successful!
         logger.info("=== Photo capture process completed successfully ===")
         flash(f'Photo "{filename}" captured and processed successfully!', 'success')
+        if duplicate:
+            flash(f'"{filename}" looks like {duplicate["image_filename"]}; it is marked as a possible duplicate.', 'warning')
         
         return jsonify({
             'success': True,
             'message': 'Photo captured and processed.',
             'photo_id': new_photo['id'],
             'filename': filename,
+            'duplicate_of': duplicate['id'] if duplicate else None,
+            'trace_id': trace.trace_id,
             'redirect_url': url_for('main.gallery_view')
         }), 200
 
@@ -534,16 +831,140 @@ def capture_rpi_photo():
                 pass
         
         return jsonify({'success': False, 'error': f'Unexpected error during capture: {str(e)}'}), 500
+    finally:
+        get_memory_governor().release(memory_ticket)
+        end_trace(trace)
 
 @main_bp.route('/upload', methods=['GET'])
 @login_required
 def upload_page():
     # Pass camera availability to the template
-    camera_available = rpi_camera_instance.is_available()
+    camera_available = get_camera().is_available()
     logger.info(f"Upload page accessed by user {current_user.id}")
     logger.info(f"Camera available for template: {camera_available}")
     return render_template('upload.html', camera_available=camera_available)
 
+def ingest_uploaded_file(filepath, stored_filename, display_name, user_id, wait_for_memory=0, ocr_text=None):
+    """
+    Run a saved upload through duplicate checks, enhancement, OCR and LLM cleanup, and store the photo.
+    Takes the user explicitly, so it also runs outside a request (bulk uploads, PDF pages).
+    
+    Args:
+        filepath: Uploaded file, already saved in the upload folder
+        stored_filename: Name of the file in the upload folder
+        display_name: Original file name, for messages
+        user_id: Owner of the new photo
+        wait_for_memory: Seconds to keep retrying the memory governor before the upload fails
+                         (0: rejected after one admission timeout)
+        ocr_text: Text from a PDF text layer; enhancement and OCR are skipped for such pages
+    
+    Returns:
+        dict: {'status': 'created'|'identical'|'skipped_duplicate'|'rejected'|'failed',
+               'photo': new or existing photo, 'duplicate': near-duplicate match, 'warnings': [...], 'error': str}
+    """
+    result = {'status': 'failed', 'photo': None, 'duplicate': None, 'warnings': [], 'error': None}
+
+    # Same bytes as an earlier upload: nothing to enhance, OCR or clean up again
+    source_sha256 = file_sha256(filepath)
+    existing = find_photo_by_source_hash(user_id, source_sha256)
+    if existing:
+        os.remove(filepath)
+        logger.info(f"Upload '{stored_filename}' is identical to photo {existing['id']}, skipping processing")
+        return dict(result, status='identical', photo=existing)
+
+    duplicate_check = check_duplicate(filepath, user_id, get_ingest_settings(user_id), 'upload')
+    duplicate = result['duplicate'] = duplicate_check['duplicate']
+    if duplicate and duplicate_check['action'] == 'skip':
+        os.remove(filepath)
+        return dict(result, status='skipped_duplicate')
+
+    trace = start_trace('upload', user_id=user_id, filename=stored_filename)
+    memory_ticket = None
+    waiting_since = time.monotonic()
+    while memory_ticket is None:
+        try:
+            with stage_timer('memory_admission'):
+                memory_ticket = acquire_pipeline_memory('upload', user_id)
+        except MemoryBudgetExceeded as e:
+            waited = time.monotonic() - waiting_since
+            if waited >= wait_for_memory:
+                end_trace(trace)
+                os.remove(filepath)
+                if not wait_for_memory:
+                    return dict(result, status='rejected', error=str(e))
+                # A job that never releases its memory must not stall the bulk worker forever
+                logger.error(f"Gave up waiting for memory for '{stored_filename}' after {waited:.0f}s")
+                return dict(result, error=f"Not enough memory to process this file after waiting {waited:.0f}s ({e})")
+
+    try:
+        # A rendered PDF page with a text layer is already clean and its text is exact
+        if ocr_text is None:
+            # Apply image enhancement if enabled
+            logger.info(f"Applying image enhancement to uploaded file")
+            try:
+                enhancement_success = get_enhancement_manager().enhance_image(filepath, user_id)
+                if enhancement_success:
+                    logger.info(f"Image enhancement completed for uploaded file")
+                else:
+                    logger.warning(f"Image enhancement failed for uploaded file, continuing with original")
+            except Exception as e:
+                logger.error(f"Image enhancement error for uploaded file: {e}, continuing with original")
+
+        original_ocr_text = None
+        ai_cleaned_text = "Error during processing or no text found." # Default
+        ocr_succeeded = cleanup_succeeded = False
+
+        try:
+            if ocr_text is not None:
+                logger.info(f"Using the PDF text layer of {filepath}, skipping OCR")
+                original_ocr_text = ocr_text
+            else:
+                ocr_mode = get_ocr_mode()
+                logger.info(f"Performing OCR on {filepath} using {ocr_mode} mode")
+                original_ocr_text = perform_ocr(filepath, user_id) # This can raise an exception
+                logger.info(f"OCR for {filepath}. Length: {len(original_ocr_text if original_ocr_text else [])}")
+            ocr_succeeded = original_ocr_text is not None
+
+            if original_ocr_text and original_ocr_text.strip():
+                logger.info(f"Calling LLM for cleanup of {filepath}")
+                ai_cleaned_text_result = call_llm("cleanup_ocr", original_ocr_text)
+                if ai_cleaned_text_result.startswith("Error:"):
+                    result['warnings'].append(f"LLM Error: {ai_cleaned_text_result}. Using raw OCR.")
+                    ai_cleaned_text = original_ocr_text # Fallback to raw OCR
+                else:
+                    ai_cleaned_text = ai_cleaned_text_result
+                    cleanup_succeeded = not ai_cleaned_text_result.startswith("Error")
+                logger.info(f"LLM for {filepath}. AI text length: {len(ai_cleaned_text if ai_cleaned_text else [])}")
+            elif original_ocr_text is None: # OCR itself failed or returned None
+                 ai_cleaned_text = "OCR process failed or returned no data."
+                 logger.warning(f"OCR returned None for {filepath}.")
+            else: # OCR returned empty string
+                ai_cleaned_text = "No text found by OCR."
+                cleanup_succeeded = True
+                logger.info(f"Skipping LLM for {filepath} (no/empty OCR text).")
+        
+        except Exception as e: # Catch errors from perform_ocr or call_llm
+            logger.error(f"Error in OCR/LLM for {stored_filename}: {e}", exc_info=True)
+            result['warnings'].append(f'Error during processing: {str(e)}')
+            # Fallback: save original OCR text if available, otherwise the error message
+            ai_cleaned_text = original_ocr_text if original_ocr_text else f"Processing Error: {str(e)}"
+
+        processing_inputs = initial_processing_inputs(
+            filepath, user_id, original_ocr_text if ocr_succeeded else None,
+            ai_cleaned_text if cleanup_succeeded else None, text_layer=ocr_text is not None)
+        new_photo = create_photo(user_id, stored_filename, original_ocr_text, ai_cleaned_text,
+                                 processing_timings=trace.stage_timings(), processing_inputs=processing_inputs,
+                                 source_sha256=source_sha256,
+                                 phash=duplicate_check['phash'], duplicate_of=duplicate['id'] if duplicate else None)
+    finally:
+        get_memory_governor().release(memory_ticket)
+        end_trace(trace)
+
+    if not new_photo:
+        # Image is on disk, but not in DB. Consider cleanup or admin alert.
+        return dict(result, error='Failed to save processed photo to the database.')
+    return dict(result, status='created', photo=new_photo)
+
 @main_bp.route('/process_upload', methods=['POST'])
 @login_required
 def process_upload():
@@ -576,61 +997,88 @@ def process_upload():
             flash(f"Error saving file: {e}", "error")
             return redirect(url_for('main.upload_page'))
 
-        # Apply image enhancement if enabled
-        logger.info(f"Applying image enhancement to uploaded file")
-        try:
-            enhancement_success = enhancement_manager.enhance_image(filepath, current_user.id)
-            if enhancement_success:
-                logger.info(f"Image enhancement completed for uploaded file")
-            else:
-                logger.warning(f"Image enhancement failed for uploaded file, continuing with original")
-        except Exception as e:
-            logger.error(f"Image enhancement error for uploaded file: {e}, continuing with original")
-
-        original_ocr_text = None
-        ai_cleaned_text = "Error during processing or no text found." # Default
-
-        try:
-            ocr_mode = get_ocr_mode()
-            logger.info(f"Performing OCR on {filepath} using {ocr_mode} mode")
-            original_ocr_text = perform_ocr(filepath, current_user.id if current_user.is_authenticated else None) # This can raise an exception
-            logger.info(f"OCR for {filepath}. Length: {len(original_ocr_text if original_ocr_text else [])}")
-
-            if original_ocr_text and original_ocr_text.strip():
-                logger.info(f"Calling LLM for cleanup of {filepath}")
-                ai_cleaned_text_result = call_llm("cleanup_ocr", original_ocr_text)
-                if ai_cleaned_text_result.startswith("Error:"):
-                    flash(f"LLM Error: {ai_cleaned_text_result}. Using raw OCR.", "warning")
-                    ai_cleaned_text = original_ocr_text # Fallback to raw OCR
-                else:
-                    ai_cleaned_text = ai_cleaned_text_result
-                logger.info(f"LLM for {filepath}. AI text length: {len(ai_cleaned_text if ai_cleaned_text else [])}")
-            elif original_ocr_text is None: # OCR itself failed or returned None
-                 ai_cleaned_text = "OCR process failed or returned no data."
-                 logger.warning(f"OCR returned None for {filepath}.")
-            else: # OCR returned empty string
-                ai_cleaned_text = "No text found by OCR."
-                logger.info(f"Skipping LLM for {filepath} (no/empty OCR text).")
-        
-        except Exception as e: # Catch errors from perform_ocr or call_llm
-            logger.error(f"Error in OCR/LLM for {unique_filename}: {e}", exc_info=True)
-            flash(f'Error during processing: {str(e)}', 'error')
-            # Fallback: save original OCR text if available, otherwise the error message
-            ai_cleaned_text = original_ocr_text if original_ocr_text else f"Processing Error: {str(e)}"
-
-        new_photo = create_photo(current_user.id, unique_filename, original_ocr_text, ai_cleaned_text)
+        result = ingest_uploaded_file(filepath, unique_filename, original_filename, current_user.id)
+        for warning in result['warnings']:
+            flash(warning, 'warning')
+        duplicate = result['duplicate']
+        new_photo = result['photo']
+        if result['status'] == 'identical':
+            flash(f'"{original_filename}" is already in your gallery.', 'info')
+            return redirect(url_for('main.gallery_view'))
+        if result['status'] == 'skipped_duplicate':
+            flash(f'"{original_filename}" looks like {duplicate["image_filename"]}, which is already in your gallery. Skipped.', 'info')
+            return redirect(url_for('main.gallery_view'))
+        if result['status'] == 'rejected':
+            flash(result['error'], 'error')
+            return redirect(url_for('main.upload_page'))
 
         if new_photo:
             flash(f'Photo "{original_filename}" processed and added to your gallery.', 'success')
+            if duplicate:
+                flash(f'"{original_filename}" looks like {duplicate["image_filename"]}; it is marked as a possible duplicate.', 'warning')
             return redirect(url_for('main.gallery_view'))
         else:
-            flash('Failed to save processed photo to the database.', 'error')
-            # Image is on disk, but not in DB. Consider cleanup or admin alert.
+            flash(result['error'], 'error')
             return redirect(url_for('main.upload_page'))
+    elif is_pdf(file.filename):
+        flash('PDFs are imported with Bulk Upload below, one document per PDF.', 'warning')
+        return redirect(url_for('main.upload_page'))
     else:
         flash('File type not allowed.', 'error')
         return redirect(url_for('main.upload_page'))
 
+@main_bp.route('/bulk_upload', methods=['POST'])
+@login_required
+def bulk_upload():
+    """Accept many images and/or zip archives, process them in the background, return a batch to poll"""
+    files = [f for f in request.files.getlist('files') if f and f.filename]
+    if not files:
+        return jsonify({'success': False, 'error': 'No files selected.'}), 400
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    if not os.path.exists(upload_folder):
+        os.makedirs(upload_folder)
+        logger.info(f"Created upload folder: {upload_folder}")
+
+    build_document = request.form.get('create_document', '').lower() in ('1', 'true', 'on')
+    document_name = request.form.get('document_name', '').strip() or None
+    batch = bulk_batches.create(current_user.id, build_document, document_name)
+    try:
+        for file in files:
+            bulk_batches.add_file(batch, file, upload_folder, secure_filename, allowed_file)
+    except BatchLimitExceeded as e:
+        bulk_batches.discard(batch)
+        return jsonify({'success': False, 'error': str(e)}), 413
+    except Exception as e:
+        logger.error(f"Error receiving bulk upload for user {current_user.id}: {e}", exc_info=True)
+        bulk_batches.discard(batch)
+        return jsonify({'success': False, 'error': f'Error saving files: {str(e)}'}), 500
+
+    # Files wait for the memory governor (up to MEMORY_WAIT_SECONDS) instead of failing
+    # when several are processed at once
+    bulk_batches.start(batch, current_app._get_current_object(),
+                       partial(ingest_uploaded_file, wait_for_memory=MEMORY_WAIT_SECONDS))
+    return jsonify({
+        'success': True,
+        'batch_id': batch['id'],
+        'status_url': url_for('main.bulk_upload_status', batch_id=batch['id']),
+        'batch': bulk_batches.status(batch)
+    }), 202
+
+@main_bp.route('/bulk_upload/<batch_id>', methods=['GET'])
+@login_required
+def bulk_upload_status(batch_id):
+    batch = bulk_batches.get(batch_id, current_user.id)
+    if batch is None:
+        return jsonify({'success': False, 'error': 'Batch not found.'}), 404
+    status = bulk_batches.status(batch)
+    if status['document_id']:
+        status['document_url'] = url_for('main.document_view', doc_id=status['document_id'])
+    for item in status['items']:
+        if item.get('document_id'):
+            item['document_url'] = url_for('main.document_view', doc_id=item['document_id'])
+    return jsonify({'success': True, 'batch': status})
+
 @main_bp.route('/gallery')
 @login_required
 def gallery_view():
@@ -805,10 +1253,11 @@ def translate_text(doc_id): # Renamed from /document/<doc_id>/format
 @main_bp.route('/toggle_camera_orientation', methods=['POST'])
 @login_required
 def toggle_camera_orientation():
+    camera = get_camera()
     data = request.get_json()
     enabled = data.get('enabled', False)
-    rpi_camera_instance.set_portrait_mode(bool(enabled))
-    return jsonify({'success': True, 'portrait_mode': rpi_camera_instance.portrait_mode})
+    camera.set_portrait_mode(bool(enabled))
+    return jsonify({'success': True, 'portrait_mode': camera.portrait_mode})
 
 # DELETION ROUTES
 
@@ -937,40 +1386,62 @@ def photo_usage(photo_id):
 @main_bp.route('/camera_autofocus_state', methods=['GET'])
 @login_required
 def camera_autofocus_state():
-    return jsonify(rpi_camera_instance.get_autofocus_state())
+    return jsonify(get_camera().get_autofocus_state())
 
 @main_bp.route('/camera_set_autofocus', methods=['POST'])
 @login_required
 def camera_set_autofocus():
     data = request.get_json()
     enabled = data.get('enabled', False)
-    success = rpi_camera_instance.set_autofocus(bool(enabled))
+    success = get_camera().set_autofocus(bool(enabled))
     return jsonify({'success': success, 'enabled': enabled})
 
+@main_bp.route('/camera_preview_quality', methods=['GET'])
+@login_required
+def camera_preview_quality():
+    """Sharpness/exposure score of the latest preview frame, to tell the user when to shoot"""
+    ingest_settings = get_ingest_settings(current_user.id)
+    if not ingest_settings.get('quality_gate_enabled', False):
+        return jsonify({'enabled': False})
+    
+    camera = get_camera()
+    frame = camera.get_frame() if camera.is_available() and camera.preview_codec == 'mjpeg' else None
+    if frame is None:
+        return jsonify({'enabled': True, 'available': False})
+    
+    # Preview frames are smaller and more compressed than stills, so scale the threshold down
+    scorer = CaptureQualityScorer.from_settings(ingest_settings)
+    scorer.min_sharpness *= 0.5
+    score = scorer.score_jpeg(frame)
+    if score is None:
+        return jsonify({'enabled': True, 'available': False})
+    return jsonify({'enabled': True, 'available': True, **score})
+
 @main_bp.route('/camera_trigger_autofocus', methods=['POST'])
 @login_required
 def camera_trigger_autofocus():
-    success = rpi_camera_instance.trigger_autofocus()
+    success = get_camera().trigger_autofocus()
     return jsonify({'success': success})
 
 # Debug endpoint - test camera without authentication
 @main_bp.route('/debug/camera_test')
 def debug_camera_test():
+    camera = get_camera()
     try:
         logger.info("Camera test endpoint called")
-        logger.info(f"Camera instance: {rpi_camera_instance}")
-        logger.info(f"Camera type: {type(rpi_camera_instance)}")
-        logger.info(f"Camera initialized: {getattr(rpi_camera_instance, '_is_initialized', 'Unknown')}")
-        logger.info(f"Camera object: {getattr(rpi_camera_instance, '_camera', 'Unknown')}")
+        logger.info(f"Camera instance: {camera}")
+        logger.info(f"Camera type: {type(camera)}")
+        logger.info(f"Camera initialized: {getattr(camera, '_is_initialized', 'Unknown')}")
+        logger.info(f"Camera object: {getattr(camera, '_camera', 'Unknown')}")
         
-        available = rpi_camera_instance.is_available()
+        available = camera.is_available()
         logger.info(f"Camera available: {available}")
         
         return jsonify({
             'camera_available': available,
-            'camera_initialized': getattr(rpi_camera_instance, '_is_initialized', False),
-            'camera_object_exists': getattr(rpi_camera_instance, '_camera', None) is not None,
-            'streaming': getattr(rpi_camera_instance, '_is_streaming', False)
+            'camera_initialized': getattr(camera, '_is_initialized', False),
+            'camera_object_exists': getattr(camera, '_camera', None) is not None,
+            'streaming': getattr(camera, '_is_streaming', False)
         })
     except Exception as e:
         logger.error(f"Debug camera test error: {e}", exc_info=True)
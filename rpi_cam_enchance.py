@@ -1,12 +1,30 @@
+import os
 import cv2
 import numpy as np
 import time
 import logging
+import threading
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
 from typing import List, Tuple, Optional
 from datetime import datetime
-from picamera2 import Picamera2
-import libcamera
+from camera_backends import CameraBackend, create_camera_backend
+from metrics import enhancer_seconds
+from tracing import span as trace_span
+
+try:
+    import libcamera
+    AWB_MODES = {
+        'auto': libcamera.controls.AwbModeEnum.Auto,
+        'tungsten': libcamera.controls.AwbModeEnum.Tungsten,
+        'daylight': libcamera.controls.AwbModeEnum.Daylight,
+        'cloudy': libcamera.controls.AwbModeEnum.Cloudy,
+        'indoor': libcamera.controls.AwbModeEnum.Indoor,
+    }
+except ImportError:
+    # Same values as libcamera's AwbModeEnum, for off-device (simulated) use
+    AWB_MODES = {'auto': 0, 'tungsten': 2, 'indoor': 4, 'daylight': 5, 'cloudy': 6}
 
 # Configure logging
 logging.basicConfig(
@@ -24,8 +42,15 @@ class BaseEnhancer(ABC):
     
     All enhancer classes inherit from this class and implement
     the enhance method.
+    
+    Enhancers whose output pixel depends only on a bounded neighbourhood of
+    the input set tile_halo to that radius (in pixels) so TiledExecutor can
+    process them band by band; None means the enhancer needs the whole frame.
     """
     
+    tile_halo: Optional[int] = None
+    tile_align: int = 1
+    
     def __init__(self):
         """Initialize the enhancer with a class-specific logger."""
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -77,14 +102,7 @@ class OptimalSettingsEnhancer(BaseEnhancer):
         self.analog_gain = analog_gain
         
         # Convert string AWB mode to libcamera enum
-        awb_modes = {
-            'auto': libcamera.controls.AwbModeEnum.Auto,
-            'tungsten': libcamera.controls.AwbModeEnum.Tungsten,
-            'daylight': libcamera.controls.AwbModeEnum.Daylight,
-            'cloudy': libcamera.controls.AwbModeEnum.Cloudy,
-            'indoor': libcamera.controls.AwbModeEnum.Indoor,
-        }
-        self.awb_mode = awb_modes.get(awb_mode.lower(), libcamera.controls.AwbModeEnum.Auto)
+        self.awb_mode = AWB_MODES.get(awb_mode.lower(), AWB_MODES['auto'])
         self.sharpness = sharpness
     
     def enhance(self, image: np.ndarray) -> np.ndarray:
@@ -104,12 +122,12 @@ class OptimalSettingsEnhancer(BaseEnhancer):
                            "Use apply_to_camera() method before capturing.")
         return image
     
-    def apply_to_camera(self, camera: Picamera2) -> None:
+    def apply_to_camera(self, camera: CameraBackend) -> None:
         """
         Apply settings to a camera object.
         
         Args:
-            camera: Picamera2 object to configure
+            camera: Camera backend to configure
         """
         self.logger.info("Applying optimal settings to camera")
         try:
@@ -212,6 +230,19 @@ class DenoiseEnhancer(BaseEnhancer):
             self.logger.error(f"Denoising failed: {str(e)}")
             raise
     
+    @property
+    def tile_halo(self) -> int:
+        if self.fast_mode:
+            radius = 9 // 2
+        else:
+            radius = self.search_window_size // 2 + self.template_window_size // 2
+        # One extra pixel for the linear upscale, measured at full resolution
+        return (radius + 1) * self.downscale_factor
+    
+    @property
+    def tile_align(self) -> int:
+        return self.downscale_factor
+    
     def _apply_channel_denoising(self, image: np.ndarray) -> np.ndarray:
         """Apply non-local means denoising to each channel separately."""
         # Convert to YCrCb color space for better color preservation
@@ -284,6 +315,8 @@ class ContrastEnhancer(BaseEnhancer):
     local contrast while limiting noise amplification and preserving colors.
     """
     
+    _ratio_table = None
+    
     def __init__(self, 
                  clip_limit: float = 2.0, 
                  tile_grid_size: Tuple[int, int] = (8, 8), 
@@ -325,9 +358,6 @@ class ContrastEnhancer(BaseEnhancer):
         start_time = time.time()
         
         try:
-            # Store original image for tone preservation
-            original = image.copy() if self.preserve_tone else None
-            
             # Convert to appropriate color space
             if self.color_space == 'LAB':
                 converted = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
@@ -355,22 +385,7 @@ class ContrastEnhancer(BaseEnhancer):
             
             # Apply tone preservation if requested
             if self.preserve_tone:
-                # Calculate luminance of original and enhanced images
-                original_luminance = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY).astype(np.float32)
-                enhanced_luminance = cv2.cvtColor(enhanced_image, cv2.COLOR_BGR2GRAY).astype(np.float32)
-                
-                # Avoid division by zero
-                original_luminance = np.maximum(original_luminance, 0.01)
-                
-                # Calculate luminance ratio
-                ratio = enhanced_luminance / original_luminance
-                
-                # Apply the ratio to each channel to preserve colors
-                enhanced_image = original.copy().astype(np.float32)
-                for c in range(3):  # For each BGR channel
-                    enhanced_image[:,:,c] = np.clip(enhanced_image[:,:,c] * ratio, 0, 255)
-                
-                enhanced_image = enhanced_image.astype(np.uint8)
+                enhanced_image = self._preserve_tone(image, enhanced_image)
             
             elapsed_time = time.time() - start_time
             self.logger.info(f"Contrast enhancement completed in {elapsed_time:.2f} seconds")
@@ -379,6 +394,46 @@ class ContrastEnhancer(BaseEnhancer):
         except Exception as e:
             self.logger.error(f"Contrast enhancement failed: {str(e)}")
             raise
+    
+    @classmethod
+    def _luminance_ratio_table(cls) -> np.ndarray:
+        """
+        Enhanced/original luminance ratio for every pair of 8-bit gray levels,
+        indexed by (original << 8) | enhanced. Ratios are capped at 255, which
+        already saturates any non-zero channel.
+        """
+        if cls._ratio_table is None:
+            original = np.maximum(np.arange(256, dtype=np.float32), 0.01)[:, None]
+            enhanced = np.arange(256, dtype=np.float32)[None, :]
+            cls._ratio_table = np.minimum(enhanced / original, 255).astype(np.float32).ravel()
+        return cls._ratio_table
+    
+    def _preserve_tone(self, original: np.ndarray, enhanced: np.ndarray) -> np.ndarray:
+        """
+        Scale the original BGR channels by the luminance gain CLAHE applied,
+        so contrast improves without shifting colors.
+        
+        The per-pixel ratio is looked up from a 256x256 table instead of being
+        computed in float for the whole frame, and channels are multiplied in
+        place with saturation, so the only full-frame float buffer is the ratio.
+        
+        Args:
+            original: Input BGR image
+            enhanced: CLAHE result in BGR (its buffer is reused for the output)
+            
+        Returns:
+            np.ndarray: Tone-preserved BGR image
+        """
+        index = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY).astype(np.uint16)
+        index <<= 8
+        index |= cv2.cvtColor(enhanced, cv2.COLOR_BGR2GRAY)
+        ratio = self._luminance_ratio_table().take(index)
+        del index
+        
+        channels = cv2.split(original)
+        for channel in channels:
+            cv2.multiply(channel, ratio, dst=channel, dtype=cv2.CV_8U)
+        return cv2.merge(channels, enhanced)
 
 
 class SharpenEnhancer(BaseEnhancer):
@@ -388,6 +443,8 @@ class SharpenEnhancer(BaseEnhancer):
     Applies a sharpening kernel to enhance edge details in the image.
     """
     
+    tile_halo = 1
+    
     def __init__(self, strength: float = 0.8):
         """
         Initialize sharpening parameters.
@@ -437,12 +494,17 @@ class ColorCorrectionEnhancer(BaseEnhancer):
     
     This class provides methods for correcting color issues like
     color cast, white balance problems, and color saturation.
+    
+    All three corrections are point operations, so they are applied through
+    lookup tables: white balance and temperature as one per-channel BGR table,
+    saturation as a table on the HSV saturation channel.
     """
     
     def __init__(self, 
                  white_balance: bool = True,
                  saturation_factor: float = 1.1,
-                 temperature_adjustment: float = 0.0):
+                 temperature_adjustment: float = 0.0,
+                 wb_sample_step: int = 4):
         """
         Initialize color correction parameters.
         
@@ -450,6 +512,7 @@ class ColorCorrectionEnhancer(BaseEnhancer):
             white_balance: Whether to apply automatic white balance correction
             saturation_factor: Factor to adjust color saturation (1.0 = no change)
             temperature_adjustment: Color temperature adjustment (-1.0 = cooler, 1.0 = warmer)
+            wb_sample_step: Pixel stride used to gather white balance statistics
         """
         super().__init__()
         self.logger.info(f"Setting white_balance={white_balance}, "
@@ -459,6 +522,11 @@ class ColorCorrectionEnhancer(BaseEnhancer):
         self.white_balance = white_balance
         self.saturation_factor = saturation_factor
         self.temperature_adjustment = np.clip(temperature_adjustment, -1.0, 1.0)
+        self.wb_sample_step = max(1, wb_sample_step)
+        
+        # Tables that depend only on the parameters are built once
+        self._temperature_lut = self._build_temperature_lut(self.temperature_adjustment)
+        self._saturation_lut = self._build_saturation_lut(saturation_factor)
     
     def enhance(self, image: np.ndarray) -> np.ndarray:
         """
@@ -474,19 +542,19 @@ class ColorCorrectionEnhancer(BaseEnhancer):
         start_time = time.time()
         
         try:
-            corrected_image = image.copy()
-            
-            # Apply automatic white balance if requested
-            if self.white_balance:
-                corrected_image = self._apply_white_balance(corrected_image)
+            corrected_image = image
             
-            # Apply color temperature adjustment
-            if self.temperature_adjustment != 0.0:
-                corrected_image = self._adjust_temperature(corrected_image, self.temperature_adjustment)
+            # White balance and color temperature in one pass
+            channel_lut = self.channel_lut(image)
+            if channel_lut is not None:
+                corrected_image = cv2.LUT(image, channel_lut)
             
             # Apply saturation adjustment
-            if self.saturation_factor != 1.0:
-                corrected_image = self._adjust_saturation(corrected_image, self.saturation_factor)
+            if self._saturation_lut is not None:
+                corrected_image = self._adjust_saturation(corrected_image)
+            
+            if corrected_image is image:
+                corrected_image = image.copy()
             
             elapsed_time = time.time() - start_time
             self.logger.info(f"Color correction completed in {elapsed_time:.2f} seconds")
@@ -496,84 +564,411 @@ class ColorCorrectionEnhancer(BaseEnhancer):
             self.logger.error(f"Color correction failed: {str(e)}")
             raise
     
-    def _apply_white_balance(self, image: np.ndarray) -> np.ndarray:
+    @property
+    def tile_halo(self) -> Optional[int]:
+        # White balance gains come from whole-frame averages
+        return None if self.white_balance else 0
+    
+    @staticmethod
+    def _build_temperature_lut(adjustment: float) -> Optional[np.ndarray]:
         """
-        Apply gray world automatic white balance algorithm.
+        Per-channel table for a color temperature adjustment (warmer/cooler).
         
         Args:
-            image: Input image
+            adjustment: Temperature adjustment (-1.0 to 1.0)
             
         Returns:
-            White-balanced image
+            (256, 3) uint8 table, or None for no adjustment
         """
-        # Convert image to float32 for processing
-        img_float = image.astype(np.float32)
+        if adjustment == 0.0:
+            return None
+        factors = np.array([1.0 - 0.2 * adjustment, 1.0, 1.0 + 0.2 * adjustment], dtype=np.float32)
+        levels = np.arange(256, dtype=np.float32)[:, None]
+        return np.clip(levels * factors, 0, 255).astype(np.uint8)
+    
+    @staticmethod
+    def _build_saturation_lut(factor: float) -> Optional[np.ndarray]:
+        """
+        HSV table that scales the saturation channel and leaves hue and value alone.
         
-        # Compute average BGR values
-        avg_b = np.mean(img_float[:, :, 0])
-        avg_g = np.mean(img_float[:, :, 1])
-        avg_r = np.mean(img_float[:, :, 2])
+        Args:
+            factor: Saturation adjustment factor
+            
+        Returns:
+            (1, 256, 3) uint8 table, or None for no adjustment
+        """
+        if factor == 1.0:
+            return None
+        levels = np.arange(256, dtype=np.float32)
+        lut = np.repeat(levels[:, None], 3, axis=1)
+        lut[:, 1] = np.clip(levels * factor, 0, 255)
+        return lut.astype(np.uint8).reshape(1, 256, 3)
+    
+    def _white_balance_gains(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Gray world gains from a strided sample of the image.
         
-        # Calculate illumination
+        Args:
+            image: Input BGR image
+            
+        Returns:
+            float32 array of B, G, R gains, or None if a channel is empty
+        """
+        step = self.wb_sample_step
+        sample = image[::step, ::step] if step > 1 else image
+        avg_b, avg_g, avg_r = cv2.mean(np.ascontiguousarray(sample))[:3]
+        if avg_b <= 0 or avg_g <= 0 or avg_r <= 0:
+            return None
         illumination = (avg_b + avg_g + avg_r) / 3
+        return np.array([illumination / avg_b, illumination / avg_g, illumination / avg_r], dtype=np.float32)
+    
+    def channel_lut(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Per-channel table equal to white balance followed by temperature adjustment.
         
-        # Compute scaling factors
-        if avg_b > 0 and avg_g > 0 and avg_r > 0:
-            kb = illumination / avg_b
-            kg = illumination / avg_g
-            kr = illumination / avg_r
+        Args:
+            image: Input BGR image (used for white balance statistics)
             
-            # Apply scaling
-            img_float[:, :, 0] = np.clip(img_float[:, :, 0] * kb, 0, 255)
-            img_float[:, :, 1] = np.clip(img_float[:, :, 1] * kg, 0, 255)
-            img_float[:, :, 2] = np.clip(img_float[:, :, 2] * kr, 0, 255)
-        
-        return img_float.astype(np.uint8)
+        Returns:
+            (1, 256, 3) uint8 table for cv2.LUT, or None if neither applies
+        """
+        lut = None
+        if self.white_balance:
+            gains = self._white_balance_gains(image)
+            if gains is not None:
+                levels = np.arange(256, dtype=np.float32)[:, None]
+                lut = np.clip(levels * gains, 0, 255).astype(np.uint8)
+        
+        if self._temperature_lut is not None:
+            # Compose: temperature table looked up at the white-balanced level, per channel
+            lut = self._temperature_lut if lut is None else self._temperature_lut[lut, np.arange(3)]
+        
+        return None if lut is None else lut.reshape(1, 256, 3)
     
-    def _adjust_saturation(self, image: np.ndarray, factor: float) -> np.ndarray:
+    def _adjust_saturation(self, image: np.ndarray) -> np.ndarray:
         """
-        Adjust color saturation.
+        Adjust color saturation through the precomputed HSV table.
         
         Args:
             image: Input image
-            factor: Saturation adjustment factor
             
         Returns:
             Saturation-adjusted image
         """
-        # Convert to HSV
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV).astype(np.float32)
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        cv2.LUT(hsv, self._saturation_lut, dst=hsv)
+        return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+
+class PerspectiveCropEnhancer(BaseEnhancer):
+    """
+    Enhancer that finds the document page and rectifies it.
+    
+    The page outline is searched on a downscaled copy (edges, then the
+    largest convex quadrilateral contour); the homography is applied once at
+    full resolution. When no plausible page is found the image is returned
+    unchanged, so the stage is safe to leave enabled.
+    """
+    
+    def __init__(self,
+                 detection_width: int = 800,
+                 min_area_ratio: float = 0.2,
+                 max_area_ratio: float = 0.98,
+                 margin: int = 0):
+        """
+        Initialize page detection parameters.
         
-        # Adjust saturation
-        hsv[:, :, 1] = np.clip(hsv[:, :, 1] * factor, 0, 255)
+        Args:
+            detection_width: Width of the copy used for edge and contour detection
+            min_area_ratio: Smallest page area, as a fraction of the frame
+            max_area_ratio: Larger outlines are treated as the frame border, not a page
+            margin: Pixels kept around the detected page in the output
+        """
+        super().__init__()
+        self.detection_width = detection_width
+        self.min_area_ratio = min_area_ratio
+        self.max_area_ratio = max_area_ratio
+        self.margin = max(0, margin)
+        self.logger.info(f"Setting detection_width={detection_width}, min_area_ratio={min_area_ratio}")
+    
+    @staticmethod
+    def _order_corners(points: np.ndarray) -> np.ndarray:
+        """Order four points as top-left, top-right, bottom-right, bottom-left."""
+        points = points.reshape(4, 2).astype(np.float32)
+        sums = points.sum(axis=1)
+        diffs = np.diff(points, axis=1).ravel()
+        return np.array([points[np.argmin(sums)], points[np.argmin(diffs)],
+                         points[np.argmax(sums)], points[np.argmax(diffs)]], dtype=np.float32)
+    
+    def detect(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Find the page corners.
         
-        # Convert back to BGR
-        return cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR)
+        Args:
+            image: BGR or grayscale image
+            
+        Returns:
+            np.ndarray: 4x2 float32 corners in full-resolution coordinates
+            (top-left, top-right, bottom-right, bottom-left), or None
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        scale = min(1.0, self.detection_width / gray.shape[1])
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+        
+        blurred = cv2.GaussianBlur(small, (5, 5), 0)
+        median = float(np.median(blurred))
+        edges = cv2.Canny(blurred, int(max(0, 0.66 * median)), int(min(255, 1.33 * median)))
+        edges = cv2.dilate(edges, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+        contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        
+        frame_area = float(small.shape[0] * small.shape[1])
+        for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:10]:
+            area = cv2.contourArea(contour)
+            if area < self.min_area_ratio * frame_area:
+                break
+            if area > self.max_area_ratio * frame_area:
+                continue
+            approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+            if len(approx) == 4 and cv2.isContourConvex(approx):
+                return self._order_corners(approx) / scale
+        return None
     
-    def _adjust_temperature(self, image: np.ndarray, adjustment: float) -> np.ndarray:
+    def rectify(self, image: np.ndarray, corners: np.ndarray) -> np.ndarray:
         """
-        Adjust color temperature (warmer/cooler).
+        Warp the page to a fronto-parallel rectangle at full resolution.
         
         Args:
             image: Input image
-            adjustment: Temperature adjustment (-1.0 to 1.0)
+            corners: Page corners from detect()
             
         Returns:
-            Temperature-adjusted image
+            np.ndarray: Rectified page
         """
-        if adjustment > 0:  # Warmer
-            blue_factor = 1.0 - (0.2 * adjustment)
-            red_factor = 1.0 + (0.2 * adjustment)
-        else:  # Cooler (adjustment is negative)
-            blue_factor = 1.0 - (0.2 * adjustment)
-            red_factor = 1.0 + (0.2 * adjustment)
+        tl, tr, br, bl = corners
+        width = int(round(max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl)))) + 2 * self.margin
+        height = int(round(max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr)))) + 2 * self.margin
+        m = self.margin
+        target = np.array([[m, m], [width - 1 - m, m], [width - 1 - m, height - 1 - m], [m, height - 1 - m]],
+                          dtype=np.float32)
+        homography = cv2.getPerspectiveTransform(corners.astype(np.float32), target)
+        return cv2.warpPerspective(image, homography, (width, height),
+                                   flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    
+    def enhance(self, image: np.ndarray) -> np.ndarray:
+        """
+        Crop and rectify the page, or return the image unchanged if none is found.
         
-        # Apply factors to channels
-        result = image.copy().astype(np.float32)
-        result[:, :, 0] = np.clip(result[:, :, 0] * blue_factor, 0, 255)  # Blue channel
-        result[:, :, 2] = np.clip(result[:, :, 2] * red_factor, 0, 255)   # Red channel
+        Args:
+            image: Input image as numpy array
+            
+        Returns:
+            np.ndarray: Rectified page (or the original image)
+        """
+        self.logger.info("Applying page detection and perspective crop")
+        start_time = time.time()
+        
+        try:
+            corners = self.detect(image)
+            if corners is None:
+                self.logger.info("No page outline found, keeping full frame")
+                return image
+            
+            result = self.rectify(image, corners)
+            elapsed_time = time.time() - start_time
+            self.logger.info(f"Page cropped to {result.shape[1]}x{result.shape[0]} "
+                             f"({result.shape[0] * result.shape[1] / float(image.shape[0] * image.shape[1]):.0%} "
+                             f"of the frame) in {elapsed_time:.2f} seconds")
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Perspective crop failed, keeping full frame: {str(e)}")
+            return image
+
+
+class FusedEnhancer(BaseEnhancer):
+    """
+    Single-pass replacement for the standard ColorCorrection -> Denoise ->
+    Contrast -> Sharpen chain.
+    
+    White balance and temperature are per-channel curves, so they are folded
+    into one lookup table applied to the BGR frame. The frame is then
+    converted to YCrCb once; saturation, denoising, CLAHE and tone
+    preservation work on the luma/chroma planes, sharpening runs on the
+    merged planes, and the result is converted back to BGR once.
+    
+    Output is close to the sequential chain but not identical. Saturation is
+    applied as chroma scaling instead of an HSV round trip, intermediate BGR
+    clipping between steps is skipped, and the rounding differences this
+    leaves are amplified by CLAHE and sharpening. On the synthetic page of
+    benchmarks/fused_enhancement.py the difference is a mean of 2-3 gray
+    levels. The largest difference is 14-16 levels with fast denoising, where
+    0.3% of pixels are off by more than 8, and about 35 levels with NLMeans,
+    where 1.8% of pixels are off by more than 8. The fused pass is therefore
+    opt-in (the fused_pipeline setting), apart from the low-memory fallback.
+    """
+    
+    def __init__(self,
+                 color: Optional[ColorCorrectionEnhancer] = None,
+                 denoise: Optional[DenoiseEnhancer] = None,
+                 contrast: Optional[ContrastEnhancer] = None,
+                 sharpen: Optional[SharpenEnhancer] = None):
+        """
+        Args:
+            color: Color correction settings to fuse (or None)
+            denoise: Denoise settings to fuse (or None); must preserve colors
+            contrast: Contrast settings to fuse (or None); must use YCrCb
+            sharpen: Sharpen settings to fuse (or None)
+        """
+        super().__init__()
+        self.color = color
+        self.denoise = denoise
+        self.contrast = contrast
+        self.sharpen = sharpen
+        self.logger.info(f"Fused steps: {', '.join(self.step_names()) or 'none'}")
+    
+    # Order of the standard chain built by ImageEnhancementManager
+    CHAIN_ORDER = ('ColorCorrectionEnhancer', 'DenoiseEnhancer', 'ContrastEnhancer', 'SharpenEnhancer')
+    
+    @classmethod
+    def from_enhancers(cls, enhancers: List[BaseEnhancer]) -> Optional['FusedEnhancer']:
+        """
+        Build a fused enhancer equivalent to a sequential chain.
+        
+        Args:
+            enhancers: Enhancers in the order they would run
+            
+        Returns:
+            FusedEnhancer, or None if the chain contains steps that cannot be
+            fused (other enhancer types, LAB contrast, full-color denoising,
+            duplicates or a non-standard order)
+        """
+        names = [enhancer.__class__.__name__ for enhancer in enhancers]
+        if not names or any(name not in cls.CHAIN_ORDER for name in names):
+            return None
+        positions = [cls.CHAIN_ORDER.index(name) for name in names]
+        if positions != sorted(set(positions)):
+            return None
+        
+        steps = dict(zip(names, enhancers))
+        denoise = steps.get('DenoiseEnhancer')
+        if denoise is not None and not denoise.preserve_colors:
+            return None
+        contrast = steps.get('ContrastEnhancer')
+        if contrast is not None and contrast.color_space != 'YCRCB':
+            return None
+        
+        return cls(color=steps.get('ColorCorrectionEnhancer'), denoise=denoise,
+                   contrast=contrast, sharpen=steps.get('SharpenEnhancer'))
+    
+    @property
+    def tile_halo(self) -> Optional[int]:
+        if self.contrast is not None or (self.color is not None and self.color.white_balance):
+            return None
+        halo = 0
+        if self.denoise is not None:
+            halo += self.denoise.tile_halo
+        if self.sharpen is not None:
+            halo += self.sharpen.tile_halo
+        return halo
+    
+    @property
+    def tile_align(self) -> int:
+        return self.denoise.downscale_factor if self.denoise is not None else 1
+    
+    def step_names(self) -> List[str]:
+        return [name for name, step in (('color', self.color), ('denoise', self.denoise),
+                                        ('contrast', self.contrast), ('sharpen', self.sharpen)) if step is not None]
+    
+    def _color_lut(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """Per-channel LUT equal to white balance followed by temperature adjustment."""
+        return self.color.channel_lut(image) if self.color is not None else None
+    
+    @staticmethod
+    def _scale_chroma(plane: np.ndarray, factor, scratch: np.ndarray) -> None:
+        """plane = 128 + factor * (plane - 128), in place (factor may be a per-pixel array)."""
+        np.subtract(plane, 128, out=scratch, dtype=np.float32)
+        np.multiply(scratch, factor, out=scratch)
+        scratch += 128
+        np.clip(scratch, 0, 255, out=scratch)
+        plane[...] = scratch
+    
+    def _denoise_planes(self, y: np.ndarray, cr: np.ndarray, cb: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        d = self.denoise
+        size = (y.shape[1], y.shape[0])
+        if d.downscale_factor > 1:
+            small = (y.shape[1] // d.downscale_factor, y.shape[0] // d.downscale_factor)
+            y, cr, cb = (cv2.resize(p, small, interpolation=cv2.INTER_AREA) for p in (y, cr, cb))
+        
+        if d.fast_mode:
+            y = cv2.bilateralFilter(y, d=9, sigmaColor=d.h_luminance * 2, sigmaSpace=d.h_luminance)
+        else:
+            y = cv2.fastNlMeansDenoising(y, None, d.h_luminance, d.template_window_size, d.search_window_size)
+            cr = cv2.fastNlMeansDenoising(cr, None, d.h_color, d.template_window_size, d.search_window_size)
+            cb = cv2.fastNlMeansDenoising(cb, None, d.h_color, d.template_window_size, d.search_window_size)
         
-        return result.astype(np.uint8)
+        if d.downscale_factor > 1:
+            y, cr, cb = (cv2.resize(p, size, interpolation=cv2.INTER_LINEAR) for p in (y, cr, cb))
+        return y, cr, cb
+    
+    def enhance(self, image: np.ndarray) -> np.ndarray:
+        """
+        Apply all fused steps to a BGR image.
+        
+        Args:
+            image: Input BGR image (not modified)
+            
+        Returns:
+            np.ndarray: Enhanced BGR image
+        """
+        self.logger.info(f"Applying fused enhancement ({', '.join(self.step_names())})")
+        start_time = time.time()
+        
+        try:
+            lut = self._color_lut(image)
+            working = cv2.LUT(image, lut) if lut is not None else image
+            
+            ycrcb = cv2.cvtColor(working, cv2.COLOR_BGR2YCrCb)
+            y, cr, cb = cv2.split(ycrcb)
+            scratch = None
+            
+            if self.color is not None and self.color.saturation_factor != 1.0:
+                scratch = np.empty(cr.shape, dtype=np.float32)
+                for plane in (cr, cb):
+                    self._scale_chroma(plane, self.color.saturation_factor, scratch)
+            
+            if self.denoise is not None:
+                y, cr, cb = self._denoise_planes(y, cr, cb)
+            
+            if self.contrast is not None:
+                # A CLAHE object keeps working buffers, so each call gets its own
+                # (one FusedEnhancer is shared by the bulk workers)
+                clahe = cv2.createCLAHE(clipLimit=self.contrast.clip_limit,
+                                        tileGridSize=self.contrast.tile_grid_size)
+                y_enhanced = clahe.apply(y)
+                if self.contrast.preserve_tone:
+                    # Scaling BGR by the luma ratio scales chroma around 128 by the same ratio
+                    index = y.astype(np.uint16)
+                    index <<= 8
+                    index |= y_enhanced
+                    ratio = ContrastEnhancer._luminance_ratio_table().take(index)
+                    if scratch is None:
+                        scratch = np.empty(cr.shape, dtype=np.float32)
+                    for plane in (cr, cb):
+                        self._scale_chroma(plane, ratio, scratch)
+                y = y_enhanced
+            
+            cv2.merge([y, cr, cb], ycrcb)
+            if self.sharpen is not None:
+                cv2.filter2D(ycrcb, -1, self.sharpen.kernel, dst=ycrcb)
+            result = cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+            
+            elapsed_time = time.time() - start_time
+            self.logger.info(f"Fused enhancement completed in {elapsed_time:.2f} seconds")
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Fused enhancement failed: {str(e)}")
+            raise
 
 
 # Multi-frame enhancers - These require direct camera access
@@ -583,34 +978,210 @@ class HDREnhancer(BaseEnhancer):
     
     NOTE: This enhancer requires direct access to the camera and captures
     multiple images at different exposures.
+    
+    After each exposure change the enhancer watches the ExposureTime reported
+    in the frame metadata and captures as soon as the new exposure has taken
+    effect, instead of sleeping for a fixed time. Debevec merging and tone
+    mapping are per-pixel, so they run on horizontal strips in parallel;
+    Mertens fusion is available as a faster alternative that needs no
+    exposure times or tone mapping.
     """
     
+    MERGE_METHODS = ('debevec', 'mertens')
+    
     def __init__(self, 
                  exposure_times: List[int] = None,
-                 camera: Optional[Picamera2] = None,
+                 camera: Optional[CameraBackend] = None,
                  gamma: float = 2.2,
-                 color_input_format: str = 'RGB'):
+                 color_input_format: str = 'RGB',
+                 merge_method: str = 'debevec',
+                 merge_scale: float = 1.0,
+                 settle_tolerance: float = 0.05,
+                 settle_timeout: float = 2.0,
+                 workers: Optional[int] = None):
         """
         Initialize HDR parameters.
         
         Args:
             exposure_times: List of exposure times in microseconds
-            camera: Picamera2 object for capturing
+            camera: Camera backend for capturing
             gamma: Gamma correction factor for tone mapping
             color_input_format: Color format of input images ('BGR' or 'RGB')
+            merge_method: 'debevec' (HDR merge + tone mapping) or 'mertens' (exposure fusion)
+            merge_scale: Scale applied to the frames before merging (1.0 = full resolution);
+                the result keeps the merged size
+            settle_tolerance: Relative ExposureTime error accepted as "settled"
+            settle_timeout: Maximum seconds to wait for an exposure to settle
+            workers: Threads for the tiled merge (defaults to the CPU count)
         """
         super().__init__()
         self.exposure_times = exposure_times or [5000, 20000, 50000]
         self.camera = camera
         self.gamma = gamma
         self.color_input_format = color_input_format.upper()
+        self.merge_method = merge_method.lower()
+        self.merge_scale = min(max(float(merge_scale), 0.1), 1.0)
+        self.settle_tolerance = settle_tolerance
+        self.settle_timeout = settle_timeout
+        self.workers = workers or os.cpu_count() or 1
         
         if self.color_input_format not in ['BGR', 'RGB']:
             self.logger.warning(f"Unsupported input format: {color_input_format}. Defaulting to RGB.")
             self.color_input_format = 'RGB'
         
+        if self.merge_method not in self.MERGE_METHODS:
+            self.logger.warning(f"Unsupported merge method: {merge_method}. Defaulting to debevec.")
+            self.merge_method = 'debevec'
+        
         self.logger.info(f"Setting exposure_times={self.exposure_times}, gamma={gamma}, "
-                         f"color_input_format={self.color_input_format}")
+                         f"color_input_format={self.color_input_format}, merge_method={self.merge_method}, "
+                         f"merge_scale={self.merge_scale}, workers={self.workers}")
+    
+    def _wait_for_exposure(self, target: int) -> int:
+        """
+        Wait until frame metadata shows the requested exposure.
+        
+        The sensor may clamp the exposure (e.g. to the frame duration), so a
+        value that changed and then stayed identical for two frames is also
+        accepted as settled.
+        
+        Args:
+            target: Requested exposure time in microseconds
+            
+        Returns:
+            int: Exposure time reported by the last frame (target if unknown)
+        """
+        started = time.monotonic()
+        deadline = started + self.settle_timeout
+        initial = None
+        previous = None
+        stable_frames = 0
+        
+        while True:
+            actual = self.camera.capture_metadata().get('ExposureTime')
+            if actual is None:
+                self.logger.warning("Camera metadata has no ExposureTime; cannot detect settling")
+                return target
+            
+            if abs(actual - target) <= target * self.settle_tolerance:
+                self.logger.info(f"Exposure settled at {actual} µs (target {target} µs) "
+                                 f"in {(time.monotonic() - started) * 1000:.0f} ms")
+                return actual
+            
+            if initial is None:
+                initial = actual
+            stable_frames = stable_frames + 1 if actual == previous and actual != initial else 0
+            if stable_frames >= 2:
+                self.logger.info(f"Exposure clamped at {actual} µs (target {target} µs)")
+                return actual
+            previous = actual
+            
+            if time.monotonic() >= deadline:
+                self.logger.warning(f"Exposure did not settle within {self.settle_timeout}s "
+                                    f"(target {target} µs, last {actual} µs)")
+                return actual
+    
+    def capture_bracket(self) -> Tuple[List[np.ndarray], List[int]]:
+        """
+        Capture one frame per exposure time.
+        
+        Returns:
+            Tuple of (BGR frames, exposure times actually used in microseconds)
+        """
+        images = []
+        actual_times = []
+        # Manual exposure from OptimalSettingsEnhancer or the user must survive the bracket
+        current_controls = getattr(self.camera, 'current_controls', None)
+        previous = current_controls() if current_controls else {}
+        try:
+            for exp in self.exposure_times:
+                self.logger.info(f"Setting exposure time to {exp} µs")
+                self.camera.set_controls({"AeEnable": False, "ExposureTime": exp})
+                actual_times.append(self._wait_for_exposure(exp))
+                raw_img = self.camera.capture_array()
+                
+                # Convert from RGB (camera native) to BGR (OpenCV native) if needed
+                if self.color_input_format == 'RGB':
+                    img = cv2.cvtColor(raw_img, cv2.COLOR_RGB2BGR)
+                else:
+                    img = raw_img
+                
+                if self.merge_scale < 1.0:
+                    img = cv2.resize(img, None, fx=self.merge_scale, fy=self.merge_scale,
+                                     interpolation=cv2.INTER_AREA)
+                images.append(cv2.convertScaleAbs(img))
+        finally:
+            # Restore the exposure controls in effect before the bracket;
+            # ExposureTime 0 hands the exposure time back to the AGC
+            restore = {"AeEnable": previous.get("AeEnable", True),
+                       "ExposureTime": previous.get("ExposureTime", 0)}
+            try:
+                self.camera.set_controls(restore)
+            except Exception as e:
+                self.logger.warning(f"Could not restore exposure controls {restore}: {e}")
+        return images, actual_times
+    
+    def _strips(self, height: int) -> List[Tuple[int, int]]:
+        """Row ranges splitting the image into one strip per worker."""
+        count = max(1, min(self.workers, height // 64))
+        bounds = np.linspace(0, height, count + 1).astype(int)
+        return [(int(bounds[i]), int(bounds[i + 1])) for i in range(count)]
+    
+    def merge_debevec(self, images: List[np.ndarray], exposure_times_us: List[int]) -> np.ndarray:
+        """
+        Debevec HDR merge and gamma tone mapping, tiled across threads.
+        
+        Both steps are per-pixel except for tone mapping's min/max
+        normalization, which is computed over the whole image so the strips
+        match a single-threaded cv2.createTonemap() result.
+        
+        Args:
+            images: 8-bit BGR frames of equal size
+            exposure_times_us: Exposure time of each frame in microseconds
+            
+        Returns:
+            np.ndarray: 8-bit tone mapped image
+        """
+        times = np.array(exposure_times_us, dtype=np.float32) / 1000000.0
+        height = images[0].shape[0]
+        strips = self._strips(height)
+        hdr = np.empty(images[0].shape, dtype=np.float32)
+        
+        def merge_strip(bounds):
+            top, bottom = bounds
+            merge = cv2.createMergeDebevec()
+            hdr[top:bottom] = merge.process([img[top:bottom] for img in images], times=times)
+            return cv2.minMaxLoc(hdr[top:bottom].reshape(-1, 1))[:2]
+        
+        with ThreadPoolExecutor(max_workers=len(strips)) as pool:
+            extremes = list(pool.map(merge_strip, strips))
+            low = min(e[0] for e in extremes)
+            high = max(e[1] for e in extremes)
+            scale = 1.0 / (high - low) if high - low > np.finfo(np.float64).eps else 1.0
+            offset = low if high - low > np.finfo(np.float64).eps else 0.0
+            result = np.empty(images[0].shape, dtype=np.uint8)
+            
+            def tonemap_strip(bounds):
+                top, bottom = bounds
+                ldr = (hdr[top:bottom] - offset) * scale
+                cv2.pow(ldr, 1.0 / self.gamma, ldr)
+                result[top:bottom] = cv2.convertScaleAbs(ldr, alpha=255)
+            
+            list(pool.map(tonemap_strip, strips))
+        return result
+    
+    def merge_mertens(self, images: List[np.ndarray]) -> np.ndarray:
+        """
+        Mertens exposure fusion (no exposure times or tone mapping needed).
+        
+        Args:
+            images: 8-bit BGR frames of equal size
+            
+        Returns:
+            np.ndarray: 8-bit fused image
+        """
+        fused = cv2.createMergeMertens().process(images)
+        return cv2.convertScaleAbs(np.clip(fused, 0, 1), alpha=255)
     
     def enhance(self, image: np.ndarray) -> np.ndarray:
         """
@@ -634,38 +1205,19 @@ class HDREnhancer(BaseEnhancer):
         try:
             # Capture multiple exposures
             self.logger.info(f"Capturing {len(self.exposure_times)} exposures")
-            images = []
+            capture_started = time.monotonic()
+            images, actual_times = self.capture_bracket()
+            capture_seconds = time.monotonic() - capture_started
             
-            for exp in self.exposure_times:
-                self.logger.info(f"Setting exposure time to {exp} µs")
-                self.camera.set_controls({"ExposureTime": exp})
-                time.sleep(1)  # Allow exposure to settle
-                raw_img = self.camera.capture_array()
-                
-                # Convert from RGB (camera native) to BGR (OpenCV native) if needed
-                if self.color_input_format == 'RGB':
-                    img = cv2.cvtColor(raw_img, cv2.COLOR_RGB2BGR)
-                else:
-                    img = raw_img
-                    
-                images.append(img)
-            
-            # Convert to 8-bit images for OpenCV HDR
-            imgs_8bit = [cv2.convertScaleAbs(img) for img in images]
-            
-            # Normalize exposure times to seconds for OpenCV
-            exp_times_sec = np.array(self.exposure_times, dtype=np.float32) / 1000000.0
-            
-            # Merge to HDR
-            merge_debevec = cv2.createMergeDebevec()
-            hdr = merge_debevec.process(imgs_8bit, times=exp_times_sec)
-            
-            # Tone mapping
-            tonemap = cv2.createTonemap(gamma=self.gamma)
-            ldr = tonemap.process(hdr)
-            final_img = cv2.convertScaleAbs(ldr, alpha=255)
+            merge_started = time.monotonic()
+            if self.merge_method == 'mertens':
+                final_img = self.merge_mertens(images)
+            else:
+                final_img = self.merge_debevec(images, actual_times)
+            merge_seconds = time.monotonic() - merge_started
             
-            self.logger.info("HDR processing completed successfully")
+            self.logger.info(f"HDR processing completed successfully (capture {capture_seconds:.2f}s, "
+                             f"{self.merge_method} merge {merge_seconds:.2f}s, exposures {actual_times})")
             return final_img
             
         except Exception as e:
@@ -673,6 +1225,141 @@ class HDREnhancer(BaseEnhancer):
             raise
 
 
+class FrameAligner:
+    """
+    Aligns frames to a fixed reference frame with a homography.
+    
+    Reference keypoints and descriptors are computed once. Features are
+    detected and matched on a downscaled copy of each frame; the matched
+    corners are then refined to sub-pixel positions at full resolution and the
+    homography is re-fitted on the RANSAC inliers. ORB detectors and matchers
+    are kept per thread, so estimate() can be called from a thread pool.
+    """
+    
+    def __init__(self,
+                 reference: np.ndarray,
+                 alignment_threshold: float = 0.7,
+                 pyramid_scale: float = 0.5,
+                 max_features: int = 1000,
+                 refine: bool = True):
+        """
+        Args:
+            reference: BGR reference frame all other frames are aligned to
+            alignment_threshold: Fraction of best matches kept (0.0-1.0)
+            pyramid_scale: Scale of the level used for feature matching
+            max_features: ORB features per frame
+            refine: Refine matched corners and the homography at full resolution
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.alignment_threshold = alignment_threshold
+        self.scale = min(max(float(pyramid_scale), 0.1), 1.0)
+        self.max_features = max_features
+        self.refine = refine
+        self.size = (reference.shape[1], reference.shape[0])
+        self._local = threading.local()
+        
+        self.reference_gray = cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY)
+        kp, self.reference_des = self._orb().detectAndCompute(self._downscale(self.reference_gray), None)
+        self.reference_pts = self._full_res_points(kp, self.reference_gray)
+        self.logger.info(f"Reference frame: {len(kp)} features at scale {self.scale}")
+    
+    def _orb(self):
+        if not hasattr(self._local, 'orb'):
+            self._local.orb = cv2.ORB_create(nfeatures=self.max_features)
+            self._local.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+        return self._local.orb
+    
+    def _matcher(self):
+        self._orb()
+        return self._local.matcher
+    
+    def _downscale(self, gray: np.ndarray) -> np.ndarray:
+        if self.scale >= 1.0:
+            return gray
+        return cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+    
+    def _full_res_points(self, keypoints, gray: np.ndarray) -> np.ndarray:
+        """Keypoint positions mapped to full resolution (and sub-pixel refined)."""
+        if not keypoints:
+            return np.empty((0, 1, 2), dtype=np.float32)
+        pts = (np.float32([kp.pt for kp in keypoints]) / self.scale).reshape(-1, 1, 2)
+        if self.refine and self.scale < 1.0:
+            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 0.03)
+            window = max(2, int(round(1.0 / self.scale)) + 1)
+            cv2.cornerSubPix(gray, pts, (window, window), (-1, -1), criteria)
+        return pts
+    
+    def estimate(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Estimate the homography mapping image onto the reference frame.
+        
+        Args:
+            image: BGR frame of the same size as the reference
+            
+        Returns:
+            3x3 homography at full resolution, or None if alignment failed
+        """
+        if self.reference_des is None or len(self.reference_des) < 4:
+            return None
+        
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        kp, des = self._orb().detectAndCompute(self._downscale(gray), None)
+        if des is None or len(des) < 4:
+            return None
+        
+        matches = self._matcher().match(self.reference_des, des)
+        if len(matches) < 4:
+            return None
+        
+        # Keep the best matches by distance without sorting match objects in Python
+        distances = np.fromiter((m.distance for m in matches), dtype=np.float32, count=len(matches))
+        keep = np.argsort(distances, kind='stable')[:max(4, int(len(matches) * self.alignment_threshold))]
+        query_idx = np.fromiter((matches[i].queryIdx for i in keep), dtype=np.int32, count=len(keep))
+        train_idx = np.fromiter((matches[i].trainIdx for i in keep), dtype=np.int32, count=len(keep))
+        
+        src_pts = self.reference_pts[query_idx]
+        dst_pts = (np.float32([kp[i].pt for i in train_idx]) / self.scale).reshape(-1, 1, 2)
+        
+        M, inliers = cv2.findHomography(dst_pts, src_pts, cv2.RANSAC, 5.0)
+        if M is None:
+            return None
+        
+        if self.refine and self.scale < 1.0:
+            mask = inliers.ravel().astype(bool)
+            if mask.sum() >= 4:
+                criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 0.03)
+                window = max(2, int(round(1.0 / self.scale)) + 1)
+                refined = np.ascontiguousarray(dst_pts[mask])
+                cv2.cornerSubPix(gray, refined, (window, window), (-1, -1), criteria)
+                # Points are refined one frame at a time, so a pair can still go wrong:
+                # refit robustly and keep the refit only if it explains the refined points better
+                reference = src_pts[mask]
+                refined_M, _ = cv2.findHomography(refined, reference, cv2.RANSAC, 2.0)
+                if refined_M is not None and \
+                        self._reprojection_error(refined_M, refined, reference) <= \
+                        self._reprojection_error(M, refined, reference):
+                    M = refined_M
+        return M
+    
+    @staticmethod
+    def _reprojection_error(M: np.ndarray, pts: np.ndarray, reference: np.ndarray) -> float:
+        """Median distance in pixels between M applied to pts and the reference points."""
+        projected = cv2.perspectiveTransform(pts, M)
+        return float(np.median(np.linalg.norm((projected - reference).reshape(-1, 2), axis=1)))
+    
+    def align(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Warp image onto the reference frame.
+        
+        Returns:
+            Aligned BGR frame, or None if alignment failed
+        """
+        M = self.estimate(image)
+        if M is None:
+            return None
+        return cv2.warpPerspective(image, M, self.size)
+
+
 class ImageStackingEnhancer(BaseEnhancer):
     """
     Enhancer that reduces noise by stacking multiple images.
@@ -683,30 +1370,144 @@ class ImageStackingEnhancer(BaseEnhancer):
     
     def __init__(self, 
                  num_images: int = 5,
-                 camera: Optional[Picamera2] = None,
+                 camera: Optional[CameraBackend] = None,
                  alignment_threshold: float = 0.7,
-                 color_input_format: str = 'RGB'):
+                 color_input_format: str = 'RGB',
+                 pyramid_scale: float = 0.5,
+                 workers: Optional[int] = None,
+                 streaming: bool = True):
         """
         Initialize image stacking parameters.
         
         Args:
             num_images: Number of images to stack
-            camera: Picamera2 object for capturing
+            camera: Camera backend for capturing
             alignment_threshold: Threshold for feature matching (0.0-1.0)
             color_input_format: Color format of input images ('BGR' or 'RGB')
+            pyramid_scale: Scale of the level used for feature matching
+            workers: Threads used to align frames (defaults to the CPU count)
+            streaming: Align each frame in the background while the next one is captured
         """
         super().__init__()
         self.num_images = num_images
+        self.streaming = streaming
         self.camera = camera
         self.alignment_threshold = alignment_threshold
         self.color_input_format = color_input_format.upper()
+        self.pyramid_scale = pyramid_scale
+        self.workers = workers or os.cpu_count() or 1
         
         if self.color_input_format not in ['BGR', 'RGB']:
             self.logger.warning(f"Unsupported input format: {color_input_format}. Defaulting to RGB.")
             self.color_input_format = 'RGB'
         
         self.logger.info(f"Setting num_images={num_images}, alignment_threshold={alignment_threshold}, "
-                        f"color_input_format={self.color_input_format}")
+                        f"color_input_format={self.color_input_format}, workers={self.workers}, "
+                        f"streaming={streaming}")
+    
+    def _capture_frame(self) -> np.ndarray:
+        """Capture one frame from the camera as BGR."""
+        raw_img = self.camera.capture_array()
+        
+        # Convert from RGB (camera native) to BGR (OpenCV native) if needed
+        if self.color_input_format == 'RGB':
+            return cv2.cvtColor(raw_img, cv2.COLOR_RGB2BGR)
+        return raw_img
+    
+    def capture_and_stack_streaming(self) -> np.ndarray:
+        """
+        Capture frames and align them concurrently (producer/consumer).
+        
+        The first frame becomes the reference. Each following frame is handed
+        to a background thread through a one-slot queue and aligned and
+        accumulated while the camera captures the next one, so the total time
+        is about max(capture, align) per frame and only a couple of frames are
+        held in memory at once.
+        
+        Returns:
+            np.ndarray: Averaged 8-bit BGR image
+        """
+        reference = self._capture_frame()
+        aligner = FrameAligner(reference, alignment_threshold=self.alignment_threshold,
+                               pyramid_scale=self.pyramid_scale)
+        accumulator = np.zeros(reference.shape, dtype=np.float32)
+        cv2.accumulate(reference, accumulator)
+        del reference
+        
+        frames = Queue(maxsize=1)
+        state = {'stacked': 1, 'error': None, 'align_seconds': 0.0}
+        
+        def consume():
+            while True:
+                item = frames.get()
+                if item is None:
+                    return
+                index, frame = item
+                if state['error'] is not None:
+                    continue
+                try:
+                    started = time.monotonic()
+                    aligned = aligner.align(frame)
+                    state['align_seconds'] += time.monotonic() - started
+                    if aligned is None:
+                        self.logger.warning(f"Could not align image {index}. Skipping.")
+                        continue
+                    cv2.accumulate(aligned, accumulator)
+                    state['stacked'] += 1
+                except Exception as e:
+                    state['error'] = e
+        
+        consumer = threading.Thread(target=consume, name='StackingAligner', daemon=True)
+        consumer.start()
+        capture_seconds = 0.0
+        try:
+            for i in range(2, self.num_images + 1):
+                self.logger.info(f"Capturing image {i}/{self.num_images}")
+                started = time.monotonic()
+                frame = self._capture_frame()
+                capture_seconds += time.monotonic() - started
+                frames.put((i, frame))  # Blocks while the aligner is still busy with a queued frame
+                del frame
+        finally:
+            frames.put(None)
+            consumer.join()
+        
+        if state['error'] is not None:
+            raise state['error']
+        
+        self.logger.info(f"Averaged {state['stacked']} aligned images "
+                         f"(capture {capture_seconds:.2f}s, align {state['align_seconds']:.2f}s)")
+        return cv2.convertScaleAbs(accumulator, alpha=1.0 / state['stacked'])
+    
+    def stack(self, images: List[np.ndarray]) -> np.ndarray:
+        """
+        Align frames to the first one and average them.
+        
+        Frames are aligned in parallel and accumulated into a single float32
+        buffer, so no per-frame float copies are kept.
+        
+        Args:
+            images: BGR frames; the first one is the reference
+            
+        Returns:
+            np.ndarray: Averaged 8-bit BGR image
+        """
+        aligner = FrameAligner(images[0], alignment_threshold=self.alignment_threshold,
+                               pyramid_scale=self.pyramid_scale)
+        accumulator = np.zeros(images[0].shape, dtype=np.float32)
+        cv2.accumulate(images[0], accumulator)
+        stacked = 1
+        
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(images) - 1))) as pool:
+            for i, aligned in enumerate(pool.map(aligner.align, images[1:]), start=2):
+                if aligned is None:
+                    self.logger.warning(f"Could not align image {i}. Skipping.")
+                    continue
+                cv2.accumulate(aligned, accumulator)
+                stacked += 1
+        
+        self.logger.info(f"Averaged {stacked} aligned images")
+        return cv2.convertScaleAbs(accumulator, alpha=1.0 / stacked)
     
     def enhance(self, image: np.ndarray) -> np.ndarray:
         """
@@ -728,72 +1529,22 @@ class ImageStackingEnhancer(BaseEnhancer):
             return image
         
         try:
-            # Capture multiple images
-            self.logger.info(f"Capturing {self.num_images} images")
-            images = []
-            for i in range(self.num_images):
-                self.logger.info(f"Capturing image {i+1}/{self.num_images}")
-                raw_img = self.camera.capture_array()
-                
-                # Convert from RGB (camera native) to BGR (OpenCV native) if needed
-                if self.color_input_format == 'RGB':
-                    img = cv2.cvtColor(raw_img, cv2.COLOR_RGB2BGR)
-                else:
-                    img = raw_img
-                    
-                images.append(img)
-                time.sleep(0.5)
-            
-            # Convert first image to float32 for processing
-            self.logger.info("Aligning and stacking images")
-            aligned_images = [np.float32(images[0])]
-            
-            # Align and stack images
-            for i in range(1, len(images)):
-                # Convert images to grayscale for alignment
-                gray1 = cv2.cvtColor(images[0], cv2.COLOR_BGR2GRAY)
-                gray2 = cv2.cvtColor(images[i], cv2.COLOR_BGR2GRAY)
-                
-                # Find features
-                orb = cv2.ORB_create()
-                kp1, des1 = orb.detectAndCompute(gray1, None)
-                kp2, des2 = orb.detectAndCompute(gray2, None)
-                
-                if des1 is None or des2 is None or len(des1) < 4 or len(des2) < 4:
-                    self.logger.warning(f"Not enough features in image {i+1}. Skipping.")
-                    continue
-                
-                # Match features
-                bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-                matches = bf.match(des1, des2)
-                matches = sorted(matches, key=lambda x: x.distance)
-                
-                # Extract location of good matches
-                threshold = int(len(matches) * self.alignment_threshold)
-                good_matches = matches[:max(4, threshold)]  # Need at least 4 points for homography
-                
-                if len(good_matches) < 4:
-                    self.logger.warning(f"Not enough good matches in image {i+1}. Skipping.")
-                    continue
-                
-                src_pts = np.float32([kp1[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-                dst_pts = np.float32([kp2[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-                
-                # Find homography
-                M, _ = cv2.findHomography(dst_pts, src_pts, cv2.RANSAC, 5.0)
+            started = time.monotonic()
+            if self.streaming:
+                result = self.capture_and_stack_streaming()
+            else:
+                # Capture multiple images
+                self.logger.info(f"Capturing {self.num_images} images")
+                images = []
+                for i in range(self.num_images):
+                    self.logger.info(f"Capturing image {i+1}/{self.num_images}")
+                    images.append(self._capture_frame())
+                    time.sleep(0.5)
                 
-                if M is not None:
-                    aligned = cv2.warpPerspective(images[i], M, (images[0].shape[1], images[0].shape[0]))
-                    aligned_images.append(np.float32(aligned))
-                else:
-                    self.logger.warning(f"Could not find homography for image {i+1}. Skipping.")
-            
-            # Average the images
-            self.logger.info(f"Averaging {len(aligned_images)} aligned images")
-            result = np.mean(aligned_images, axis=0)
-            result = cv2.convertScaleAbs(result)
+                self.logger.info("Aligning and stacking images")
+                result = self.stack(images)
             
-            self.logger.info("Image stacking completed successfully")
+            self.logger.info(f"Image stacking completed successfully in {time.monotonic() - started:.2f}s")
             return result
             
         except Exception as e:
@@ -801,6 +1552,95 @@ class ImageStackingEnhancer(BaseEnhancer):
             raise
 
 
+class TiledExecutor:
+    """
+    Runs tileable enhancers on overlapping horizontal bands in a thread pool.
+    
+    Each band is extended by the enhancer's tile_halo on both sides, processed
+    independently (OpenCV releases the GIL, so bands run in parallel) and
+    cropped back to its core rows. Because the halo covers the enhancer's
+    whole footprint, the stitched result matches a full-frame run and no
+    seam blending is needed.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, bands_per_worker: int = 2, min_band_height: int = 128):
+        """
+        Args:
+            workers: Worker threads (defaults to the CPU count)
+            bands_per_worker: Bands queued per worker, for load balancing
+            min_band_height: Smallest band worth splitting off
+        """
+        self.logger = logging.getLogger('TiledExecutor')
+        self.workers = workers or os.cpu_count() or 1
+        self.bands_per_worker = max(1, bands_per_worker)
+        self.min_band_height = max(1, min_band_height)
+        self._pool = None
+        self._lock = threading.Lock()
+    
+    def plan(self, height: int, halo: int, align: int = 1) -> List[Tuple[int, int, int, int]]:
+        """
+        Split rows into bands.
+        
+        Args:
+            height: Image height
+            halo: Rows of context needed on each side of a band
+            align: Band starts and halos are rounded to multiples of this
+            
+        Returns:
+            list: (start, end, padded_start, padded_end) row ranges
+        """
+        count = max(1, min(self.workers * self.bands_per_worker, height // self.min_band_height))
+        step = -(-height // count)
+        step = -(-step // align) * align
+        halo = -(-halo // align) * align
+        return [(start, min(start + step, height), max(0, start - halo), min(height, start + step + halo))
+                for start in range(0, height, step)]
+    
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='EnhanceTile')
+            return self._pool
+    
+    def run(self, enhancer: BaseEnhancer, image: np.ndarray) -> np.ndarray:
+        """
+        Apply an enhancer, tiled when it supports it.
+        
+        Args:
+            enhancer: Enhancer to apply
+            image: Input image
+            
+        Returns:
+            np.ndarray: Enhanced image
+        """
+        halo = enhancer.tile_halo
+        if halo is None or self.workers < 2:
+            return enhancer.enhance(image)
+        bands = self.plan(image.shape[0], halo, enhancer.tile_align)
+        if len(bands) < 2:
+            return enhancer.enhance(image)
+        
+        start_time = time.time()
+        output = np.empty_like(image)
+        
+        def process(band):
+            start, end, padded_start, padded_end = band
+            result = enhancer.enhance(image[padded_start:padded_end])
+            output[start:end] = result[start - padded_start:end - padded_start]
+        
+        # list() re-raises the first exception from a band
+        list(self._get_pool().map(process, bands))
+        self.logger.info(f"{enhancer.__class__.__name__} ran on {len(bands)} bands (halo {halo}) "
+                         f"in {time.time() - start_time:.2f} seconds")
+        return output
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+
 class ImageEnhancer:
     """
     Main class for enhancing images from Raspberry Pi camera.
@@ -809,19 +1649,22 @@ class ImageEnhancer:
     enhancement techniques in the order they are provided.
     """
     
-    def __init__(self, enhancers: List[BaseEnhancer] = None, input_format: str = 'RGB'):
+    def __init__(self, enhancers: List[BaseEnhancer] = None, input_format: str = 'RGB',
+                 tile_workers: int = 1):
         """
         Initialize the ImageEnhancer with optional list of enhancers.
         
         Args:
             enhancers: List of BaseEnhancer objects to apply in sequence
             input_format: Color format of input images ('BGR' or 'RGB')
+            tile_workers: Threads for tiled enhancement (1 runs every enhancer on the full frame)
         """
         self.logger = logging.getLogger('ImageEnhancer')
         self.logger.info("Initializing ImageEnhancer")
         
         self.enhancers = enhancers or []
         self.camera = None
+        self.tiler = TiledExecutor(workers=tile_workers) if tile_workers > 1 else None
         self.input_format = input_format.upper()
         
         if self.input_format not in ['BGR', 'RGB']:
@@ -840,12 +1683,9 @@ class ImageEnhancer:
         self.logger.info(f"Initializing camera with resolution {resolution}")
         
         try:
-            self.camera = Picamera2()
-            config = self.camera.create_still_configuration(
-                main={"size": resolution},
-                buffer_count=1
-            )
-            self.camera.start(config)
+            self.camera = create_camera_backend()
+            self.camera.configure_still(resolution, buffer_count=1)
+            self.camera.start()
             
             # Allow camera to warm up
             time.sleep(2)
@@ -921,7 +1761,8 @@ class ImageEnhancer:
             self.logger.info("Converting input from RGB to BGR for OpenCV processing")
             working_image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
         else:
-            working_image = image.copy()
+            # Enhancers return new arrays and never modify their input, so no defensive copy
+            working_image = image
         
         # Save the original for comparison if saving output
         if output_path:
@@ -934,7 +1775,13 @@ class ImageEnhancer:
             self.logger.info(f"Applying enhancer {i+1}/{len(self.enhancers)}: {enhancer.__class__.__name__}")
             try:
                 # Use the enhancer
-                working_image = enhancer.enhance(working_image)
+                started = time.perf_counter()
+                with trace_span(f"enhance.{enhancer.__class__.__name__}"):
+                    if self.tiler is not None:
+                        working_image = self.tiler.run(enhancer, working_image)
+                    else:
+                        working_image = enhancer.enhance(working_image)
+                enhancer_seconds.observe(time.perf_counter() - started, enhancer=enhancer.__class__.__name__)
                 
                 # Save intermediate result if debugging is enabled
                 if logging.getLogger().level <= logging.DEBUG and output_path:
@@ -982,6 +1829,8 @@ class ImageEnhancer:
     
     def close(self) -> None:
         """Close the camera and release resources."""
+        if self.tiler is not None:
+            self.tiler.close()
         if self.camera:
             self.logger.info("Closing camera")
             self.camera.close()
@@ -6,7 +6,9 @@ Hybrid approach: System settings in YAML files, user preferences in database.
 import yaml
 import os
 import logging
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify
+import requests
+from urllib.parse import urlparse
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify, Response, abort
 from flask_login import login_required, current_user
 from user_settings import (
     get_all_user_settings, 
@@ -53,6 +55,7 @@ def load_system_settings():
         'llm_model_name': 'llama3.1:8b',
         'ocr_mode': 'local',  # 'local' or 'remote'
         'ocr_server_url': 'http://localhost:8080/ocr',
+        'preview_codec': 'mjpeg',  # 'mjpeg' or 'h264'
         'prompts': {key: load_prompt_from_file(key) for key in DEFAULT_PROMPT_KEYS}
     }
     
@@ -67,6 +70,7 @@ def load_system_settings():
             settings.setdefault('llm_model_name', default_settings['llm_model_name'])
             settings.setdefault('ocr_mode', default_settings['ocr_mode'])
             settings.setdefault('ocr_server_url', default_settings['ocr_server_url'])
+            settings.setdefault('preview_codec', default_settings['preview_codec'])
             
             if 'prompts' not in settings or not isinstance(settings['prompts'], dict):
                 settings['prompts'] = {}
@@ -129,6 +133,10 @@ def get_ocr_server_url():
     """Get OCR server URL from system settings"""
     return load_system_settings().get('ocr_server_url', 'http://localhost:8080/ocr')
 
+def get_preview_codec():
+    """Get camera preview codec ('mjpeg' or 'h264') from system settings"""
+    return load_system_settings().get('preview_codec', 'mjpeg')
+
 def get_image_enhancement_settings():
     """Get image enhancement settings for current user"""
     if current_user.is_authenticated:
@@ -163,10 +171,13 @@ def update_system_settings():
         current_settings = load_system_settings()
         
         # Update allowed fields
-        allowed_fields = ['llm_server_url', 'llm_model_name', 'ocr_mode', 'ocr_server_url']
+        allowed_fields = ['llm_server_url', 'llm_model_name', 'ocr_mode', 'ocr_server_url', 'preview_codec']
         for field in allowed_fields:
             if field in data:
                 current_settings[field] = data[field]
+
+        if current_settings.get('preview_codec') not in ('mjpeg', 'h264'):
+            return jsonify({'error': 'preview_codec must be "mjpeg" or "h264"'}), 400
         
         # Handle prompts separately
         if 'prompts' in data:
@@ -182,6 +193,29 @@ def update_system_settings():
         logger.error(f"Error updating system settings: {e}")
         return jsonify({'error': f'Error updating settings: {str(e)}'}), 500
 
+@settings_bp.route('/profiler/ocr_server/<path:action>', methods=['GET', 'POST'])
+@login_required
+def ocr_server_profiler(action):
+    """Forward profiler calls to the OCR server, which authenticates them with PROFILER_TOKEN"""
+    if not current_user.is_admin:
+        abort(403)
+    token = os.environ.get('PROFILER_TOKEN')
+    if not token:
+        return jsonify({'error': 'Set PROFILER_TOKEN for the app and the OCR server to profile it'}), 400
+    
+    parsed = urlparse(get_ocr_server_url())
+    url = f"{parsed.scheme}://{parsed.netloc}/profiler/{action}"
+    try:
+        response = requests.request(request.method, url, json=request.get_json(silent=True),
+                                    headers={'X-Profiler-Token': token}, timeout=10)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"OCR server profiler request failed: {e}")
+        return jsonify({'error': f'OCR server unreachable: {e}'}), 502
+    
+    passthrough = {key: value for key, value in response.headers.items()
+                   if key.lower() in ('content-type', 'content-disposition')}
+    return Response(response.content, status=response.status_code, headers=passthrough)
+
 @settings_bp.route('/user', methods=['POST'])
 @login_required
 def update_user_settings():
@@ -198,7 +232,7 @@ def update_user_settings():
             return jsonify({'error': 'Category and settings are required'}), 400
         
         # Validate category
-        valid_categories = ['image_enhancement', 'ocr', 'ui']
+        valid_categories = ['image_enhancement', 'ocr', 'ingest', 'ui']
         if category not in valid_categories:
             return jsonify({'error': f'Invalid category. Must be one of: {valid_categories}'}), 400
         
@@ -238,7 +272,7 @@ def get_user_settings_api(category):
     try:
         from user_settings import get_user_settings_by_category
         
-        valid_categories = ['image_enhancement', 'ocr', 'ui']
+        valid_categories = ['image_enhancement', 'ocr', 'ingest', 'ui']
         if category not in valid_categories:
             return jsonify({'error': f'Invalid category. Must be one of: {valid_categories}'}), 400
         
@@ -259,7 +293,7 @@ def update_user_settings_by_category(category):
             return jsonify({'error': 'No data provided'}), 400
         
         # Validate category
-        valid_categories = ['image_enhancement', 'ocr', 'ui']
+        valid_categories = ['image_enhancement', 'ocr', 'ingest', 'ui']
         if category not in valid_categories:
             return jsonify({'error': f'Invalid category. Must be one of: {valid_categories}'}), 400
         
@@ -279,7 +313,7 @@ def reset_user_settings_by_category(category):
     """Reset user settings for a specific category to defaults"""
     try:
         # Validate category
-        valid_categories = ['image_enhancement', 'ocr', 'ui']
+        valid_categories = ['image_enhancement', 'ocr', 'ingest', 'ui']
         if category not in valid_categories:
             return jsonify({'error': f'Invalid category. Must be one of: {valid_categories}'}), 400
         
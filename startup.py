@@ -0,0 +1,132 @@
+"""
+Startup timing and subsystem readiness for RPi PhotoDoc OCR application.
+The camera, OCR and image enhancement subsystems are initialized lazily on
+first use; this module records how long each startup phase and each warm-up
+took and reports which subsystems are warm.
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+from threading import Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+# Subsystem states
+COLD = 'cold'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class StartupTracker:
+    """Records startup phase durations and the warm-up state of lazy subsystems."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.phases = []
+        self.subsystems = {}
+        self._last_checkpoint = self.started_at
+        self._lock = Lock()
+
+    def checkpoint(self, name: str) -> float:
+        """
+        Close a startup phase that ran since the previous checkpoint.
+
+        Args:
+            name: Phase name (e.g. 'imports', 'database')
+
+        Returns:
+            float: Phase duration in seconds
+        """
+        now = time.monotonic()
+        with self._lock:
+            duration = now - self._last_checkpoint
+            self._last_checkpoint = now
+            self.phases.append({'name': name, 'seconds': round(duration, 3)})
+        logger.info(f"Startup phase '{name}' took {duration * 1000:.0f} ms")
+        return duration
+
+    def register(self, *names: str) -> None:
+        """Declare lazily initialized subsystems so they show up as cold."""
+        with self._lock:
+            for name in names:
+                self.subsystems.setdefault(name, {'state': COLD})
+
+    def mark_failed(self, name: str, error) -> None:
+        with self._lock:
+            entry = self.subsystems.setdefault(name, {})
+            entry.update({'state': FAILED, 'error': str(error)})
+        logger.error(f"Subsystem '{name}' failed to initialize: {error}")
+
+    @contextmanager
+    def warming(self, name: str):
+        """
+        Time a subsystem warm-up. The subsystem is marked ready when the block
+        finishes, unless the block raised or called mark_failed().
+        """
+        started = time.monotonic()
+        with self._lock:
+            self.subsystems[name] = {'state': WARMING}
+        try:
+            yield
+        except Exception as e:
+            self.mark_failed(name, e)
+            raise
+        duration = time.monotonic() - started
+        with self._lock:
+            entry = self.subsystems[name]
+            entry['seconds'] = round(duration, 3)
+            if entry['state'] == WARMING:
+                entry['state'] = READY
+                entry['ready_at'] = round(time.monotonic() - self.started_at, 3)
+        logger.info(f"Subsystem '{name}' warmed up in {duration * 1000:.0f} ms")
+
+    def state(self, name: str) -> str:
+        return self.subsystems.get(name, {}).get('state', COLD)
+
+    def report(self) -> dict:
+        """Startup phases and subsystem states, for logging and /ready."""
+        with self._lock:
+            return {
+                'uptime_seconds': round(time.monotonic() - self.started_at, 3),
+                'startup_seconds': round(sum(p['seconds'] for p in self.phases), 3),
+                'phases': list(self.phases),
+                'subsystems': {name: dict(entry) for name, entry in self.subsystems.items()}
+            }
+
+    def log_report(self) -> None:
+        report = self.report()
+        phases = ', '.join(f"{p['name']}={p['seconds'] * 1000:.0f}ms" for p in report['phases'])
+        logger.info(f"Startup finished in {report['startup_seconds']:.2f}s ({phases})")
+
+
+startup_tracker = StartupTracker()
+
+
+def preload_in_background(loaders: dict) -> None:
+    """
+    Warm subsystems listed in PRELOAD_SUBSYSTEMS (comma separated) in a
+    background thread so the first request that needs them is fast.
+
+    Args:
+        loaders: Mapping of subsystem name to a zero-argument warm-up function
+    """
+    requested = [name.strip() for name in os.environ.get('PRELOAD_SUBSYSTEMS', '').split(',') if name.strip()]
+    unknown = [name for name in requested if name not in loaders]
+    if unknown:
+        logger.warning(f"Ignoring unknown PRELOAD_SUBSYSTEMS entries: {unknown}")
+    selected = [name for name in requested if name in loaders]
+    if not selected:
+        return
+
+    def run():
+        for name in selected:
+            try:
+                loaders[name]()
+            except Exception as e:
+                logger.error(f"Background preload of '{name}' failed: {e}")
+
+    Thread(target=run, name='SubsystemPreload', daemon=True).start()
+    logger.info(f"Preloading subsystems in background: {selected}")
@@ -116,12 +116,16 @@ function saveUserSettings(category) {
             denoise_enabled: document.getElementById('denoise-enabled').checked,
             denoise_strength: parseInt(document.getElementById('denoise-strength').value),
             denoise_fast_mode: document.getElementById('denoise-fast-mode').checked,
+            fused_pipeline: document.getElementById('fused-pipeline').checked,
+            tiled_processing: document.getElementById('tiled-processing').checked,
+            adaptive_enabled: document.getElementById('adaptive-enabled').checked,
             contrast_enabled: document.getElementById('contrast-enabled').checked,
             contrast_clip_limit: parseFloat(document.getElementById('contrast-clip-limit').value),
             contrast_preserve_tone: document.getElementById('contrast-preserve-tone').checked,
             sharpen_enabled: document.getElementById('sharpen-enabled').checked,
             sharpen_strength: parseFloat(document.getElementById('sharpen-strength').value),
             color_correction_enabled: document.getElementById('color-correction-enabled').checked,
+            page_crop_enabled: document.getElementById('page-crop-enabled').checked,
             color_white_balance: document.getElementById('color-white-balance').checked,
             color_saturation_factor: parseFloat(document.getElementById('color-saturation-factor').value),
             color_temperature_adjustment: parseFloat(document.getElementById('color-temperature-adjustment').value),
@@ -137,9 +141,12 @@ function saveUserSettings(category) {
                 parseInt(document.getElementById('hdr-exposure-high').value)
             ],
             experimental_hdr_gamma: parseFloat(document.getElementById('hdr-gamma').value),
+            experimental_hdr_merge_method: document.getElementById('hdr-merge-method').value,
+            experimental_hdr_merge_scale: parseFloat(document.getElementById('hdr-merge-scale').value),
             experimental_stacking_enabled: document.getElementById('experimental-stacking-enabled').checked,
             experimental_stacking_num_images: parseInt(document.getElementById('stacking-num-images').value),
-            experimental_stacking_alignment_threshold: parseFloat(document.getElementById('stacking-alignment-threshold').value)
+            experimental_stacking_alignment_threshold: parseFloat(document.getElementById('stacking-alignment-threshold').value),
+            experimental_stacking_streaming: document.getElementById('stacking-streaming').checked
         };
     } else if (category === 'ocr') {
         const languageSelect = document.getElementById('ocr-languages');
@@ -149,7 +156,26 @@ function saveUserSettings(category) {
             preferred_mode: document.getElementById('ocr-preferred-mode').value,
             languages: selectedLanguages,
             detail_level: parseInt(document.getElementById('ocr-detail-level').value),
-            paragraph_mode: document.getElementById('ocr-paragraph-mode').checked
+            paragraph_mode: document.getElementById('ocr-paragraph-mode').checked,
+            preprocess_enabled: document.getElementById('ocr-preprocess-enabled').checked,
+            preprocess_crop: document.getElementById('ocr-preprocess-crop').checked,
+            preprocess_deskew: document.getElementById('ocr-preprocess-deskew').checked,
+            preprocess_binarize: document.getElementById('ocr-preprocess-binarize').checked,
+            preprocess_target_text_height: parseInt(document.getElementById('ocr-preprocess-text-height').value)
+        };
+    } else if (category === 'ingest') {
+        settings = {
+            quality_gate_enabled: document.getElementById('ingest-quality-gate-enabled').checked,
+            min_sharpness: parseFloat(document.getElementById('ingest-min-sharpness').value),
+            min_brightness: parseFloat(document.getElementById('ingest-min-brightness').value),
+            max_brightness: parseFloat(document.getElementById('ingest-max-brightness').value),
+            max_capture_attempts: parseInt(document.getElementById('ingest-max-capture-attempts').value),
+            autofocus_on_retry: document.getElementById('ingest-autofocus-on-retry').checked,
+            reject_low_quality: document.getElementById('ingest-reject-low-quality').checked,
+            duplicate_check: document.getElementById('ingest-duplicate-check').value,
+            duplicate_max_distance: parseInt(document.getElementById('ingest-duplicate-max-distance').value),
+            pdf_dpi: parseInt(document.getElementById('ingest-pdf-dpi').value),
+            pdf_use_text_layer: document.getElementById('ingest-pdf-use-text-layer').checked
         };
     } else if (category === 'ui') {
         settings = {
@@ -237,7 +263,8 @@ function saveSystemSettings() {
         llm_server_url: document.getElementById('llm_server_url').value,
         llm_model_name: document.getElementById('llm_model_name').value,
         ocr_mode: document.getElementById('system_ocr_mode').value,
-        ocr_server_url: document.getElementById('ocr_server_url').value
+        ocr_server_url: document.getElementById('ocr_server_url').value,
+        preview_codec: document.getElementById('preview_codec').value
     };
     
     fetch('/settings/system', {
@@ -311,3 +338,96 @@ function updateRangeValue(rangeId, displayId) {
         display.textContent = range.value;
     }
 }
+
+// Sampling profiler (admin only; the box is not rendered for other users)
+function profilerUrl(action) {
+    return `/settings/profiler/${document.getElementById('profiler-target').value}/${action}`;
+}
+
+function renderProfilerStatus(status) {
+    const endpointSelect = document.getElementById('profiler-endpoint');
+    const selected = endpointSelect.value;
+    endpointSelect.innerHTML = '';
+    (status.available_endpoints || []).forEach(endpoint => {
+        const option = document.createElement('option');
+        option.value = endpoint;
+        option.textContent = endpoint.replace(/^main\./, '');
+        option.selected = endpoint === selected;
+        endpointSelect.appendChild(option);
+    });
+
+    const parts = [];
+    if (status.continuous && status.continuous.running) {
+        parts.push(`Running since ${status.continuous.started_at} (${status.continuous.samples} samples)`);
+    }
+    if (status.requests && status.requests.remaining > 0) {
+        parts.push(`Waiting for ${status.requests.remaining} request(s) to ${status.requests.endpoints.join(', ')}`);
+    }
+    document.getElementById('profiler-status').textContent = parts.length ? parts.join('. ') : 'Idle.';
+
+    const list = document.getElementById('profiler-profiles');
+    list.innerHTML = '';
+    (status.profiles || []).forEach(profile => {
+        const item = document.createElement('li');
+        const link = document.createElement('a');
+        link.href = profilerUrl(`profiles/${encodeURIComponent(profile.name)}`);
+        link.textContent = profile.name;
+        item.appendChild(link);
+        item.appendChild(document.createTextNode(` (${Math.ceil(profile.size / 1024)} KB, ${profile.created_at})`));
+        list.appendChild(item);
+    });
+}
+
+function profilerRequest(action, method = 'GET', body = null) {
+    const options = {method: method, headers: {'Content-Type': 'application/json'}};
+    if (body) options.body = JSON.stringify(body);
+    return fetch(profilerUrl(action), options)
+        .then(response => response.json().then(data => ({ok: response.ok, data: data})));
+}
+
+function refreshProfiler() {
+    if (!document.getElementById('profiler-box')) return;
+    profilerRequest('status')
+        .then(({ok, data}) => {
+            if (ok) {
+                renderProfilerStatus(data);
+            } else {
+                document.getElementById('profiler-status').textContent = data.error || 'Profiler unavailable.';
+                document.getElementById('profiler-profiles').innerHTML = '';
+            }
+        })
+        .catch(error => {
+            document.getElementById('profiler-status').textContent = `Profiler unavailable: ${error}`;
+        });
+}
+
+function startProfiler() {
+    const body = {mode: document.getElementById('profiler-mode').value};
+    if (body.mode === 'requests') {
+        body.endpoints = [document.getElementById('profiler-endpoint').value];
+        body.count = parseInt(document.getElementById('profiler-count').value);
+    }
+    profilerRequest('start', 'POST', body)
+        .then(({ok, data}) => {
+            if (ok) {
+                renderProfilerStatus(data.status);
+                showNotification('Profiler started', 'success');
+            } else {
+                showNotification(data.error || 'Failed to start profiler', 'danger');
+            }
+        });
+}
+
+function stopProfiler() {
+    profilerRequest('stop', 'POST', {})
+        .then(({ok, data}) => {
+            if (ok) {
+                renderProfilerStatus(data.status);
+                showNotification(data.profile ? `Saved ${data.profile}` : 'Profiler stopped', 'success');
+            } else {
+                showNotification(data.error || 'Failed to stop profiler', 'danger');
+            }
+        });
+}
+
+document.addEventListener('DOMContentLoaded', refreshProfiler);
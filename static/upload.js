@@ -74,6 +74,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const cameraSection = document.getElementById('rpi-camera-section');
     if (cameraSection) {
         const cameraFeedImg = document.getElementById('camera-feed-img');
+        const cameraFeedVideo = document.getElementById('camera-feed-video');
         const cameraFeedContainer = document.getElementById('camera-feed-container');
         const cameraLoadingOverlay = document.getElementById('camera-loading-overlay');
         const captureProcessingOverlay = document.getElementById('capture-processing-overlay');
@@ -94,25 +95,45 @@ document.addEventListener('DOMContentLoaded', () => {
         let streamActive = false;
         let captureInProgress = false;
         let frozenFrame = null;
+        let previewCodec = 'mjpeg';
+        let previewQualityTimer = null;
+        let h264Feed = null;
+
+        // H.264 preview is played through Media Source Extensions when the browser supports it
+        function h264Supported(codec = 'avc1.42e01f') {
+            return !!(window.MediaSource && MediaSource.isTypeSupported(`video/mp4; codecs="${codec}"`));
+        }
+
+        function activeFeedElement() {
+            return previewCodec === 'h264' && h264Feed ? cameraFeedVideo : cameraFeedImg;
+        }
+
+        function feedDimensions(element) {
+            if (element === cameraFeedVideo) {
+                return [element.videoWidth, element.videoHeight];
+            }
+            return [element.naturalWidth, element.naturalHeight];
+        }
 
         function updatePortraitButton() {
-            const img = cameraFeedImg;
+            const img = activeFeedElement();
             const container = cameraFeedContainer;
             if (portraitMode) {
                 portraitBtnLabel.textContent = 'Portrait Mode: On';
-                img.classList.add('portrait');
+                cameraFeedImg.classList.add('portrait');
+                cameraFeedVideo.classList.add('portrait');
             } else {
                 portraitBtnLabel.textContent = 'Portrait Mode: Off';
-                img.classList.remove('portrait');
+                cameraFeedImg.classList.remove('portrait');
+                cameraFeedVideo.classList.remove('portrait');
             }
             setTimeout(() => {
-                if (img.offsetParent === null || img.naturalWidth === 0 || img.naturalHeight === 0) {
+                let [imgW, imgH] = feedDimensions(img);
+                if (img.offsetParent === null || imgW === 0 || imgH === 0) {
                     container.style.width = 'auto';
                     container.style.height = 'auto';
                     return;
                 }
-                let imgW = img.naturalWidth;
-                let imgH = img.naturalHeight;
                 if (portraitMode) {
                     [imgW, imgH] = [imgH, imgW];
                 }
@@ -163,6 +184,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         function showCameraLoading(text = "Loading camera...") {
+            stopH264Feed();
             cameraFeedContainer.classList.remove('visible');
             cameraFeedImg.classList.remove('visible');
             cameraFeedImg.src = '';
@@ -173,6 +195,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         function showCameraPlaceholder() {
+            stopH264Feed();
             cameraFeedContainer.classList.remove('visible');
             cameraFeedImg.classList.remove('visible');
             cameraFeedImg.src = '';
@@ -183,15 +206,19 @@ document.addEventListener('DOMContentLoaded', () => {
 
         function freezeFrame() {
             // Create a canvas to capture the current frame
+            const source = activeFeedElement();
             const canvas = document.createElement('canvas');
-            canvas.width = cameraFeedImg.naturalWidth;
-            canvas.height = cameraFeedImg.naturalHeight;
+            [canvas.width, canvas.height] = feedDimensions(source);
             const ctx = canvas.getContext('2d');
-            ctx.drawImage(cameraFeedImg, 0, 0);
+            ctx.drawImage(source, 0, 0);
             frozenFrame = canvas.toDataURL('image/jpeg');
             
             // Set the frozen frame as the image source
             cameraFeedImg.src = frozenFrame;
+            if (source === cameraFeedVideo) {
+                stopH264Feed();
+                cameraFeedImg.classList.add('visible');
+            }
             cameraFrozenIndicator.classList.add('active');
         }
 
@@ -203,6 +230,96 @@ document.addEventListener('DOMContentLoaded', () => {
             frozenFrame = null;
         }
 
+        function stopH264Feed() {
+            if (h264Feed) {
+                h264Feed.controller.abort();
+                h264Feed = null;
+            }
+            if (cameraFeedVideo) {
+                cameraFeedVideo.classList.remove('visible');
+                cameraFeedVideo.removeAttribute('src');
+                cameraFeedVideo.load();
+            }
+        }
+
+        async function startH264Feed() {
+            stopH264Feed();
+            const feed = { controller: new AbortController() };
+            h264Feed = feed;
+
+            const mediaSource = new MediaSource();
+            cameraFeedVideo.src = URL.createObjectURL(mediaSource);
+            await new Promise(resolve => mediaSource.addEventListener('sourceopen', resolve, { once: true }));
+            URL.revokeObjectURL(cameraFeedVideo.src);
+
+            const response = await fetch(window.apiUrls.cameraFeedH264 + "?_nocache=" + new Date().getTime(),
+                                         { signal: feed.controller.signal });
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const codec = response.headers.get('X-Video-Codec') || 'avc1.42e01f';
+            if (!h264Supported(codec)) {
+                throw new Error(`Browser cannot play ${codec}`);
+            }
+
+            const sourceBuffer = mediaSource.addSourceBuffer(`video/mp4; codecs="${codec}"`);
+            const queue = [];
+            const appendNext = () => {
+                if (sourceBuffer.updating || queue.length === 0 || mediaSource.readyState !== 'open') return;
+                sourceBuffer.appendBuffer(queue.shift());
+            };
+            sourceBuffer.addEventListener('updateend', () => {
+                const buffered = sourceBuffer.buffered;
+                if (buffered.length) {
+                    // Stay at the live edge and drop old video instead of letting latency build up
+                    const liveEdge = buffered.end(buffered.length - 1);
+                    if (liveEdge - cameraFeedVideo.currentTime > 0.5) {
+                        cameraFeedVideo.currentTime = liveEdge - 0.1;
+                    }
+                    if (cameraFeedVideo.currentTime - buffered.start(0) > 10) {
+                        sourceBuffer.remove(buffered.start(0), cameraFeedVideo.currentTime - 5);
+                        return;
+                    }
+                }
+                appendNext();
+            });
+
+            cameraFeedVideo.onloadeddata = () => {
+                cameraFeedVideo.classList.add('visible');
+                cameraLoadingOverlay.style.display = 'none';
+                cameraFeedVideo.play().catch(() => {});
+                updatePortraitButton();
+            };
+
+            const reader = response.body.getReader();
+            while (h264Feed === feed) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                queue.push(value);
+                appendNext();
+            }
+        }
+
+        async function fallbackToMjpeg() {
+            stopH264Feed();
+            previewCodec = 'mjpeg';
+            try {
+                const response = await fetchWithTimeout(window.apiUrls.startCameraStream, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ preview_codec: 'mjpeg' })
+                });
+                const result = await response.json();
+                if (response.ok && result.success) {
+                    showLiveFeed();
+                    return;
+                }
+            } catch (error) {
+                console.error("Error switching preview to MJPEG:", error);
+            }
+            cameraLoadingOverlay.textContent = 'Error loading feed.';
+        }
+
         function showLiveFeed() {
             if (!cameraFeedImg || !cameraFeedContainer || !cameraLoadingOverlay) {
                 console.error("Missing feed elements:", {
@@ -216,6 +333,20 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
 
+            if (previewCodec === 'h264') {
+                cameraFeedContainer.classList.add('visible');
+                cameraFeedImg.classList.remove('visible');
+                cameraFeedImg.src = '';
+                cameraLoadingOverlay.style.display = 'flex';
+                startH264Feed().catch(error => {
+                    if (error.name === 'AbortError') return;
+                    console.error("H.264 preview failed, falling back to MJPEG:", error);
+                    fallbackToMjpeg();
+                });
+                return;
+            }
+            stopH264Feed();
+
             cameraFeedContainer.classList.add('visible');
             cameraFeedImg.classList.remove('visible');
             cameraLoadingOverlay.style.display = 'flex';
@@ -257,6 +388,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const data = await response.json();
                 
                 if (data.available) {
+                    previewCodec = data.preview_codec || 'mjpeg';
                     startCameraButton.disabled = false; 
                     if (data.streaming) {
                         activateStreamUI();
@@ -298,6 +430,46 @@ document.addEventListener('DOMContentLoaded', () => {
             cameraStatusText.textContent = "Camera live.";
             streamActive = true;
             setTimeout(updateAfStateUI, 500);
+            startPreviewQuality();
+        }
+
+        // Poll the preview sharpness/exposure score (only when the capture quality gate is enabled)
+        const PREVIEW_QUALITY_MESSAGES = {
+            blurry: "Looks blurry, try autofocus.",
+            underexposed: "Too dark.",
+            overexposed: "Too bright.",
+            clipped: "Glare or deep shadows."
+        };
+
+        function stopPreviewQuality() {
+            if (previewQualityTimer) {
+                clearTimeout(previewQualityTimer);
+                previewQualityTimer = null;
+            }
+        }
+
+        function startPreviewQuality() {
+            stopPreviewQuality();
+            previewQualityTimer = setTimeout(pollPreviewQuality, 1500);
+        }
+
+        async function pollPreviewQuality() {
+            previewQualityTimer = null;
+            if (!streamActive || captureInProgress) return;
+            try {
+                const response = await fetchWithTimeout(window.apiUrls.cameraPreviewQuality, {}, 3000);
+                const result = await response.json();
+                if (!result.enabled) return;  // Quality gate off: stop polling
+                if (result.available && streamActive && !captureInProgress) {
+                    const problems = (result.reasons || []).map(reason => PREVIEW_QUALITY_MESSAGES[reason] || reason);
+                    cameraStatusText.textContent = "Camera live. " + (problems.length ? problems.join(' ') : "Ready to capture.");
+                }
+            } catch (error) {
+                console.debug("Preview quality check failed:", error);
+            }
+            if (streamActive && !captureInProgress) {
+                previewQualityTimer = setTimeout(pollPreviewQuality, 1500);
+            }
         }
 
         function deactivateStreamUI(statusText = "Camera stopped.", disableAll = true) {
@@ -316,6 +488,7 @@ document.addEventListener('DOMContentLoaded', () => {
             cameraStatusText.textContent = statusText;
             streamActive = false;
             captureInProgress = false;
+            stopPreviewQuality();
             if (disableAll) {
                 updateAfStateUI();
             }
@@ -348,9 +521,14 @@ document.addEventListener('DOMContentLoaded', () => {
             showCameraLoading("Starting camera...");
             
             try {
-                const response = await fetchWithTimeout(window.apiUrls.startCameraStream, { method: 'POST' });
+                const response = await fetchWithTimeout(window.apiUrls.startCameraStream, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(h264Supported() ? {} : { preview_codec: 'mjpeg' })
+                });
                 const result = await response.json();
                 if (response.ok && result.success) {
+                    previewCodec = result.preview_codec || 'mjpeg';
                     activateStreamUI();
                 } else {
                     const errorMsg = "Failed to start camera: " + (result.error || "Unknown error");
@@ -527,6 +705,118 @@ document.addEventListener('DOMContentLoaded', () => {
         checkCameraStatus();
     }
 
+    // Bulk upload: send every file in one request, then poll the batch until it is done
+    const bulkForm = document.getElementById('bulk-upload-form');
+    const bulkInput = document.getElementById('bulk-upload-input');
+    const bulkFileNameDisplay = document.getElementById('bulk-file-name-display');
+    const bulkSubmitButton = document.getElementById('bulk-upload-submit-button');
+    const bulkMessagePlaceholder = document.getElementById('bulk-upload-message-placeholder');
+    const bulkProgress = document.getElementById('bulk-upload-progress');
+    const bulkProgressBar = document.getElementById('bulk-upload-progress-bar');
+    const bulkProgressText = document.getElementById('bulk-upload-progress-text');
+    const bulkItems = document.getElementById('bulk-upload-items');
+    const BULK_POLL_INTERVAL = 2000;
+
+    const BULK_STATUS_LABELS = {
+        queued: 'Queued',
+        processing: 'Processing...',
+        created: 'Added',
+        identical: 'Already in gallery',
+        skipped_duplicate: 'Skipped (duplicate)',
+        rejected: 'Rejected',
+        failed: 'Failed'
+    };
+
+    function renderBulkBatch(batch) {
+        bulkProgress.style.display = '';
+        bulkProgressBar.max = Math.max(batch.total, 1);
+        bulkProgressBar.value = batch.finished;
+        bulkProgressText.textContent = `${batch.finished} of ${batch.total} files processed`;
+        bulkItems.innerHTML = '';
+        batch.items.forEach((item) => {
+            const li = document.createElement('li');
+            let text = `${item.filename}: ${BULK_STATUS_LABELS[item.status] || item.status}`;
+            if (item.status === 'created' && item.duplicate_of) {
+                text += ' (possible duplicate)';
+            }
+            if (item.pages) {
+                text += ` (${item.pages_done} of ${item.pages} pages)`;
+            }
+            if (item.error) {
+                text += ` - ${item.error}`;
+            }
+            li.textContent = text;
+            if (item.document_url) {
+                const link = document.createElement('a');
+                link.href = item.document_url;
+                link.textContent = 'Open document';
+                li.append(' ', link);
+            }
+            bulkItems.appendChild(li);
+        });
+    }
+
+    async function pollBulkBatch(statusUrl) {
+        try {
+            const response = await fetch(statusUrl);
+            const result = await response.json();
+            if (!response.ok || !result.success) {
+                throw new Error(result.error || `HTTP ${response.status}`);
+            }
+            renderBulkBatch(result.batch);
+            if (result.batch.status !== 'done') {
+                setTimeout(() => pollBulkBatch(statusUrl), BULK_POLL_INTERVAL);
+                return;
+            }
+            bulkSubmitButton.classList.remove('is-loading');
+            bulkSubmitButton.disabled = false;
+            // A single PDF links straight to its document
+            const documentUrls = result.batch.items.map((item) => item.document_url).filter(Boolean);
+            const documentUrl = result.batch.document_url || (documentUrls.length === 1 ? documentUrls[0] : null);
+            const target = documentUrl || window.apiUrls.gallery;
+            const label = documentUrl ? 'Open the document' : 'Open the gallery';
+            displayNotification(`Batch finished. <a href="${target}">${label}</a>`, 'success', bulkMessagePlaceholder, true);
+        } catch (error) {
+            console.error('Error polling bulk upload:', error);
+            setTimeout(() => pollBulkBatch(statusUrl), BULK_POLL_INTERVAL * 2);
+        }
+    }
+
+    if (bulkForm && bulkInput && bulkSubmitButton) {
+        bulkInput.onchange = () => {
+            const count = bulkInput.files.length;
+            bulkFileNameDisplay.textContent = count === 0 ? 'No files selected'
+                : count === 1 ? bulkInput.files[0].name : `${count} files selected`;
+            bulkFileNameDisplay.classList.toggle('has-file', count > 0);
+            bulkSubmitButton.disabled = count === 0;
+        };
+
+        bulkForm.addEventListener('submit', async (event) => {
+            event.preventDefault();
+            if (bulkInput.files.length === 0) {
+                displayNotification('Please select files to upload.', 'warning', bulkMessagePlaceholder, true);
+                return;
+            }
+            bulkSubmitButton.classList.add('is-loading');
+            bulkSubmitButton.disabled = true;
+            bulkMessagePlaceholder.innerHTML = '';
+            try {
+                const response = await fetch(window.apiUrls.bulkUpload, { method: 'POST', body: new FormData(bulkForm) });
+                const result = await response.json();
+                if (!response.ok || !result.success) {
+                    throw new Error(result.error || `HTTP ${response.status}`);
+                }
+                renderBulkBatch(result.batch);
+                pollBulkBatch(result.status_url);
+            } catch (error) {
+                console.error('Error during bulk upload:', error);
+                displayNotification('Bulk upload failed: ' + error.message, 'danger', bulkMessagePlaceholder, true);
+                bulkSubmitButton.classList.remove('is-loading');
+                bulkSubmitButton.disabled = false;
+            }
+        });
+    }
+
     document.querySelectorAll('.notification .delete').forEach((deleteButton) => {
         if (!deleteButton.dataset.listenerAttached) {
             deleteButton.addEventListener('click', () => {
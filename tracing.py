@@ -0,0 +1,197 @@
+"""
+Request tracing for RPi PhotoDoc OCR application.
+A trace is started for each capture/upload and every pipeline stage records
+a span in it. The trace ID travels to the OCR server and the LLM in a W3C
+`traceparent` header, and finished traces are appended to a JSON Lines file
+so a slow page can be followed across both processes.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from threading import Lock
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = os.environ.get('PHOTODOC_TRACE_FILE', os.path.join('logs', 'traces.jsonl'))
+TRACE_FILE_MAX_BYTES = int(os.environ.get('PHOTODOC_TRACE_FILE_MAX_BYTES', 5 * 1024 * 1024))
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+
+_current_trace: ContextVar[Optional['Trace']] = ContextVar('photodoc_trace', default=None)
+_write_lock = Lock()
+
+
+def _new_span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Trace:
+    """Spans of one capture/upload (or of one OCR server request)."""
+
+    def __init__(self, name: str, service: str = 'photodoc', trace_id: str = None,
+                 parent_span_id: str = None, **attributes):
+        self.name = name
+        self.service = service
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.root_span_id = _new_span_id()
+        self.parent_span_id = parent_span_id
+        self.attributes = attributes
+        self.started_at = datetime.utcnow().isoformat()
+        self.spans = []
+        self._start = time.perf_counter()
+        self._stack = [self.root_span_id]
+        self._token = None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Record the enclosed block as a child of the innermost open span."""
+        span = {'span_id': _new_span_id(), 'parent_id': self._stack[-1], 'name': name,
+                'start_ms': round(self.elapsed_ms(), 2), 'status': 'ok'}
+        if attributes:
+            span['attributes'] = attributes
+        self._stack.append(span['span_id'])
+        try:
+            yield span
+        except Exception as e:
+            span['status'] = 'error'
+            span['error'] = str(e)[:200]
+            raise
+        finally:
+            self._stack.pop()
+            span['duration_ms'] = round(self.elapsed_ms() - span['start_ms'], 2)
+            self.spans.append(span)
+
+    def add_span(self, name: str, duration_ms: float, start_ms: float = None, **attributes) -> None:
+        """Record a span measured elsewhere (e.g. reported back by the OCR server)."""
+        span = {'span_id': _new_span_id(), 'parent_id': self._stack[-1], 'name': name,
+                'start_ms': round(start_ms if start_ms is not None else self.elapsed_ms() - duration_ms, 2),
+                'duration_ms': round(duration_ms, 2), 'status': 'ok'}
+        if attributes:
+            span['attributes'] = attributes
+        self.spans.append(span)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self._stack[-1]}-01"
+
+    def stage_timings(self) -> dict:
+        """Milliseconds per span name (repeated spans are summed), plus the total so far."""
+        timings = {}
+        for span in self.spans:
+            timings[span['name']] = round(timings.get(span['name'], 0.0) + span['duration_ms'], 1)
+        timings['total'] = round(self.elapsed_ms(), 1)
+        return timings
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'service': self.service,
+            'name': self.name,
+            'root_span_id': self.root_span_id,
+            'parent_span_id': self.parent_span_id,
+            'started_at': self.started_at,
+            'duration_ms': round(self.elapsed_ms(), 1),
+            'attributes': self.attributes,
+            'spans': sorted(self.spans, key=lambda s: s['start_ms'])
+        }
+
+
+def start_trace(name: str, service: str = 'photodoc', headers=None, **attributes) -> Trace:
+    """
+    Start a trace and make it current for this request/thread.
+
+    Args:
+        name: Trace name (e.g. 'capture', 'upload')
+        service: Process that records the trace
+        headers: Incoming request headers; a valid traceparent continues the caller's trace
+        **attributes: Extra fields stored with the trace (user_id, filename, ...)
+
+    Returns:
+        Trace: Pass to end_trace() when the work is done
+    """
+    trace_id = parent_span_id = None
+    match = TRACEPARENT_RE.match((headers or {}).get('traceparent', '').strip().lower())
+    if match:
+        trace_id, parent_span_id = match.groups()
+    trace = Trace(name, service=service, trace_id=trace_id, parent_span_id=parent_span_id, **attributes)
+    trace._token = _current_trace.set(trace)
+    return trace
+
+
+def end_trace(trace: Trace, trace_file: str = None) -> None:
+    """Detach the trace from the current context and append it to the trace file."""
+    if trace is None:
+        return
+    if trace._token is not None:
+        try:
+            _current_trace.reset(trace._token)
+        except ValueError:
+            _current_trace.set(None)  # Ended from a different context
+        trace._token = None
+
+    path = trace_file or TRACE_FILE
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with _write_lock:
+            if os.path.exists(path) and os.path.getsize(path) > TRACE_FILE_MAX_BYTES:
+                os.replace(path, path + '.1')  # Keep one previous file
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+    except Exception as e:
+        logger.warning(f"Failed to write trace {trace.trace_id}: {e}")
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Span in the current trace; a no-op outside a trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attributes) as record:
+        yield record
+
+
+def propagation_headers() -> dict:
+    """Headers that carry the current trace to another service."""
+    trace = _current_trace.get()
+    return {'traceparent': trace.traceparent()} if trace is not None else {}
+
+
+def load_traces(trace_file: str = None, trace_id: str = None, limit: int = 50) -> list:
+    """
+    Most recent traces from the trace file, newest first.
+
+    Args:
+        trace_file: JSON Lines file (defaults to TRACE_FILE)
+        trace_id: Only return traces with this ID (from any service writing to the file)
+        limit: Maximum number of traces
+    """
+    path = trace_file or TRACE_FILE
+    traces = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    trace = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if trace_id is None or trace.get('trace_id') == trace_id:
+                    traces.append(trace)
+    except FileNotFoundError:
+        return []
+    return traces[::-1][:limit]
@@ -17,6 +17,9 @@ DEFAULT_USER_SETTINGS = {
         'denoise_enabled': False,
         'denoise_strength': 3,
         'denoise_fast_mode': True,
+        'fused_pipeline': False,  # run the standard chain as one fused pass (faster, output differs slightly)
+        'tiled_processing': True,  # split tileable steps into bands across CPU cores
+        'adaptive_enabled': False,  # measure each image and skip steps it does not need
         'contrast_enabled': False,
         'contrast_clip_limit': 1.5,
         'contrast_preserve_tone': True,
@@ -26,6 +29,7 @@ DEFAULT_USER_SETTINGS = {
         'color_white_balance': False,
         'color_saturation_factor': 1.0,
         'color_temperature_adjustment': 0.0,
+        'page_crop_enabled': False,
         'camera_optimal_settings': False,
         'camera_exposure_time': 33000,
         'camera_analog_gain': 1.0,
@@ -35,15 +39,38 @@ DEFAULT_USER_SETTINGS = {
         'experimental_hdr_enabled': False,
         'experimental_hdr_exposure_times': [5000, 20000, 50000],
         'experimental_hdr_gamma': 2.2,
+        'experimental_hdr_merge_method': 'debevec',  # 'debevec' or 'mertens'
+        'experimental_hdr_merge_scale': 1.0,
         'experimental_stacking_enabled': False,
         'experimental_stacking_num_images': 5,
-        'experimental_stacking_alignment_threshold': 0.7
+        'experimental_stacking_alignment_threshold': 0.7,
+        'experimental_stacking_streaming': True
     },
     'ocr': {
         'preferred_mode': 'local',  # 'local' or 'remote'
         'languages': ['uk', 'en'],
         'detail_level': 0,
-        'paragraph_mode': True
+        'paragraph_mode': True,
+        # OCR-only preprocessing; the stored photo is never modified
+        'preprocess_enabled': False,
+        'preprocess_crop': True,
+        'preprocess_deskew': True,
+        'preprocess_binarize': False,
+        'preprocess_target_text_height': 32
+    },
+    'ingest': {
+        'quality_gate_enabled': False,  # score captures and re-shoot blurry/badly exposed frames
+        'min_sharpness': 60.0,  # variance of the Laplacian at 1024 px width
+        'min_brightness': 40.0,
+        'max_brightness': 225.0,
+        'max_capture_attempts': 3,
+        'autofocus_on_retry': True,
+        'reject_low_quality': False,  # fail the capture instead of keeping the best attempt
+        'duplicate_check': 'flag',  # 'off', 'flag' or 'skip' near-duplicates of recent photos
+        'duplicate_max_distance': 12,  # differing bits (of 256) that still count as the same page
+        'duplicate_window': 200,  # number of recent photos to compare against
+        'pdf_dpi': 200,  # resolution PDF pages are rendered at for OCR
+        'pdf_use_text_layer': True  # use a page's embedded text instead of OCR when it has one
     },
     'ui': {
         'gallery_sort_order': 'created_desc',  # created_desc, created_asc, name_asc, name_desc
@@ -236,6 +263,10 @@ def get_ocr_settings(user_id: int) -> Dict[str, Any]:
     """Get OCR settings for a specific user"""
     return get_user_settings_by_category(user_id, 'ocr')
 
+def get_ingest_settings(user_id: int) -> Dict[str, Any]:
+    """Get capture/ingest settings for a specific user"""
+    return get_user_settings_by_category(user_id, 'ingest')
+
 def get_ui_settings(user_id: int) -> Dict[str, Any]:
     """Get UI settings for a specific user"""
     return get_user_settings_by_category(user_id, 'ui')
\ No newline at end of file